@@ -0,0 +1,23 @@
+"""Benchmarks of the workspace tools on generated workspaces.
+
+Generate a workspace once, then time the tools against it and compare the
+results with those of another version::
+
+    python -m demo_agent.benchmarks generate /tmp/bench-100k --size 100k
+    python -m demo_agent.benchmarks run /tmp/bench-100k -o before.json
+    python -m demo_agent.benchmarks run /tmp/bench-100k -o after.json --compare before.json
+"""
+
+from .suite import BenchmarkCase, compare_results, default_cases, load_results, run_suite, write_results
+from .workspace import WORKSPACE_SIZES, generate_workspace
+
+__all__ = [
+    "BenchmarkCase",
+    "WORKSPACE_SIZES",
+    "compare_results",
+    "default_cases",
+    "generate_workspace",
+    "load_results",
+    "run_suite",
+    "write_results",
+]
@@ -0,0 +1,108 @@
+"""Command line entry point of the tool benchmarks."""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from .suite import (
+    DEFAULT_REGRESSION_THRESHOLD,
+    DEFAULT_REPEAT,
+    PARALLEL_TURN,
+    compare_results,
+    default_cases,
+    load_results,
+    run_suite,
+    write_results,
+)
+from .workspace import WORKSPACE_SIZES, generate_workspace, read_workspace_marker
+
+
+def _size(value: str) -> int:
+    if value.lower() in WORKSPACE_SIZES:
+        return WORKSPACE_SIZES[value.lower()]
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected one of {', '.join(WORKSPACE_SIZES)} or a number of files"
+        ) from None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m demo_agent.benchmarks",
+        description="Generate synthetic workspaces and benchmark the workspace tools on them.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Generate a synthetic workspace")
+    generate.add_argument("root", help="Directory to generate the workspace in (created if missing)")
+    generate.add_argument(
+        "-s", "--size", type=_size, default=WORKSPACE_SIZES["1k"],
+        help=f"Number of files, or one of {', '.join(WORKSPACE_SIZES)} (default: 1k)",
+    )
+    generate.add_argument("--seed", type=int, default=0, help="Seed of the generated contents (default: 0)")
+
+    run = commands.add_parser("run", help="Time the tools on a generated workspace")
+    run.add_argument("root", help="Generated workspace to benchmark")
+    run.add_argument("-o", "--output", metavar="PATH", help="Write the results as JSON to PATH")
+    run.add_argument(
+        "-r", "--repeat", type=int, default=DEFAULT_REPEAT,
+        help=f"Warm calls timed after the cold one (default: {DEFAULT_REPEAT})",
+    )
+    run.add_argument(
+        "-k", "--cases", nargs="+", metavar="NAME",
+        help=f"Only run the named cases ({PARALLEL_TURN} for the multi-call turn)",
+    )
+    run.add_argument("--compare", metavar="BASELINE", help="Compare with an earlier results file")
+    run.add_argument(
+        "--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+        help=f"Slowdown reported as a regression (default: {DEFAULT_REGRESSION_THRESHOLD})",
+    )
+
+    compare = commands.add_parser("compare", help="Compare two results files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+
+    args = parser.parse_args()
+    try:
+        if args.command == "generate":
+            start = time.perf_counter()
+            workspace = generate_workspace(args.root, args.size, args.seed)
+            print(f"Workspace with {workspace['total_files']} files at {workspace['root']} "
+                  f"({time.perf_counter() - start:.1f}s): {workspace['counts']}")
+            return
+
+        if args.command == "run":
+            cases = None
+            parallel_turn = True
+            if args.cases:
+                workspace = read_workspace_marker(args.root) or {}
+                known = {case.name: case for case in default_cases(workspace)}
+                unknown = [name for name in args.cases if name not in known and name != PARALLEL_TURN]
+                if unknown:
+                    parser.error(f"unknown cases: {', '.join(unknown)}; known: {', '.join([*known, PARALLEL_TURN])}")
+                cases = [known[name] for name in args.cases if name in known]
+                parallel_turn = PARALLEL_TURN in args.cases
+            results = run_suite(args.root, cases, repeat=args.repeat, parallel_turn=parallel_turn)
+            if args.output:
+                write_results(results, args.output)
+                print(f"Results written to {args.output}")
+            if not args.compare:
+                return
+            baseline = load_results(args.compare)
+        else:
+            baseline, results = load_results(args.baseline), load_results(args.current)
+
+        report, regressions = compare_results(baseline, results, args.threshold)
+        print(report)
+        if regressions:
+            parser.exit(1, f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}\n")
+    except (OSError, ValueError) as e:
+        parser.exit(1, f"error: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""Cold and warm timing of the workspace tools on a generated workspace."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, NamedTuple
+
+from .workspace import NEEDLE, read_workspace_marker
+
+# Bumped whenever the cases or the result layout change; results of other
+# versions are not compared
+RESULTS_VERSION = 2
+
+# Warm calls timed after the cold one
+DEFAULT_REPEAT = 3
+
+# Name of the multi-call turn benchmark, selectable like a case
+PARALLEL_TURN = "parallel_turn"
+
+# Slowdown over the baseline reported as a regression
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+
+class BenchmarkCase(NamedTuple):
+    name: str
+    tool: str
+    arguments: dict[str, Any]
+
+
+def default_cases(workspace: dict[str, Any]) -> list[BenchmarkCase]:
+    """Return the benchmark cases for a workspace described by its marker."""
+    sample_dir = workspace.get("sample_source_dir", "src")
+    return [
+        BenchmarkCase("ls_root", "ls", {"path": "."}),
+        BenchmarkCase("ls_package", "ls", {"path": sample_dir, "sort_by": "size"}),
+        BenchmarkCase("glob_python", "glob", {"pattern": "**/*.py"}),
+        BenchmarkCase("glob_package_ts", "glob", {"pattern": f"{sample_dir}/**/*.ts", "sort_by": "mtime"}),
+        BenchmarkCase("find_literal", "find", {"search_text": NEEDLE}),
+        BenchmarkCase("find_word_python", "find", {"search_text": "TODO", "file_pattern": "**/*.py", "whole_word": True}),
+        BenchmarkCase("ast_grep_classes", "ast_grep", {"pattern": "class $NAME($$$BASES): $$$"}),
+        BenchmarkCase(
+            "read_files",
+            "read_files",
+            {"files": ["README.md", f"{sample_dir}/module_0.py", "data/fixtures.py"], "max_lines_per_file": 400},
+        ),
+        BenchmarkCase("read_files_range", "read_files", {"files": ["data/fixtures.py"], "start_line": 100000, "end_line": 100200}),
+        BenchmarkCase("tree", "tree", {"path": ".", "max_depth": 3}),
+    ]
+
+
+def parallel_turn_calls(workspace: dict[str, Any]) -> list[BenchmarkCase]:
+    """Return the tool calls of one model turn with parallel tool calls."""
+    sample_dir = workspace.get("sample_source_dir", "src")
+    return [
+        BenchmarkCase("read_module", "read_files", {"files": [f"{sample_dir}/module_0.py", f"{sample_dir}/module_1.py"]}),
+        BenchmarkCase("read_docs", "read_files", {"files": ["README.md"]}),
+        BenchmarkCase("read_fixtures", "read_files", {"files": ["data/fixtures.py"], "start_line": 1000, "end_line": 1400}),
+        BenchmarkCase("find_literal", "find", {"search_text": NEEDLE}),
+        BenchmarkCase("find_todo", "find", {"search_text": "TODO", "file_pattern": "**/*.ts"}),
+        BenchmarkCase("ast_grep_classes", "ast_grep", {"pattern": "class $NAME($$$BASES): $$$"}),
+        BenchmarkCase("ast_grep_raises", "ast_grep", {"pattern": "raise ValueError($MSG)"}),
+        BenchmarkCase("glob_ts", "glob", {"pattern": "src/**/*.ts"}),
+    ]
+
+
+def _peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_case(workspace_root: str, case: BenchmarkCase, repeat: int) -> dict[str, Any]:
+    """Time one case in a fresh process: one cold call, then ``repeat`` warm calls."""
+    # Fresh on-disk caches too, so the first call is cold in every respect
+    # but the OS page cache
+    os.environ["CODE_IDENTIFIER_CACHE_DIR"] = tempfile.mkdtemp(prefix="code-identifier-bench-")
+    os.chdir(workspace_root)
+
+    from agents.tool_context import ToolContext
+
+    from .. import tools
+    from ..tools import tool_metrics
+    from ..tools._instrumentation import CALL_COUNTERS
+
+    tool = getattr(tools, case.tool)
+    arguments = json.dumps(case.arguments)
+    rss_before = _peak_rss_bytes()
+
+    async def call() -> tuple[float, Any]:
+        ctx = ToolContext(context=None, tool_name=tool.name, tool_call_id="benchmark", tool_arguments=arguments)
+        start = time.perf_counter()
+        output = await tool.on_invoke_tool(ctx, arguments)
+        return time.perf_counter() - start, output
+
+    async def run() -> dict[str, Any]:
+        cold_seconds, output = await call()
+        cold_metrics = tool_metrics.to_dict().get(tool.name, {})
+        warm = [(await call())[0] for _ in range(repeat)]
+        return {
+            "tool": case.tool,
+            "arguments": case.arguments,
+            "cold_seconds": cold_seconds,
+            "warm_seconds": statistics.median(warm) if warm else None,
+            "warm_min_seconds": min(warm) if warm else None,
+            "errors": tool_metrics.to_dict().get(tool.name, {}).get("errors", 0),
+            "output_bytes": cold_metrics.get("output_bytes", {}).get("sum", 0),
+            "output_sample": str(output)[:200],
+            "cold_io": {key: cold_metrics.get(key, 0) for key in CALL_COUNTERS},
+        }
+
+    result = asyncio.run(run())
+    rss_after = _peak_rss_bytes()
+    result["peak_rss_bytes"] = rss_after
+    result["rss_growth_bytes"] = rss_after - rss_before if rss_after is not None and rss_before is not None else None
+    return result
+
+
+def _run_parallel_turn(workspace_root: str, calls: list[BenchmarkCase], repeat: int) -> dict[str, Any]:
+    """Time one turn of ``calls`` made one after another, then all at once.
+
+    Caches are warmed by a first untimed turn, so the two timings differ
+    only in how much the calls overlap.  The longest the event loop went
+    without running during the concurrent turns is reported too; a tool
+    that blocks the loop shows up there even when no speedup is possible,
+    e.g. on a single CPU.
+    """
+    os.environ["CODE_IDENTIFIER_CACHE_DIR"] = tempfile.mkdtemp(prefix="code-identifier-bench-")
+    os.chdir(workspace_root)
+
+    from agents.tool_context import ToolContext
+
+    from .. import tools
+    from ..tools._executor import tool_workers
+
+    async def call(case: BenchmarkCase) -> Any:
+        tool = getattr(tools, case.tool)
+        arguments = json.dumps(case.arguments)
+        ctx = ToolContext(context=None, tool_name=tool.name, tool_call_id=case.name, tool_arguments=arguments)
+        return await tool.on_invoke_tool(ctx, arguments)
+
+    async def sequential() -> float:
+        start = time.perf_counter()
+        for case in calls:
+            await call(case)
+        return time.perf_counter() - start
+
+    max_stall = 0.0
+
+    async def heartbeat() -> None:
+        nonlocal max_stall
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            max_stall = max(max_stall, now - last)
+            last = now
+
+    async def concurrent() -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(call(case) for case in calls))
+        return time.perf_counter() - start
+
+    async def run() -> dict[str, Any]:
+        nonlocal max_stall
+        await concurrent()
+        sequential_seconds = statistics.median([await sequential() for _ in range(max(1, repeat))])
+        max_stall = 0.0
+        beat = asyncio.create_task(heartbeat())
+        concurrent_seconds = statistics.median([await concurrent() for _ in range(max(1, repeat))])
+        beat.cancel()
+        return {
+            "calls": [case.name for case in calls],
+            "tool_workers": tool_workers(),
+            "sequential_seconds": sequential_seconds,
+            "concurrent_seconds": concurrent_seconds,
+            "speedup": sequential_seconds / concurrent_seconds if concurrent_seconds else None,
+            "max_loop_stall_seconds": max_stall,
+        }
+
+    return asyncio.run(run())
+
+
+def run_suite(
+    workspace_root: str,
+    cases: list[BenchmarkCase] | None = None,
+    repeat: int = DEFAULT_REPEAT,
+    progress: bool = True,
+    parallel_turn: bool = True,
+) -> dict[str, Any]:
+    """Run every case against ``workspace_root`` and return comparable results.
+
+    Each case runs in its own freshly spawned process, so its first call sees
+    empty in-process and on-disk caches (the OS page cache is left alone)
+    and its peak memory is not inflated by earlier cases.  With
+    ``parallel_turn``, the wall time of a turn of several tool calls is also
+    measured with the calls made one after another and all at once.
+
+    Raises:
+        ValueError: If ``workspace_root`` is not a generated benchmark workspace.
+    """
+    workspace_root = os.path.abspath(workspace_root)
+    workspace = read_workspace_marker(workspace_root)
+    if workspace is None:
+        raise ValueError(f"{workspace_root} is not a generated benchmark workspace")
+    cases = cases if cases is not None else default_cases(workspace)
+
+    from .. import __version__
+
+    results: dict[str, Any] = {}
+    spawn = multiprocessing.get_context("spawn")
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+            results[case.name] = executor.submit(_run_case, workspace_root, case, repeat).result()
+        if progress:
+            result = results[case.name]
+            warm = f"{result['warm_seconds']:.4f}s" if result["warm_seconds"] is not None else "-"
+            print(f"{case.name:<20} cold {result['cold_seconds']:.4f}s  warm {warm}  peak {_format_bytes(result['peak_rss_bytes'])}")
+
+    turn = None
+    if parallel_turn:
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+            turn = executor.submit(_run_parallel_turn, workspace_root, parallel_turn_calls(workspace), repeat).result()
+        if progress:
+            print(
+                f"{PARALLEL_TURN:<20} {len(turn['calls'])} calls: sequential {turn['sequential_seconds']:.4f}s  "
+                f"concurrent {turn['concurrent_seconds']:.4f}s  ({turn['speedup']:.2f}x, {turn['tool_workers']} workers, "
+                f"loop stalled up to {turn['max_loop_stall_seconds'] * 1000:.1f}ms)"
+            )
+
+    return {
+        "results_version": RESULTS_VERSION,
+        "version": __version__,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "workspace": {key: workspace.get(key) for key in ("files", "seed", "layout_version", "total_files", "counts")},
+        "cases": results,
+        PARALLEL_TURN: turn,
+    }
+
+
+def _format_bytes(size: int | None) -> str:
+    return "-" if size is None else f"{size / (1 << 20):.1f}MiB"
+
+
+def write_results(results: dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+
+
+def load_results(path: str) -> dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+) -> tuple[str, list[str]]:
+    """Compare two results files case by case.
+
+    Returns:
+        Tuple of (report table, names of the cases slower than the baseline
+        by more than ``threshold`` on their cold or warm time).
+
+    Raises:
+        ValueError: If the results come from different result versions or
+            differently generated workspaces.
+    """
+    if baseline.get("results_version") != current.get("results_version"):
+        raise ValueError("Results were written by different benchmark versions")
+    if baseline.get("workspace", {}).get("files") != current.get("workspace", {}).get("files") or (
+        baseline.get("workspace", {}).get("seed") != current.get("workspace", {}).get("seed")
+    ):
+        raise ValueError("Results come from different workspaces")
+
+    lines = [f"{'case':<20} {'cold':>10} {'Δcold':>8} {'warm':>10} {'Δwarm':>8} {'peak':>10}"]
+    regressions = []
+    for name, result in current["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            lines.append(f"{name:<20} {result['cold_seconds']:>9.4f}s {'new':>8}")
+            continue
+        changes = []
+        for key in ("cold_seconds", "warm_seconds"):
+            if result.get(key) and base.get(key):
+                changes.append(result[key] / base[key] - 1)
+            else:
+                changes.append(None)
+        if any(change is not None and change > threshold for change in changes):
+            regressions.append(name)
+        cold_change, warm_change = (f"{change:+.0%}" if change is not None else "-" for change in changes)
+        warm = f"{result['warm_seconds']:.4f}s" if result.get("warm_seconds") is not None else "-"
+        lines.append(
+            f"{name:<20} {result['cold_seconds']:>9.4f}s {cold_change:>8} {warm:>10} {warm_change:>8} "
+            f"{_format_bytes(result.get('peak_rss_bytes')):>10}"
+        )
+
+    turn, base_turn = current.get(PARALLEL_TURN), baseline.get(PARALLEL_TURN)
+    if turn:
+        change = turn["concurrent_seconds"] / base_turn["concurrent_seconds"] - 1 if base_turn else None
+        if change is not None and change > threshold:
+            regressions.append(PARALLEL_TURN)
+        lines.append(
+            f"{PARALLEL_TURN:<20} concurrent {turn['concurrent_seconds']:.4f}s "
+            f"({f'{change:+.0%}' if change is not None else 'new'}), "
+            f"sequential {turn['sequential_seconds']:.4f}s, {turn['speedup']:.2f}x"
+        )
+    return "\n".join(lines), regressions
@@ -0,0 +1,274 @@
+"""Deterministic generator of synthetic workspaces for the tool benchmarks."""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+from typing import Any
+
+# Named workspace sizes, in files
+WORKSPACE_SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Written last into a generated workspace; describes how it was generated
+WORKSPACE_MARKER = ".benchmark-workspace.json"
+
+# Bumped whenever the generated layout or contents change
+WORKSPACE_LAYOUT_VERSION = 1
+
+# Share of the files in each part of the workspace; source takes the rest
+NODE_MODULES_SHARE = 0.30
+GENERATED_SHARE = 0.08
+DOCS_SHARE = 0.05
+BINARY_SHARE = 0.015
+
+# Files per directory and subdirectories per package level
+FILES_PER_DIR = 20
+DIRS_PER_LEVEL = 8
+
+# Large files are bigger than the content cache's per-file limit, so the
+# tools take their mmap/streaming paths on them
+LARGE_FILE_BYTES = 8 << 20
+MAX_LARGE_FILES = 8
+
+# Identifier searched for by the find benchmark; appears in about 1 in 10 modules
+NEEDLE = "handle_request"
+
+_WORDS = (
+    "order", "user", "item", "account", "invoice", "payment", "session", "cache",
+    "report", "event", "queue", "record", "profile", "token", "batch", "export",
+)
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(_WORDS)}_{rng.choice(_WORDS)}"
+
+
+def _python_module(rng: random.Random, module: str) -> str:
+    lines = [
+        f'"""Generated module {module}."""',
+        "",
+        "import os",
+        "from typing import Any",
+        f"from .{rng.choice(_WORDS)} import {rng.choice(_WORDS).title()}",
+        "",
+    ]
+    for _ in range(rng.randint(1, 3)):
+        class_name = "".join(word.title() for word in _name(rng).split("_"))
+        lines += [
+            "",
+            f"class {class_name}({rng.choice(('object', 'Base', 'models.Model'))}):",
+            f'    """{class_name} of the synthetic workspace."""',
+            "",
+            "    def __init__(self, value: Any = None) -> None:",
+            "        self.value = value",
+        ]
+        for _ in range(rng.randint(1, 4)):
+            lines += [
+                "",
+                f"    def {_name(rng)}(self, data: dict) -> Any:",
+                f"        # TODO: validate {rng.choice(_WORDS)} before use",
+                f"        result = data.get({rng.choice(_WORDS)!r}, self.value)",
+                "        if result is None:",
+                f"            raise ValueError('missing {rng.choice(_WORDS)}')",
+                "        return result",
+            ]
+    for _ in range(rng.randint(1, 3)):
+        function_name = NEEDLE if rng.random() < 0.1 else _name(rng)
+        lines += [
+            "",
+            "",
+            f"def {function_name}(request, *args, **kwargs):",
+            f"    path = os.path.join({rng.choice(_WORDS)!r}, str(request))",
+            "    return {'path': path, 'args': args, **kwargs}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def _typescript_module(rng: random.Random, module: str) -> str:
+    name = "".join(word.title() for word in _name(rng).split("_"))
+    return (
+        f"// Generated module {module}\n"
+        f"import {{ {rng.choice(_WORDS).title()} }} from './{rng.choice(_WORDS)}';\n\n"
+        f"export interface {name}Props {{\n  id: string;\n  {rng.choice(_WORDS)}: number;\n}}\n\n"
+        f"export function {rng.choice(_WORDS)}{name}(props: {name}Props): string {{\n"
+        f"  // TODO: handle missing {rng.choice(_WORDS)}\n"
+        "  return `${props.id}`;\n}\n"
+    )
+
+
+def _javascript_module(rng: random.Random, module: str) -> str:
+    return (
+        f"'use strict';\n// {module}\n"
+        f"module.exports = function {_name(rng)}(a, b) {{\n"
+        f"  var {rng.choice(_WORDS)} = a || {{}};\n"
+        "  return Object.assign({}, a, b);\n};\n"
+    )
+
+
+def _markdown(rng: random.Random, title: str) -> str:
+    paragraphs = [" ".join(rng.choice(_WORDS) for _ in range(40)) for _ in range(rng.randint(2, 6))]
+    return f"# {title}\n\n" + "\n\n".join(paragraphs) + "\n"
+
+
+def _binary(rng: random.Random) -> bytes:
+    # PNG signature followed by incompressible bytes with NULs
+    return b"\x89PNG\r\n\x1a\n" + rng.randbytes(rng.randint(4 << 10, 64 << 10))
+
+
+def _large_text(rng: random.Random, size: int) -> bytes:
+    line = b"2024-01-01T00:00:00Z INFO request handled path=/api/orders status=200 duration_ms=12\n"
+    body = line * (size // len(line))
+    # Something to find near the end
+    return body + f"2024-01-01T23:59:59Z ERROR {NEEDLE} failed: {rng.random()}\n".encode()
+
+
+def _write(path: str, content: str | bytes) -> None:
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _tree_dirs(base: str, count: int) -> list[str]:
+    """Return ``count`` leaf-ish directories under ``base``, nested DIRS_PER_LEVEL wide."""
+    dirs = []
+    for index in range(count):
+        parts = []
+        remaining = index
+        while True:
+            parts.append(f"d{remaining % DIRS_PER_LEVEL}")
+            remaining //= DIRS_PER_LEVEL
+            if remaining == 0:
+                break
+        dirs.append(os.path.join(base, *reversed(parts)))
+    return dirs
+
+
+def read_workspace_marker(root: str) -> dict[str, Any] | None:
+    """Return the description of the generated workspace at ``root``, or None."""
+    try:
+        with open(os.path.join(root, WORKSPACE_MARKER), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def generate_workspace(root: str, files: int, seed: int = 0) -> dict[str, Any]:
+    """Write a synthetic workspace of about ``files`` files into ``root``.
+
+    The layout mimics a real monorepo: Python and TypeScript packages under
+    ``src/`` whose packages carry nested ``.gitignore`` files (ignoring their
+    ``generated/`` directories and ``*.pyc``), a ``node_modules/`` heavy
+    directory ignored from the root ``.gitignore``, Markdown docs, binary
+    assets and a few large files.  Contents are derived from ``seed`` so the
+    same arguments always produce the same workspace.  A workspace already
+    generated at ``root`` with the same arguments is reused as is.
+
+    Returns:
+        The workspace description also stored in ``WORKSPACE_MARKER``.
+
+    Raises:
+        ValueError: If ``files`` < 1 or ``root`` is a non-empty directory that
+            is not a generated workspace.
+    """
+    if files < 1:
+        raise ValueError("files must be >= 1")
+    root = os.path.abspath(root)
+    spec = {"layout_version": WORKSPACE_LAYOUT_VERSION, "files": files, "seed": seed}
+    marker = read_workspace_marker(root)
+    if marker is not None and all(marker.get(key) == value for key, value in spec.items()):
+        return marker
+    if marker is None and os.path.isdir(root) and os.listdir(root):
+        raise ValueError(f"{root} is not empty and is not a generated benchmark workspace")
+    if marker is not None:
+        raise ValueError(f"{root} holds a workspace generated with other arguments; remove it first")
+
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    counts = dict.fromkeys(("root", "gitignore", "source", "node_modules", "generated", "docs", "binary", "large"), 0)
+    large_files = min(MAX_LARGE_FILES, max(1, files // 20_000))
+    node_modules = int(files * NODE_MODULES_SHARE)
+    generated = int(files * GENERATED_SHARE)
+    docs = int(files * DOCS_SHARE)
+    binaries = int(files * BINARY_SHARE)
+    # Leaves room for the root files and one .gitignore per source directory
+    source = max(0, files - node_modules - generated - docs - binaries - large_files - 4)
+    source -= source // (FILES_PER_DIR + 1)
+
+    _write(os.path.join(root, ".gitignore"), "node_modules/\nbuild/\n*.log\n.venv/\n")
+    _write(os.path.join(root, "README.md"), _markdown(rng, "Synthetic benchmark workspace"))
+    _write(os.path.join(root, "pyproject.toml"), '[project]\nname = "bench-workspace"\ndependencies = ["django>=4.2"]\n')
+    _write(os.path.join(root, "package.json"), json.dumps({"name": "bench-workspace", "dependencies": {"react": "^18"}}))
+    counts["root"] = 3
+    counts["gitignore"] = 1
+
+    # Source packages, each with its own .gitignore
+    source_dirs = _tree_dirs(os.path.join(root, "src"), max(1, -(-source // FILES_PER_DIR)))
+    written = 0
+    for directory in source_dirs:
+        os.makedirs(directory, exist_ok=True)
+        _write(os.path.join(directory, ".gitignore"), "generated/\n*.pyc\n")
+        counts["gitignore"] += 1
+        for index in range(min(FILES_PER_DIR, source - written)):
+            if index % 5 == 4:
+                _write(os.path.join(directory, f"view_{index}.ts"), _typescript_module(rng, f"{directory}/view_{index}"))
+            else:
+                _write(os.path.join(directory, f"module_{index}.py"), _python_module(rng, f"{directory}/module_{index}"))
+            written += 1
+        counts["source"] = written
+        if written >= source:
+            break
+
+    # Ignored by the nested .gitignore files: generated/ directories and .pyc files
+    for index in range(generated):
+        directory = source_dirs[index % len(source_dirs)]
+        if index % 4 == 3:
+            _write(os.path.join(directory, f"module_{index}.pyc"), rng.randbytes(256))
+        else:
+            generated_dir = os.path.join(directory, "generated")
+            os.makedirs(generated_dir, exist_ok=True)
+            _write(os.path.join(generated_dir, f"schema_{index}.py"), _python_module(rng, f"generated/schema_{index}"))
+        counts["generated"] += 1
+
+    # node_modules: many small packages with nested lib/ directories
+    for index in range(node_modules):
+        package_dir = os.path.join(root, "node_modules", f"pkg-{index // 50}", "lib", f"part{index % 5}")
+        os.makedirs(package_dir, exist_ok=True)
+        _write(os.path.join(package_dir, f"index{index % 50}.js"), _javascript_module(rng, f"pkg-{index // 50}"))
+        counts["node_modules"] += 1
+
+    for index in range(docs):
+        docs_dir = os.path.join(root, "docs", f"section{index // FILES_PER_DIR}")
+        os.makedirs(docs_dir, exist_ok=True)
+        _write(os.path.join(docs_dir, f"page_{index}.md"), _markdown(rng, f"Page {index}"))
+        counts["docs"] += 1
+
+    for index in range(binaries):
+        assets_dir = os.path.join(root, "assets", f"img{index // 100}")
+        os.makedirs(assets_dir, exist_ok=True)
+        _write(os.path.join(assets_dir, f"image_{index}.png"), _binary(rng))
+        counts["binary"] += 1
+
+    # Large files: one tracked data module, the rest ignored logs
+    data_dir = os.path.join(root, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    for index in range(large_files):
+        name = "fixtures.py" if index == 0 else f"server_{index}.log"
+        if index == 0:
+            content = "RECORDS = [\n" + "".join(
+                f"    {{'id': {i}, 'kind': {rng.choice(_WORDS)!r}}},\n" for i in range(LARGE_FILE_BYTES // 40)
+            ) + "]\n"
+            _write(os.path.join(data_dir, name), content)
+        else:
+            _write(os.path.join(data_dir, name), _large_text(rng, LARGE_FILE_BYTES))
+        counts["large"] += 1
+
+    description = {
+        **spec,
+        "root": root,
+        "counts": counts,
+        "total_files": sum(counts.values()),
+        "sample_source_dir": os.path.relpath(source_dirs[0], root).replace(os.sep, "/"),
+    }
+    _write(os.path.join(root, WORKSPACE_MARKER), json.dumps(description, indent=2) + "\n")
+    return description
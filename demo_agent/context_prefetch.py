@@ -0,0 +1,160 @@
+"""Resolve a review target's local imports ahead of the review and collect their definitions."""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Iterable
+
+from .tools._line_index import read_line_range
+from .tools._shared import file_content_cache, is_valid_path, logger
+from .tools._symbol_index import Definition, Import, SymbolIndex, get_symbol_index
+
+# UTF-8 bytes of prefetched definitions added to the review prompt, truncation markers included
+PREFETCH_BUDGET_BYTES = 12000
+
+# Import levels followed from the target: 1 = its own imports, 2 = also the
+# imports those definitions use
+PREFETCH_MAX_DEPTH = 2
+
+
+def _uses(text: str, local_name: str) -> bool:
+    return re.search(rf"(?<![\w.]){re.escape(local_name)}\b", text) is not None
+
+
+def _attributes(text: str, local_name: str) -> list[str]:
+    # module.Attribute references, e.g. models.Order for "from . import models"
+    return list(dict.fromkeys(re.findall(rf"(?<![\w.]){re.escape(local_name)}\.([A-Za-z_]\w*)", text)))
+
+
+def _module_definitions(index: SymbolIndex, rel_path: str, names: Iterable[str]) -> list[Definition]:
+    wanted = set(names)
+    return [definition for definition in index.definitions_in(rel_path) if definition.qualname in wanted]
+
+
+def _referenced_definitions(index: SymbolIndex, rel_path: str, imports: list[Import], text: str) -> list[Definition]:
+    """Return the workspace definitions that ``text`` (code from ``rel_path``) uses through ``imports``."""
+    found: list[Definition] = []
+    for imported in imports:
+        if not imported.names:
+            # import package.module [as alias]
+            module_path = index.resolve_module(imported.module, rel_path)
+            if module_path is not None:
+                found.extend(_module_definitions(index, module_path, _attributes(text, imported.alias or imported.module)))
+            continue
+
+        for name, alias in imported.names:
+            local_name = alias or name
+            if name == "*" or not _uses(text, local_name):
+                continue
+            resolution = index.resolve_name(imported.module, rel_path, name)
+            if resolution.status == "definition":
+                found.extend(resolution.definitions)
+            elif resolution.status == "module":
+                found.extend(_module_definitions(index, resolution.path, _attributes(text, local_name)))
+    return found
+
+
+def prefetch_context(
+    target: str,
+    workspace_root: str | None = None,
+    budget_bytes: int = PREFETCH_BUDGET_BYTES,
+    max_depth: int = PREFETCH_MAX_DEPTH,
+) -> str:
+    """Return the source of the workspace definitions ``target`` depends on.
+
+    The target's imports are resolved with the symbol index and only the
+    classes and functions the target actually references are kept.  With
+    ``max_depth`` 2, the imports those definitions use, and base classes
+    defined next to them, are followed one level further.  Definitions are
+    added breadth-first until ``budget_bytes`` UTF-8 bytes of output are
+    spent; a definition that does not fit is cut at a line boundary and ends
+    with a truncation marker that counts against the budget.
+
+    Returns:
+        Definitions as ``# path:start-end (kind name)`` headed blocks, or an
+        empty string for non-Python targets or when nothing resolves.
+    """
+    workspace_root = os.path.abspath(workspace_root or os.getcwd())
+    is_valid, abs_target = is_valid_path(os.path.join(workspace_root, target), workspace_root)
+    if not is_valid or budget_bytes <= 0:
+        return ""
+    rel_target = os.path.relpath(abs_target, workspace_root).replace(os.sep, "/")
+
+    index = get_symbol_index(workspace_root)
+    imports = index.imports_of(rel_target)
+    if not imports:
+        return ""
+    try:
+        target_text = file_content_cache.read_bytes(abs_target).decode("utf-8", errors="ignore")
+    except OSError:
+        return ""
+
+    seen: set[tuple[str, int]] = set()
+    # Enclosing spans already included; methods inside them are skipped
+    included: list[tuple[str, int, int]] = []
+    level = _referenced_definitions(index, rel_target, imports, target_text)
+    blocks: list[str] = []
+    remaining = budget_bytes
+
+    for depth in range(1, max_depth + 1):
+        next_level: list[Definition] = []
+        for definition in level:
+            key = (definition.path, definition.start_line)
+            if definition.path == rel_target or key in seen or remaining <= 0:
+                continue
+            seen.add(key)
+            if any(
+                path == definition.path and start <= definition.start_line and definition.end_line <= end
+                for path, start, end in included
+            ):
+                continue
+
+            try:
+                lines, _total = read_line_range(
+                    os.path.join(workspace_root, definition.path), definition.start_line, definition.end_line, "utf-8"
+                )
+            except OSError as e:
+                logger.debug(f"Could not prefetch {definition.qualname} from {definition.path}: {e}")
+                continue
+
+            header = f"# {definition.path}:{definition.start_line}-{definition.end_line} ({definition.kind} {definition.qualname})"
+            # Encoded size of the block, with the blank line separating it from the previous one
+            size = (2 if blocks else 0) + len(header.encode("utf-8"))
+            kept: list[str] = []
+            truncated = False
+            for line in lines:
+                line_size = len(line.encode("utf-8")) + 1
+                if size + line_size > remaining:
+                    truncated = True
+                    break
+                kept.append(line)
+                size += line_size
+            if truncated:
+                # Drop kept lines until the marker fits too
+                while kept:
+                    marker = f"# ... truncated after line {definition.start_line + len(kept) - 1}"
+                    if size + len(marker) + 1 <= remaining:
+                        kept.append(marker)
+                        size += len(marker) + 1
+                        break
+                    size -= len(kept.pop().encode("utf-8")) + 1
+            if not kept:
+                # Not even the first line fits
+                continue
+            blocks.append("\n".join([header] + kept))
+            remaining -= size
+            included.append((definition.path, definition.start_line, definition.end_line))
+
+            if depth < max_depth:
+                body = "\n".join(lines)
+                definition_imports = index.imports_of(definition.path) or []
+                next_level.extend(_referenced_definitions(index, definition.path, definition_imports, body))
+                # Base classes defined in the same module
+                base_names = {base.rsplit(".", 1)[-1] for base in definition.bases}
+                next_level.extend(_module_definitions(index, definition.path, base_names))
+        level = next_level
+        if not level or remaining <= 0:
+            break
+
+    return "\n\n".join(blocks)
@@ -0,0 +1,135 @@
+"""Changed files and line ranges from the local git diff."""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+
+from .tools._search import BINARY_SNIFF_BYTES
+
+# A changed line range in the new version of a file: (first line, last line), 1-based
+LineRange = tuple[int, int]
+
+# Changed ranges closer than this many lines are merged into one
+HUNK_MERGE_DISTANCE = 3
+
+_HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+class GitDiffError(RuntimeError):
+    """git could not produce the diff: it is missing, the workspace is not a repository or the ref is unknown."""
+
+
+def _run_git(args: list[str], workspace_root: str) -> str:
+    try:
+        completed = subprocess.run(
+            ["git", "-c", "core.quotePath=false", *args],
+            cwd=workspace_root,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            check=False,
+        )
+    except FileNotFoundError as e:
+        raise GitDiffError("git is not installed or not on PATH") from e
+    if completed.returncode != 0:
+        raise GitDiffError(f"git {' '.join(args)} failed: {completed.stderr.strip()}")
+    return completed.stdout
+
+
+def _merge_ranges(ranges: list[LineRange]) -> list[LineRange]:
+    merged: list[LineRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + HUNK_MERGE_DISTANCE:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_diff(diff_text: str) -> dict[str, list[LineRange]]:
+    """Parse ``git diff -U0`` output into changed line ranges per file.
+
+    Ranges refer to the new version of each file.  A hunk that only deletes
+    lines is recorded as the line the deletion follows, so the reviewer still
+    looks at that spot.  Files without hunks (binary or mode-only changes)
+    and deleted files are left out.
+
+    ``+++`` lines are file headers only between ``diff --git`` and the first
+    hunk of that file; inside a hunk they are added lines starting with ``++``.
+    """
+    changes: dict[str, list[LineRange]] = {}
+    current: list[LineRange] | None = None
+    in_header = False
+    for line in diff_text.splitlines():
+        if line.startswith("diff --git "):
+            current = None
+            in_header = True
+            continue
+        if in_header and line.startswith("+++ "):
+            path = line[4:]
+            if path != "/dev/null":
+                current = changes.setdefault(path[2:] if path.startswith("b/") else path, [])
+            continue
+        if current is None:
+            continue
+        match = _HUNK_HEADER.match(line)
+        if match:
+            in_header = False
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            if count == 0:
+                current.append((max(start, 1), max(start, 1)))
+            else:
+                current.append((start, start + count - 1))
+    return {path: _merge_ranges(ranges) for path, ranges in changes.items() if ranges}
+
+
+def _untracked_line_ranges(workspace_root: str) -> dict[str, list[LineRange]]:
+    """Return every untracked, non-ignored text file as changed from its first line to its last."""
+    changes: dict[str, list[LineRange]] = {}
+    listing = _run_git(["ls-files", "--others", "--exclude-standard", "-z"], workspace_root)
+    for path in filter(None, listing.split("\0")):
+        try:
+            with open(os.path.join(workspace_root, path), "rb") as file_obj:
+                data = file_obj.read()
+        except OSError:
+            continue
+        # Like the diff, leave out empty and binary files
+        if not data or b"\0" in data[:BINARY_SNIFF_BYTES]:
+            continue
+        line_count = data.count(b"\n") + (not data.endswith(b"\n"))
+        changes[path] = [(1, line_count)]
+    return changes
+
+
+def changed_line_ranges(base_ref: str, workspace_root: str | None = None) -> dict[str, list[LineRange]]:
+    """Return the files changed since ``base_ref`` with their changed line ranges.
+
+    The diff is taken from the merge base of ``base_ref`` and ``HEAD`` to the
+    working tree, so it covers the commits of the current branch as well as
+    uncommitted edits, but not changes that landed on ``base_ref`` since the
+    branch point.  Untracked files that are not ignored count as changed in
+    full.  Paths are relative to ``workspace_root`` and files outside it are
+    excluded.
+
+    Raises:
+        GitDiffError: If git is missing, the workspace is not a git
+            repository or ``base_ref`` does not exist.
+    """
+    workspace_root = os.path.abspath(workspace_root or os.getcwd())
+    merge_base = _run_git(["merge-base", base_ref, "HEAD"], workspace_root).strip()
+    diff_text = _run_git(
+        ["diff", "--unified=0", "--no-color", "--no-ext-diff", "--relative", "--diff-filter=d", merge_base, "--"],
+        workspace_root,
+    )
+    changes = parse_diff(diff_text)
+    changes.update(_untracked_line_ranges(workspace_root))
+    return changes
+
+
+def format_line_ranges(ranges: list[LineRange]) -> str:
+    """Format ranges for a prompt, e.g. ``"12-30, 41"``."""
+    return ", ".join(f"{start}-{end}" if end != start else str(start) for start, end in ranges)
@@ -1,12 +1,22 @@
 from agents import Agent, Runner, ModelSettings, HostedMCPTool
 from dotenv import load_dotenv
 import os
+import sys
+import argparse
 import asyncio
+from typing import AsyncIterator
 
 from demo_agent.prompt_library import language_prompts, framework_prompts
-from .tools import ls, read_files, tree, glob, ast_grep, find
+from .tools import ls, read_files, tree, glob, ast_grep, find, lookup_symbol, resolve_import
 from .models import LanguageFrameworkResult
-from .schemas import ReviewResult
+from .schemas import CompletionMode, ReviewResult, RunTiming
+from .context_prefetch import PREFETCH_BUDGET_BYTES, prefetch_context
+from .git_diff import GitDiffError, LineRange, changed_line_ranges, format_line_ranges
+from .review_cache import ReviewCache
+from .run_profiler import RunProfiler, RunReport
+from .stack_detection import EXTENSION_LANGUAGES, detect_stack
+from .tools import tool_metrics
+from .tools._shared import GlobPattern, logger, walk_workspace
 
 # Load environment variables from .env file in the project root
 load_dotenv(dotenv_path=os.path.join(os.getcwd(), ".env"))
@@ -62,55 +72,370 @@ review_agent = Agent(
         "   - Database models referenced in the target file\n"
         "   - Utility functions called from the target file\n"
         "   - Parent classes or interfaces\n"
-        "4. Use ast_grep to find specific patterns instead of reading entire files\n"
-        "5. When reading large files, use max_lines_per_file parameter (e.g., 200 lines)\n"
-        "6. Use ls or find or glob if necessary for finding a specific file or snippets of code\n"
+        "4. Use resolve_import on the target file to locate everything it imports, and lookup_symbol to "
+        "find a model, class or function by name, instead of searching for them with find or glob\n"
+        "5. Use ast_grep to find specific patterns instead of reading entire files\n"
+        "6. When reading large files, use max_lines_per_file parameter (e.g., 200 lines), or start_line/end_line "
+        "to read just the lines around a match reported by ast_grep or find\n"
+        "7. Use ls or find or glob if necessary for finding a specific file or snippets of code\n"
         "Review focus: database schema, queries, and performance architecture.\n"
         "Only suggest improvements that would be helpful and necessary for an engineer."
     ),
     output_type=ReviewResult,
-    tools=[read_files, ast_grep, glob, find, ls, context7_mcp_server],
+    tools=[read_files, lookup_symbol, resolve_import, ast_grep, glob, find, ls, context7_mcp_server],
     model_settings=ModelSettings(
         parallel_tool_calls=True,
     ),
 
 )
 
-async def main():
-    print("Hello from demo-agent!")
+# Reviewed when no targets are given on the command line
+DEFAULT_TARGET = "privybox/activity/views.py"
 
-    # Step 1: Detect language and framework
-    print("Step 1: Detecting language and framework...")
+# Reviews run at the same time unless --concurrency says otherwise
+DEFAULT_REVIEW_CONCURRENCY = 4
+
+
+async def detect_workspace_stack() -> tuple[LanguageFrameworkResult, RunTiming | None]:
+    """Identify the workspace stack locally, falling back to the agent when unsure.
+
+    Returns:
+        Tuple of (stack, timing of the agent run or None when it was not needed).
+    """
+    stack = detect_stack(os.getcwd())
+    if stack.is_confident:
+        print(f"Detected from manifests (confidence {stack.confidence:.2f}): {'; '.join(stack.evidence)}")
+        return stack, None
+
+    # Ambiguous workspace: let the agent look, starting from what was found locally
+    profiler = RunProfiler()
     lang_framework_result = await Runner.run(
         starting_agent=stack_detection_agent,
-        input="Identify the programming language and framework of this codebase. Be quick and efficient.",
+        input=(
+            "Identify the programming language and framework of this codebase. Be quick and efficient.\n"
+            f"Local scan (confidence {stack.confidence:.2f}, may be wrong): "
+            f"language={stack.language}, framework={stack.framework}; {'; '.join(stack.evidence)}"
+        ),
+        hooks=profiler,
     )
+    return lang_framework_result.final_output, profiler.finish()
 
-    print(f"Detected: {lang_framework_result.final_output.language}, {lang_framework_result.final_output.framework}")
 
+def resolve_targets(targets: list[str]) -> list[str]:
+    """Expand glob targets against the workspace, keeping literal paths as given.
 
-    review_agent_result = await Runner.run(
-        starting_agent=review_agent,
-        input=(
-            f"Language: {lang_framework_result.final_output.language}\n"
-            f"Framework: {lang_framework_result.final_output.framework}\n"
-            f"Target file: privybox/activity/views.py\n"
+    Glob matches skip gitignored paths and are sorted; duplicates are dropped
+    while keeping the first occurrence's position.
+    """
+    workspace_root = os.getcwd()
+    resolved: list[str] = []
+    for target in targets:
+        if any(char in target for char in "*?["):
+            matches = sorted(rel_path for rel_path, _entry in walk_workspace(target, workspace_root))
+            if not matches:
+                print(f"Warning: no files match {target!r}")
+            resolved.extend(matches)
+        else:
+            resolved.append(os.path.relpath(os.path.join(workspace_root, target), workspace_root))
+    return list(dict.fromkeys(resolved))
+
+
+def resolve_diff_targets(base_ref: str, targets: list[str]) -> dict[str, list[LineRange]]:
+    """Return the files changed since ``base_ref`` that should be reviewed.
+
+    With ``targets``, changed files are kept when they equal one of them or
+    match one as a glob; otherwise every changed source file is kept (files
+    whose extension maps to a known language).
+
+    Raises:
+        GitDiffError: If git cannot produce the diff.
+    """
+    changes = changed_line_ranges(base_ref, os.getcwd())
+    if targets:
+        patterns = [GlobPattern(target) for target in targets]
+        literals = {os.path.normpath(target) for target in targets}
+        return {
+            path: ranges
+            for path, ranges in changes.items()
+            if path in literals or any(pattern.match_path(path) for pattern in patterns)
+        }
+    return {
+        path: ranges
+        for path, ranges in changes.items()
+        if os.path.splitext(path)[1].lower() in EXTENSION_LANGUAGES
+    }
+
+
+async def review_file(
+    target: str,
+    stack: LanguageFrameworkResult,
+    line_ranges: list[LineRange] | None = None,
+    context: str = "",
+) -> ReviewResult:
+    """Run the review agent on one file; failures become an ERROR result.
+
+    The result's ``timing`` and ``tokens_used`` come from the run's profiler.
+    With ``line_ranges`` the review is scoped to those changed lines.
+    ``context`` holds prefetched definitions the target depends on and is
+    included in the first prompt so they need not be looked up.
+    """
+    if line_ranges:
+        task = (
+            f"Changed lines: {format_line_ranges(line_ranges)}\n"
+            f"Task: Review ONLY the changed lines of this file for database performance issues.\n"
+            f"Read just the changed lines plus a few lines around them with start_line/end_line, "
+            f"and only report issues in or caused by the changed code."
+        )
+    else:
+        task = (
             f"Task: Review this specific file for database performance issues.\n"
             f"Start by reading ONLY this file, then identify what additional context you need."
-        ),
-        max_turns=60
-    )
+        )
+    if context:
+        task = (
+            f"Prefetched context - definitions this file imports, resolved from the workspace "
+            f"(do not look these up or read them again):\n"
+            f"```\n{context}\n```\n"
+            f"{task}"
+        )
+    profiler = RunProfiler()
+    try:
+        review_agent_result = await Runner.run(
+            starting_agent=review_agent,
+            input=(
+                f"Language: {stack.language}\n"
+                f"Framework: {stack.framework}\n"
+                f"Target file: {target}\n"
+                f"{task}"
+            ),
+            max_turns=60,
+            hooks=profiler,
+        )
+        result = review_agent_result.final_output
+    except Exception as e:
+        result = ReviewResult(
+            target_file=target,
+            completion_status=CompletionMode.ERROR,
+            summary="Review did not complete.",
+            error_message=f"{type(e).__name__}: {e}",
+        )
+    result.timing = profiler.finish()
+    result.tokens_used = result.timing.total_tokens
+    return result
+
 
-    print(f"Review: {review_agent_result.final_output}")
+async def review_files(
+    targets: list[str],
+    stack: LanguageFrameworkResult,
+    concurrency: int = DEFAULT_REVIEW_CONCURRENCY,
+    cache: ReviewCache | None = None,
+    changed_lines: dict[str, list[LineRange]] | None = None,
+    prefetch_bytes: int = PREFETCH_BUDGET_BYTES,
+) -> AsyncIterator[tuple[str, ReviewResult, bool]]:
+    """Review ``targets`` concurrently, yielding ``(target, result, cached)`` as each finishes.
 
+    At most ``concurrency`` reviews are in flight at once, so a large target
+    list does not exceed model rate limits or open hundreds of runs together.
+    With a ``cache``, targets whose inputs are unchanged are answered from it
+    without a model call, and new complete reviews are stored.
+    ``changed_lines`` scopes each target's review to its changed line ranges.
+    Up to ``prefetch_bytes`` of the definitions each target imports are put
+    in its first prompt (0 disables prefetching).  A target whose prefetch
+    fails is reviewed without that context, and cache failures only skip
+    the cache.
+    """
+    workspace_root = os.getcwd()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
 
+    async def bounded_review(target: str) -> tuple[str, ReviewResult, bool]:
+        line_ranges = (changed_lines or {}).get(target)
+        async with semaphore:
+            try:
+                context = await asyncio.to_thread(prefetch_context, target, workspace_root, prefetch_bytes)
+            except Exception as e:
+                logger.warning(f"Could not prefetch context for {target}: {e}")
+                context = ""
+            # Diff scoping and the prefetched definitions both change the review
+            scope = (format_line_ranges(line_ranges) if line_ranges else "") + "\n" + context
+            if cache is not None:
+                try:
+                    cached = await asyncio.to_thread(cache.get, target, stack, review_agent, scope)
+                except Exception as e:
+                    logger.warning(f"Could not read the cached review of {target}: {e}")
+                    cached = None
+                if cached is not None:
+                    return target, cached, True
+            result = await review_file(target, stack, line_ranges, context)
+        if cache is not None:
+            try:
+                await asyncio.to_thread(cache.put, target, stack, review_agent, result, scope)
+            except Exception as e:
+                logger.warning(f"Could not store the review of {target} in the cache: {e}")
+        return target, result, False
 
+    tasks = [asyncio.create_task(bounded_review(target)) for target in targets]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
+async def main(
+    targets: list[str] | None = None,
+    concurrency: int = DEFAULT_REVIEW_CONCURRENCY,
+    output: str | None = None,
+    use_cache: bool = True,
+    diff_base: str | None = None,
+    prefetch_bytes: int = PREFETCH_BUDGET_BYTES,
+    metrics: str | None = None,
+    report: str | None = None,
+):
+    print("Hello from demo-agent!")
+    run_report = RunReport()
+
+    changed_lines = None
+    if diff_base:
+        try:
+            changed_lines = resolve_diff_targets(diff_base, targets or [])
+        except GitDiffError as e:
+            # git missing, not a repository or unknown base ref
+            sys.exit(f"code-identifier: error: {e}")
+        targets = sorted(changed_lines)
+        print(f"Reviewing changes since {diff_base}: {len(targets)} changed file(s)")
+    else:
+        targets = resolve_targets(targets or [DEFAULT_TARGET])
+    if not targets:
+        print("No files to review.")
+        return
+
+    # Step 1: Detect language and framework, once for every target
+    print("Step 1: Detecting language and framework...")
+    stack, detection_timing = await detect_workspace_stack()
+    run_report.add_stack_detection("agent" if detection_timing else "manifests", detection_timing)
+    print(f"Detected: {stack.language}, {stack.framework}")
+
+    # Step 2: Review every target; results are written as soon as each one finishes
+    print(f"Step 2: Reviewing {len(targets)} file(s), {concurrency} at a time...")
+    cache = ReviewCache(os.getcwd()) if use_cache else None
+    output_file = open(output, "a", encoding="utf-8") if output else None
+    try:
+        done = 0
+        async for target, result, cached in review_files(
+            targets, stack, concurrency, cache, changed_lines, prefetch_bytes
+        ):
+            done += 1
+            run_report.add_review(target, result, cached)
+            if output_file is not None:
+                output_file.write(result.model_dump_json() + "\n")
+                output_file.flush()
+                print(f"[{done}/{len(targets)}] {target}: {result.completion_status}, {len(result.issues_found)} issue(s)")
+            else:
+                print(f"[{done}/{len(targets)}] Review of {target}: {result}")
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    if cache is not None:
+        print(f"Review cache: {cache.hits} reused, {cache.misses} reviewed")
+    totals = run_report.totals()
+    print(
+        f"Tokens: {totals['total_tokens']} ({totals['input_tokens']} in, {totals['output_tokens']} out) "
+        f"over {totals['model_calls']} model calls; model {totals['model_seconds']:.1f}s, "
+        f"tools {totals['tool_seconds']:.1f}s"
+    )
+    if report:
+        run_report.write(report)
+        print(f"Run report written to {report}")
+    if metrics:
+        tool_metrics.write(metrics)
+        print(f"Tool metrics written to {metrics}")
+
 
 def cli():
     """CLI entry point - synchronous wrapper for the async main function"""
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(
+        prog="code-identifier",
+        description="Review files in the current workspace for database performance issues.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "environment:\n"
+            "  CODE_IDENTIFIER_CACHE_DIR           where on-disk indexes and caches are kept\n"
+            "                                      (default: $XDG_CACHE_HOME/code-identifier)\n"
+            "  CODE_IDENTIFIER_TOOL_WORKERS        tool calls run at once (default: CPUs + 4, at most 16)\n"
+            "  CODE_IDENTIFIER_AST_GREP_WORKERS    worker processes for ast_grep (default: 0, in-process)\n"
+            "  CODE_IDENTIFIER_WORKSPACE_INDEX     1 to keep a persistent index of directory listings\n"
+            "  CODE_IDENTIFIER_TRIGRAM_INDEX       1 to keep a persistent trigram index for find\n"
+            "  CODE_IDENTIFIER_WORKSPACE_SNAPSHOT  auto, inotify or poll to watch the workspace in the\n"
+            "                                      background and refresh indexes from its changes\n"
+            "                                      (default: off)"
+        ),
+    )
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        help=(
+            f"Files or glob patterns relative to the workspace (default: {DEFAULT_TARGET}); "
+            "with --diff, only changed files matching them are reviewed"
+        ),
+    )
+    parser.add_argument(
+        "-c", "--concurrency",
+        type=int,
+        default=DEFAULT_REVIEW_CONCURRENCY,
+        help=f"Maximum number of files reviewed at the same time (default: {DEFAULT_REVIEW_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Append each ReviewResult as a JSON line to this file as soon as it finishes",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Review every target even if a cached result for unchanged inputs exists",
+    )
+    parser.add_argument(
+        "--diff",
+        metavar="BASE_REF",
+        help=(
+            "Review only files changed since the merge base with BASE_REF (e.g. origin/main), "
+            "scoped to the changed lines; uncommitted changes and untracked files are included"
+        ),
+    )
+    parser.add_argument(
+        "--prefetch-bytes",
+        type=int,
+        default=PREFETCH_BUDGET_BYTES,
+        help=(
+            "Budget for the imported definitions resolved locally and added to each review's first prompt; "
+            f"0 disables prefetching (default: {PREFETCH_BUDGET_BYTES})"
+        ),
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help=(
+            "Write per-tool latency, output size and I/O metrics and shared cache stats at the end of the run: "
+            "Prometheus text for .prom/.txt files, JSON otherwise"
+        ),
+    )
+    parser.add_argument(
+        "--report",
+        metavar="PATH",
+        help="Write a JSON report of per-review token usage and model/tool timing at the end of the run",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(
+        args.targets,
+        args.concurrency,
+        args.output,
+        use_cache=not args.no_cache,
+        diff_base=args.diff,
+        prefetch_bytes=args.prefetch_bytes,
+        metrics=args.metrics,
+        report=args.report,
+    ))
 
 
 if __name__ == "__main__":
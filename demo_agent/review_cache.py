@@ -0,0 +1,154 @@
+"""Content-addressed on-disk cache of review results."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any
+
+from agents import Agent
+from agents.models import get_default_model
+
+from .models import LanguageFrameworkResult
+from .schemas import CompletionMode, ReviewResult
+from .tools._shared import get_cache_dir, hash_file, is_valid_path, logger
+from .tools._workspace_index import get_workspace_index
+
+# Bumped whenever the entry layout or the key derivation changes
+REVIEW_CACHE_VERSION = "1"
+
+
+def agent_fingerprint(agent: Agent[Any]) -> dict[str, Any]:
+    """Return everything about ``agent`` that can change its review of a file."""
+    model = agent.model if isinstance(agent.model, str) or agent.model is None else type(agent.model).__name__
+    return {
+        "instructions": agent.instructions if isinstance(agent.instructions, str) else repr(agent.instructions),
+        "model": model or get_default_model(),
+        "model_settings": agent.model_settings.to_json_dict(),
+        "tools": sorted(tool.name for tool in agent.tools),
+    }
+
+
+class ReviewCache:
+    """Reuse review results whose inputs have not changed since they were stored.
+
+    An entry is found through a key hashing the target's contents, the agent
+    configuration (instructions, model, model settings, tools) and the
+    detected stack.  Each entry also records the content hash of every file
+    the review listed in ``files_analyzed``; it is only returned while all of
+    those files still hash the same, so an edit to a model or helper the
+    review depended on invalidates it too.  Only complete reviews are stored.
+
+    Entries live under ``get_cache_dir(workspace_root)/reviews``, one JSON
+    file per key, written atomically.
+    """
+
+    def __init__(self, workspace_root: str, cache_dir: str | None = None) -> None:
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.cache_dir = cache_dir or os.path.join(get_cache_dir(self.workspace_root), "reviews")
+        self.hits = 0
+        self.misses = 0
+
+    def _resolve(self, rel_path: str) -> str | None:
+        is_valid, abs_path = is_valid_path(os.path.join(self.workspace_root, rel_path), self.workspace_root, check_gitignore=False)
+        return abs_path if is_valid else None
+
+    def _hash(self, abs_path: str | None) -> str | None:
+        if abs_path is None:
+            return None
+        # The workspace index remembers hashes across runs while files keep their size and mtime
+        index = get_workspace_index(self.workspace_root)
+        return index.content_hash(abs_path) if index is not None else hash_file(abs_path)
+
+    def _key(
+        self, target: str, target_hash: str, stack: LanguageFrameworkResult, agent: Agent[Any], scope: str
+    ) -> str:
+        payload = {
+            "version": REVIEW_CACHE_VERSION,
+            "target": target,
+            "scope": scope,
+            "target_hash": target_hash,
+            "language": str(stack.language),
+            "framework": str(stack.framework),
+            "agent": agent_fingerprint(agent),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _current_key(
+        self, target: str, stack: LanguageFrameworkResult, agent: Agent[Any], scope: str
+    ) -> str | None:
+        abs_target = self._resolve(target)
+        target_hash = self._hash(abs_target)
+        if target_hash is None:
+            return None
+        return self._key(target, target_hash, stack, agent, scope)
+
+    def get(
+        self, target: str, stack: LanguageFrameworkResult, agent: Agent[Any], scope: str = ""
+    ) -> ReviewResult | None:
+        """Return the stored review of ``target`` if none of its inputs changed.
+
+        ``scope`` distinguishes reviews of the same file with different
+        instructions, such as reviews limited to changed line ranges.
+        """
+        key = self._current_key(target, stack, agent, scope)
+        if key is None:
+            self.misses += 1
+            return None
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            for rel_path, recorded_hash in entry["dependencies"].items():
+                abs_path = self._resolve(rel_path)
+                if self._hash(abs_path) != recorded_hash:
+                    logger.debug(f"Review cache entry for {target} is stale: {rel_path} changed")
+                    self.misses += 1
+                    return None
+            result = ReviewResult.model_validate(entry["result"])
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, unreadable or from an incompatible version
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(
+        self, target: str, stack: LanguageFrameworkResult, agent: Agent[Any], result: ReviewResult, scope: str = ""
+    ) -> None:
+        """Store a complete review of ``target``; other results are ignored."""
+        if result.completion_status != CompletionMode.COMPLETE.value:
+            return
+        key = self._current_key(target, stack, agent, scope)
+        if key is None:
+            return
+
+        dependencies: dict[str, str | None] = {}
+        for analysis in result.files_analyzed:
+            rel_path = os.path.relpath(os.path.join(self.workspace_root, analysis.file_path), self.workspace_root)
+            if rel_path == os.path.normpath(target) or rel_path in dependencies:
+                continue
+            abs_path = self._resolve(rel_path)
+            if abs_path is None:
+                # Outside the workspace; cannot be tracked
+                continue
+            dependencies[rel_path] = self._hash(abs_path)
+
+        entry = {"dependencies": dependencies, "result": result.model_dump(mode="json")}
+        entry_path = self._entry_path(key)
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            # Readers never see a partially written entry
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            logger.warning(f"Could not store review of {target} in the cache: {e}")
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -0,0 +1,149 @@
+"""Per-run model/tool timing and token accounting, and the run report."""
+
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from agents import Agent, RunContextWrapper, RunHooks
+from agents.items import ModelResponse
+
+from . import __version__
+from .schemas import RunTiming, StepTiming, ToolCallTiming, ReviewResult
+
+
+class RunProfiler(RunHooks[Any]):
+    """Run hooks that time every model call and tool call of one ``Runner.run``.
+
+    Each model call starts a step; the tool calls it requests belong to that
+    step until the next model call.  Tool calls of a step may overlap, so a
+    step's ``tool_seconds`` is the wall time from the first tool starting to
+    the last one ending.  Hosted tools (MCP) run on the model side and are
+    counted as model time.  Use one profiler per run.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+        self.steps: list[StepTiming] = []
+        self._llm_started: dict[str, float] = {}
+        self._tools_started: dict[str, float] = {}
+        # Wall span of the current step's tool phase: (first start, last end)
+        self._tool_span: tuple[float, float] | None = None
+
+    def _close_tool_phase(self) -> None:
+        if self.steps and self._tool_span is not None:
+            self.steps[-1].tool_seconds = self._tool_span[1] - self._tool_span[0]
+        self._tool_span = None
+
+    async def on_llm_start(self, context: RunContextWrapper[Any], agent: Agent[Any], system_prompt: Any, input_items: Any) -> None:
+        self._close_tool_phase()
+        self._llm_started[agent.name] = time.perf_counter()
+
+    async def on_llm_end(self, context: RunContextWrapper[Any], agent: Agent[Any], response: ModelResponse) -> None:
+        started = self._llm_started.pop(agent.name, None)
+        self.steps.append(StepTiming(
+            step=len(self.steps) + 1,
+            agent=agent.name,
+            model_seconds=time.perf_counter() - started if started is not None else 0.0,
+            tool_seconds=0.0,
+            input_tokens=response.usage.input_tokens,
+            output_tokens=response.usage.output_tokens,
+        ))
+
+    @staticmethod
+    def _call_key(context: RunContextWrapper[Any], tool: Any) -> str:
+        # Function tools get a ToolContext carrying the call id
+        return getattr(context, "tool_call_id", None) or getattr(tool, "name", type(tool).__name__)
+
+    async def on_tool_start(self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Any) -> None:
+        now = time.perf_counter()
+        self._tools_started[self._call_key(context, tool)] = now
+        if self._tool_span is None:
+            self._tool_span = (now, now)
+
+    async def on_tool_end(self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Any, result: object) -> None:
+        now = time.perf_counter()
+        started = self._tools_started.pop(self._call_key(context, tool), now)
+        if self.steps:
+            self.steps[-1].tool_calls.append(
+                ToolCallTiming(name=getattr(tool, "name", type(tool).__name__), seconds=now - started)
+            )
+        if self._tool_span is not None:
+            self._tool_span = (self._tool_span[0], max(self._tool_span[1], now))
+
+    def finish(self) -> RunTiming:
+        """Close the run and return its timing; safe to call more than once."""
+        self._close_tool_phase()
+        if self.finished is None:
+            self.finished = time.perf_counter()
+        input_tokens = sum(step.input_tokens for step in self.steps)
+        output_tokens = sum(step.output_tokens for step in self.steps)
+        return RunTiming(
+            wall_seconds=self.finished - self.started,
+            model_seconds=sum(step.model_seconds for step in self.steps),
+            tool_seconds=sum(step.tool_seconds for step in self.steps),
+            model_calls=len(self.steps),
+            tool_calls=sum(len(step.tool_calls) for step in self.steps),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            steps=list(self.steps),
+        )
+
+
+# Totals reported per run, summed from every profiled agent run
+_TOTAL_FIELDS = ("model_seconds", "tool_seconds", "model_calls", "tool_calls", "input_tokens", "output_tokens", "total_tokens")
+
+
+class RunReport:
+    """Machine-readable summary of one code-identifier run.
+
+    Collects the stack detection and every review with its timing, and
+    totals them so cost and latency can be compared across versions.
+    Reviews answered from the cache are listed but not counted in totals.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.stack_detection: dict[str, Any] | None = None
+        self.reviews: list[dict[str, Any]] = []
+
+    def add_stack_detection(self, source: str, timing: RunTiming | None) -> None:
+        self.stack_detection = {"source": source, "timing": timing.model_dump() if timing else None}
+
+    def add_review(self, target: str, result: ReviewResult, cached: bool) -> None:
+        self.reviews.append({
+            "target": target,
+            "status": result.completion_status,
+            "cached": cached,
+            "issues": len(result.issues_found),
+            "tokens_used": result.tokens_used,
+            "timing": result.timing.model_dump() if result.timing else None,
+        })
+
+    def totals(self) -> dict[str, float]:
+        timings = [review["timing"] for review in self.reviews if review["timing"] and not review["cached"]]
+        if self.stack_detection and self.stack_detection["timing"]:
+            timings.append(self.stack_detection["timing"])
+        return {field: sum(timing[field] for timing in timings) for field in _TOTAL_FIELDS}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": __version__,
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": time.perf_counter() - self._started,
+            "reviews_run": sum(not review["cached"] for review in self.reviews),
+            "reviews_cached": sum(review["cached"] for review in self.reviews),
+            "totals": self.totals(),
+            "stack_detection": self.stack_detection,
+            "reviews": self.reviews,
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
 from typing import List, Optional
 from enum import Enum
 
@@ -51,6 +52,33 @@ class FileAnalysis(BaseModel):
     relevant_patterns_found: List[str] = Field(default_factory=list)
 
 
+class ToolCallTiming(BaseModel):
+    name: str
+    seconds: float
+
+
+class StepTiming(BaseModel):
+    step: int
+    agent: str
+    model_seconds: float = Field(..., description="Time waiting for the model response of this step")
+    tool_seconds: float = Field(..., description="Wall time of the tool calls the step requested")
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: List[ToolCallTiming] = Field(default_factory=list)
+
+
+class RunTiming(BaseModel):
+    wall_seconds: float
+    model_seconds: float
+    tool_seconds: float
+    model_calls: int = 0
+    tool_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    steps: List[StepTiming] = Field(default_factory=list)
+
+
 class ReviewResult(BaseModel):
     target_file: str
     completion_status: CompletionMode
@@ -60,6 +88,8 @@ class ReviewResult(BaseModel):
     summary: str = Field(..., description="Executive summary of the analysis")
     tokens_used: Optional[int] = None
     error_message: Optional[str] = None
+    # Filled in by the run profiler, never by the model
+    timing: SkipJsonSchema[Optional[RunTiming]] = None
 
     class Config:
         use_enum_values = True
\ No newline at end of file
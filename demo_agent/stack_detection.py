@@ -0,0 +1,297 @@
+"""Deterministic language and framework detection from manifests and file extensions."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import tomllib
+from collections import Counter
+from typing import Iterable, List
+
+from pydantic import Field
+
+from .enums import Framework, Language
+from .models import LanguageFrameworkResult
+from .tools._shared import logger, walk_workspace
+
+# Results at or above this confidence are used without asking the agent
+DETECTION_CONFIDENCE_THRESHOLD = 0.7
+
+# Files counted by extension; bounds the walk on very large workspaces
+MAX_SCANNED_FILES = 20000
+
+# Manifests are looked for in the workspace root and its direct subdirectories
+MAX_MANIFEST_DEPTH = 1
+
+# Score added to every language a manifest declares, on top of its file share
+MANIFEST_WEIGHT = 0.5
+
+EXTENSION_LANGUAGES = {
+    ".py": Language.PYTHON,
+    ".js": Language.JAVASCRIPT,
+    ".jsx": Language.JAVASCRIPT,
+    ".mjs": Language.JAVASCRIPT,
+    ".cjs": Language.JAVASCRIPT,
+    ".ts": Language.TYPESCRIPT,
+    ".tsx": Language.TYPESCRIPT,
+    ".go": Language.GO,
+    ".java": Language.JAVA,
+    ".c": Language.C,
+    ".h": Language.C,
+    ".cpp": Language.CPP,
+    ".cc": Language.CPP,
+    ".cxx": Language.CPP,
+    ".hpp": Language.CPP,
+    ".cs": Language.CSHARP,
+    ".rb": Language.RUBY,
+    ".php": Language.PHP,
+    ".swift": Language.SWIFT,
+    ".kt": Language.KOTLIN,
+    ".kts": Language.KOTLIN,
+    ".rs": Language.RUST,
+}
+
+# Dependency name -> framework, per manifest language.  Order matters: when
+# several match, the first listed wins.
+MANIFEST_FRAMEWORKS = {
+    Language.PYTHON: {
+        "django": Framework.DJANGO,
+        "fastapi": Framework.FASTAPI,
+        "flask": Framework.FLASK,
+    },
+    Language.JAVASCRIPT: {
+        "@nestjs/core": Framework.NESTJS,
+        "next": Framework.NEXTJS,
+        "@angular/core": Framework.ANGULAR,
+        "vue": Framework.VUE,
+        "react": Framework.REACT,
+        "express": Framework.EXPRESS,
+    },
+    Language.GO: {
+        "github.com/gin-gonic/gin": Framework.GIN,
+    },
+    Language.JAVA: {
+        "spring-boot-starter-parent": Framework.SPRING_BOOT,
+        "spring-boot-starter": Framework.SPRING_BOOT,
+        "spring-boot-starter-web": Framework.SPRING_BOOT,
+        "spring-boot": Framework.SPRING_BOOT,
+    },
+    Language.PHP: {
+        "laravel/framework": Framework.LARAVEL,
+    },
+    Language.RUBY: {
+        "rails": Framework.RUBY_ON_RAILS,
+    },
+}
+
+# Frameworks built on top of another one; the base is not a competing answer
+IMPLIED_FRAMEWORKS = {
+    Framework.NEXTJS: {Framework.REACT},
+    Framework.NESTJS: {Framework.EXPRESS},
+}
+
+_REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_GEMFILE_GEM = re.compile(r"^\s*gem\s+['\"]([^'\"]+)['\"]", re.MULTILINE)
+_GO_MODULE = re.compile(r"^\s*(?:require\s+)?([\w.\-]+(?:/[\w.\-]+)+)\s+v", re.MULTILINE)
+_POM_ARTIFACT = re.compile(r"<artifactId>\s*([^<\s]+)\s*</artifactId>")
+
+
+class DetectedStack(LanguageFrameworkResult):
+    """A :class:`LanguageFrameworkResult` with how sure the local detector is."""
+
+    confidence: float = Field(0.0, description="0-1 confidence in the language and framework")
+    evidence: List[str] = Field(default_factory=list, description="Manifests and file counts the result is based on")
+
+    @property
+    def is_confident(self) -> bool:
+        return self.confidence >= DETECTION_CONFIDENCE_THRESHOLD
+
+
+def _normalize(name: str) -> str:
+    return name.strip().lower().replace("_", "-")
+
+
+def _requirement_names(lines: Iterable[str]) -> set[str]:
+    names = set()
+    for line in lines:
+        line = line.split("#", 1)[0]
+        if line.lstrip().startswith("-"):
+            # Options such as -r other.txt or -e git+https://...
+            continue
+        match = _REQUIREMENT_NAME.match(line)
+        if match:
+            names.add(_normalize(match.group(1)))
+    return names
+
+
+def _parse_requirements(text: str) -> tuple[Language, set[str]]:
+    return Language.PYTHON, _requirement_names(text.splitlines())
+
+
+def _parse_pyproject(text: str) -> tuple[Language, set[str]]:
+    data = tomllib.loads(text)
+    project = data.get("project", {})
+    requirements = list(project.get("dependencies", []))
+    for group in project.get("optional-dependencies", {}).values():
+        requirements.extend(group)
+    names = _requirement_names(requirements)
+
+    poetry = data.get("tool", {}).get("poetry", {})
+    names.update(_normalize(name) for name in poetry.get("dependencies", {}))
+    for group in poetry.get("group", {}).values():
+        names.update(_normalize(name) for name in group.get("dependencies", {}))
+    return Language.PYTHON, names
+
+
+def _json_dependency_names(text: str, sections: Iterable[str]) -> set[str]:
+    """Return the lowercased keys of the ``sections`` objects of a JSON manifest.
+
+    Raises:
+        ValueError: If the manifest is not valid JSON or not a JSON object.
+    """
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    names = set()
+    for section in sections:
+        dependencies = data.get(section)
+        if isinstance(dependencies, dict):
+            names.update(name.lower() for name in dependencies)
+    return names
+
+
+def _parse_package_json(text: str) -> tuple[Language, set[str]]:
+    names = _json_dependency_names(text, ("dependencies", "devDependencies", "peerDependencies"))
+    language = Language.TYPESCRIPT if "typescript" in names else Language.JAVASCRIPT
+    return language, names
+
+
+def _parse_go_mod(text: str) -> tuple[Language, set[str]]:
+    return Language.GO, {module.lower() for module in _GO_MODULE.findall(text)}
+
+
+def _parse_cargo_toml(text: str) -> tuple[Language, set[str]]:
+    return Language.RUST, {_normalize(name) for name in tomllib.loads(text).get("dependencies", {})}
+
+
+def _parse_pom_xml(text: str) -> tuple[Language, set[str]]:
+    return Language.JAVA, {artifact.lower() for artifact in _POM_ARTIFACT.findall(text)}
+
+
+def _parse_composer_json(text: str) -> tuple[Language, set[str]]:
+    return Language.PHP, _json_dependency_names(text, ("require", "require-dev"))
+
+
+def _parse_gemfile(text: str) -> tuple[Language, set[str]]:
+    return Language.RUBY, {gem.lower() for gem in _GEMFILE_GEM.findall(text)}
+
+
+MANIFEST_PARSERS = {
+    "requirements.txt": _parse_requirements,
+    "pyproject.toml": _parse_pyproject,
+    "package.json": _parse_package_json,
+    "go.mod": _parse_go_mod,
+    "Cargo.toml": _parse_cargo_toml,
+    "pom.xml": _parse_pom_xml,
+    "composer.json": _parse_composer_json,
+    "Gemfile": _parse_gemfile,
+}
+
+
+def _framework_language(language: Language) -> Language:
+    # TypeScript projects declare their frameworks in the same package.json
+    return Language.JAVASCRIPT if language == Language.TYPESCRIPT else language
+
+
+def detect_stack(workspace_root: str | None = None) -> DetectedStack:
+    """Identify the workspace's language and framework without a model call.
+
+    Source files are counted by extension and the manifests listed in
+    ``MANIFEST_PARSERS`` are read from the workspace root and its direct
+    subdirectories.  The language is the one with the highest share of source
+    files plus ``MANIFEST_WEIGHT`` when a manifest declares it; the framework
+    comes from the dependencies those manifests list.
+
+    Confidence drops when another language scores close to the winner, when no
+    manifest backs the language, or when manifests name competing frameworks.
+    Callers should fall back to the stack detection agent below
+    ``DETECTION_CONFIDENCE_THRESHOLD``.
+    """
+    workspace_root = workspace_root or os.getcwd()
+    extension_counts: Counter[Language] = Counter()
+    manifest_dependencies: dict[Language, set[str]] = {}
+    evidence: list[str] = []
+
+    # Manifests get their own shallow walk so the file cap below never hides them
+    for rel_path, entry in walk_workspace(
+        "**/*", workspace_root, descend=lambda rel_dir: rel_dir.count("/") < MAX_MANIFEST_DEPTH
+    ):
+        parser = MANIFEST_PARSERS.get(entry.name)
+        if parser is None:
+            continue
+        try:
+            with open(entry.path, "r", encoding="utf-8", errors="ignore") as f:
+                language, dependencies = parser(f.read())
+        except (OSError, ValueError, tomllib.TOMLDecodeError) as e:
+            logger.debug(f"Could not parse manifest {rel_path}: {e}")
+            continue
+        manifest_dependencies.setdefault(language, set()).update(dependencies)
+        evidence.append(f"manifest {rel_path} ({language.value})")
+
+    for scanned, (_rel_path, entry) in enumerate(walk_workspace("**/*", workspace_root)):
+        if scanned >= MAX_SCANNED_FILES:
+            evidence.append(f"stopped counting after {MAX_SCANNED_FILES} files")
+            break
+        language = EXTENSION_LANGUAGES.get(os.path.splitext(entry.name)[1].lower())
+        if language is not None:
+            extension_counts[language] += 1
+
+    total_files = sum(extension_counts.values())
+    if total_files:
+        evidence.append(
+            "source files: " + ", ".join(f"{language.value}={count}" for language, count in extension_counts.most_common(5))
+        )
+
+    # TypeScript projects usually also contain plain .js (configs, build output)
+    if Language.TYPESCRIPT in manifest_dependencies and Language.JAVASCRIPT in manifest_dependencies:
+        manifest_dependencies[Language.TYPESCRIPT] |= manifest_dependencies.pop(Language.JAVASCRIPT)
+
+    scores = {language: count / total_files for language, count in extension_counts.items()} if total_files else {}
+    for language in manifest_dependencies:
+        scores[language] = scores.get(language, 0.0) + MANIFEST_WEIGHT
+    if not scores:
+        return DetectedStack(confidence=0.0, evidence=evidence or ["no source files or manifests found"])
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    language, top_score = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    confidence = top_score / (top_score + runner_up)
+    if language not in manifest_dependencies:
+        confidence *= 0.8
+
+    framework = None
+    dependencies = manifest_dependencies.get(language, set())
+    if language == Language.JAVASCRIPT and Language.TYPESCRIPT in manifest_dependencies:
+        dependencies = manifest_dependencies[Language.TYPESCRIPT]
+    frameworks = [
+        candidate
+        for name, candidate in MANIFEST_FRAMEWORKS.get(_framework_language(language), {}).items()
+        if name in dependencies
+    ]
+    frameworks = list(dict.fromkeys(frameworks))
+    implied = set().union(*(IMPLIED_FRAMEWORKS.get(candidate, set()) for candidate in frameworks))
+    frameworks = [candidate for candidate in frameworks if candidate not in implied]
+    if frameworks:
+        framework = frameworks[0]
+        evidence.append("frameworks: " + ", ".join(candidate.value for candidate in frameworks))
+        if len(frameworks) > 1:
+            # e.g. Flask and FastAPI both listed; let the agent look at the code
+            confidence *= 0.5
+
+    return DetectedStack(
+        language=language,
+        framework=framework,
+        confidence=round(confidence, 3),
+        evidence=evidence,
+    )
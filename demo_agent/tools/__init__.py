@@ -13,6 +13,8 @@ Tools implemented:
 - ``find``: search for text across the workspace.
 - ``ast_grep``: search for AST patterns in code files using ast-grep.
 - ``tree``: render directory tree structure.
+- ``lookup_symbol``: find class, model and function definitions from a symbol index.
+- ``resolve_import``: map imports to workspace files and definitions.
 """
 
 # Import all tools
@@ -23,6 +25,14 @@ from .ast_grep import ast_grep
 from .read_files import read_files
 from .find import find
 from .tree import tree
+from .lookup_symbol import lookup_symbol
+from .resolve_import import resolve_import
+
+from ._instrumentation import instrument_tool, tool_metrics
+
+# Every tool call records latency, output size and I/O counters in tool_metrics
+for _tool in (pwd, ls, glob, read_files, find, ast_grep, tree, lookup_symbol, resolve_import):
+    instrument_tool(_tool)
 
 # Export all tools
 __all__ = [
@@ -33,4 +43,6 @@ __all__ = [
     "find",
     "ast_grep",
     "tree",
+    "lookup_symbol",
+    "resolve_import",
 ]
\ No newline at end of file
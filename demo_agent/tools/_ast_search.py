@@ -0,0 +1,239 @@
+"""Parsing and matching engine behind the ast_grep tool."""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, Sequence
+
+from ast_grep_py import SgRoot
+
+from ._instrumentation import record_io
+from ._shared import file_content_cache, logger
+from ._parse_cache import decode_source, parse_tree_cache
+from ._snapshot import stat_path
+
+# Environment variable holding the number of worker processes; unset, 0 or 1
+# keeps parsing in-process
+AST_GREP_WORKERS_ENV = "CODE_IDENTIFIER_AST_GREP_WORKERS"
+
+# Files per unit of work sent to a worker process
+AST_GREP_SHARD_SIZE = 32
+
+# A match: (1-based line, 1-based column, matched text)
+Match = tuple[int, int, str]
+
+# A query: (pattern index, pattern, match limit, required literal tokens)
+Query = tuple[int, str, int, tuple[bytes, ...]]
+
+# ast-grep metavariables: $$$, $$$ARGS, $$A, $X, $_
+_METAVARIABLE = re.compile(r"\$\$\$[A-Z0-9_]*|\$\$?[A-Z_][A-Z0-9_]*")
+
+_NOT_CACHED = object()
+
+
+def required_tokens(pattern: str) -> tuple[bytes, ...]:
+    """Return the literal word tokens every match of ``pattern`` must contain.
+
+    Metavariables (``$X``, ``$$$``, ``$$$ARGS``) are dropped and the remaining
+    identifiers, keywords and numbers are kept.  Punctuation and whitespace are
+    ignored because AST matching does not depend on formatting, so only the
+    words themselves are guaranteed to appear in a matching file.
+    """
+    literal_text = _METAVARIABLE.sub(" ", pattern)
+    return tuple(dict.fromkeys(token.encode("utf-8") for token in re.findall(r"\w+", literal_text)))
+
+
+def match_file(
+    path: str,
+    queries: Sequence[Query],
+    language: str,
+    stat_result: os.stat_result | None = None,
+) -> dict[int, list[Match] | None]:
+    """Run every query against the file at ``path`` with at most one parse.
+
+    Files whose tree is not cached are first scanned for each query's tokens
+    (see :func:`required_tokens`).  Queries missing a token are skipped, and
+    the file is not parsed at all when every query is skipped.  A query whose
+    pattern ast-grep rejects yields no matches without affecting the others.
+
+    Returns:
+        Mapping of query index to its matches (at most the query's limit), or
+        to None when the query was skipped without parsing.
+
+    Raises:
+        OSError: If the file cannot be read.
+        Exception: Whatever ast-grep raises while parsing.
+    """
+    stat_result = stat_result or stat_path(path)
+    key = (path, stat_result.st_mtime_ns, stat_result.st_size, language)
+    results: dict[int, list[Match] | None] = {}
+    root = parse_tree_cache.get(key, _NOT_CACHED)
+    if root is _NOT_CACHED:
+        data = file_content_cache.read_bytes(path, stat_result)
+        for index, _pattern, _limit, tokens in queries:
+            if not all(token in data for token in tokens):
+                results[index] = None
+        if len(results) == len(queries):
+            return results
+        parse_tree_cache.record_miss()
+        content = decode_source(data)
+        root = SgRoot(content, language) if content.strip() else None
+        parse_tree_cache.put(key, root, len(content))
+
+    root_node = root.root() if root is not None else None
+    for index, pattern, limit, _tokens in queries:
+        if index in results:
+            continue
+        matches: list[Match] = []
+        results[index] = matches
+        if root_node is None:
+            # Empty or whitespace-only file
+            continue
+        try:
+            for node in root_node.find_all(pattern=pattern):
+                if len(matches) >= limit:
+                    break
+                node_range = node.range()
+                matches.append((node_range.start.line + 1, node_range.start.column + 1, node.text()))
+        except Exception as e:
+            logger.debug(f"Could not match {pattern!r} in {path} with ast-grep: {e}")
+    return results
+
+
+def _match_file_safely(path: str, queries: Sequence[Query], language: str) -> dict[int, list[Match] | None]:
+    try:
+        return match_file(path, queries, language)
+    except (PermissionError, UnicodeDecodeError, OSError):
+        # Skip unreadable files
+        return {index: [] for index, *_rest in queries}
+    except Exception as e:
+        # Skip files that can't be parsed (e.g., binary files, syntax errors)
+        logger.debug(f"Could not parse {path} with ast-grep: {e}")
+        return {index: [] for index, *_rest in queries}
+
+
+def _match_shard(
+    shard: list[tuple[str, str]],
+    queries: Sequence[Query],
+    language: str,
+) -> list[tuple[str, dict[int, list[Match] | None]]]:
+    """Worker entry point: match every file of a shard, keeping shard order."""
+    return [(rel_path, _match_file_safely(path, queries, language)) for rel_path, path in shard]
+
+
+def ast_grep_workers() -> int:
+    """Return the configured number of ast_grep worker processes."""
+    try:
+        return max(0, int(os.getenv(AST_GREP_WORKERS_ENV, "0")))
+    except ValueError:
+        return 0
+
+
+_executor: ProcessPoolExecutor | None = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool, created on first use.
+
+    The pool outlives individual calls so worker start-up and each worker's
+    own parse-tree cache are paid for once per run.
+    """
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                # Workers fork from a server that has already imported this module
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _executor_workers = workers
+        return _executor
+
+
+def iter_file_matches(
+    files: Iterable[tuple[str, str]],
+    patterns: Sequence[str],
+    language: str,
+    max_results: int,
+) -> Iterator[tuple[str, dict[int, list[Match] | None]]]:
+    """Yield ``(key, matches)`` for each file, in input order.
+
+    All patterns are answered from a single walk and a single parse per file.
+    ``matches`` maps the index of each pattern evaluated on that file to its
+    matches, or to None when the literal-token prefilter skipped it.  Each
+    pattern has its own ``max_results`` budget and is no longer evaluated
+    once the budget is spent.
+
+    With ``CODE_IDENTIFIER_AST_GREP_WORKERS`` set above 1, files are sent in
+    shards to a process pool with at most two shards per worker in flight and
+    results are re-ordered to match the input.  Dispatch stops, and pending
+    shards are cancelled, once every budget is spent or the caller stops
+    iterating.
+
+    Args:
+        files: Iterable of (key, absolute path) pairs
+        patterns: ast-grep patterns
+        language: ast-grep language name
+        max_results: Matches per pattern after which it is no longer evaluated
+    """
+    tokens = [required_tokens(pattern) for pattern in patterns]
+    found = [0] * len(patterns)
+
+    def active_queries() -> list[Query]:
+        return [
+            (index, pattern, max_results - found[index], tokens[index])
+            for index, pattern in enumerate(patterns)
+            if found[index] < max_results
+        ]
+
+    def record(matches: dict[int, list[Match] | None]) -> dict[int, list[Match] | None]:
+        # Shards dispatched earlier may still answer patterns that are now full
+        matches = {index: result for index, result in matches.items() if found[index] < max_results}
+        for index, result in matches.items():
+            found[index] += len(result or ())
+        return matches
+
+    workers = ast_grep_workers()
+    if workers <= 1:
+        for key, path in files:
+            queries = active_queries()
+            if not queries:
+                return
+            yield key, record(_match_file_safely(path, queries, language))
+        return
+
+    executor = _get_executor(workers)
+    iterator = iter(files)
+    in_flight: list[Future[list[tuple[str, dict[int, list[Match] | None]]]]] = []
+    try:
+        while True:
+            queries = active_queries()
+            while queries and len(in_flight) < workers * 2:
+                shard = list(islice(iterator, AST_GREP_SHARD_SIZE))
+                if not shard:
+                    break
+                in_flight.append(executor.submit(_match_shard, shard, queries, language))
+            if not in_flight:
+                return
+
+            shard_results = in_flight.pop(0).result()
+            # Worker I/O is not visible here; count each file as opened once
+            record_io(files_opened=len(shard_results))
+            for key, matches in shard_results:
+                if not active_queries():
+                    return
+                yield key, record(matches)
+    finally:
+        for future in in_flight:
+            future.cancel()
@@ -0,0 +1,76 @@
+"""Shared, bounded thread pool the async tools run their blocking work on."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+TOOL_WORKERS_ENV = "CODE_IDENTIFIER_TOOL_WORKERS"
+
+# Tool calls running at once when CODE_IDENTIFIER_TOOL_WORKERS is not set;
+# further calls queue until a worker is free
+DEFAULT_TOOL_WORKERS = min(16, (os.cpu_count() or 1) + 4)
+
+
+def tool_workers() -> int:
+    """Return the configured size of the tool thread pool."""
+    try:
+        return max(1, int(os.getenv(TOOL_WORKERS_ENV, "0")) or DEFAULT_TOOL_WORKERS)
+    except ValueError:
+        return DEFAULT_TOOL_WORKERS
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Return the shared tool thread pool, created on first use.
+
+    The pool is separate from the event loop's default executor, so tool
+    calls neither starve nor are starved by other ``asyncio.to_thread`` work
+    such as the review cache.
+    """
+    global _executor, _executor_workers
+    workers = tool_workers()
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool")
+            _executor_workers = workers
+        return _executor
+
+
+async def run_blocking(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Run ``func(*args, **kwargs)`` on the tool pool without blocking the event loop.
+
+    The call runs in a copy of the caller's context, so I/O counters recorded
+    by ``record_io`` are attributed to the calling tool.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_tool_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+def offloaded(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """Turn a blocking tool function into a coroutine function run on the tool pool.
+
+    The wrapper keeps ``func``'s name, signature and docstring, so it can be
+    decorated with ``function_tool`` in its place and the tool schema does
+    not change.  Several calls made in one model turn then overlap.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run_blocking(func, *args, **kwargs)
+
+    return wrapper
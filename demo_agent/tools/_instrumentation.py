@@ -0,0 +1,245 @@
+"""Per-call instrumentation of the workspace tools."""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+from agents import FunctionTool
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Upper bounds of the output size histogram buckets, in bytes
+OUTPUT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Counters collected for every call, in the order they are reported
+CALL_COUNTERS = ("files_walked", "files_opened", "bytes_read", "cache_hits", "cache_misses")
+
+# Keys of a registered cache's stats() reported as Prometheus counters and gauges
+CACHE_COUNTERS = ("hits", "misses", "evictions")
+CACHE_GAUGES = ("entries", "bytes", "max_bytes")
+
+
+class CallStats:
+    """Counters of one tool call, shared by every thread working on it."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(CALL_COUNTERS, 0)
+        self.error: str | None = None
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                self.counters[name] += count
+
+
+_current_call: contextvars.ContextVar[CallStats | None] = contextvars.ContextVar("tool_call_stats", default=None)
+
+
+def record_io(**counts: int) -> None:
+    """Add to the counters of the tool call running in this context, if any.
+
+    Keyword names are those of ``CALL_COUNTERS``.  Outside an instrumented
+    call this is a no-op, so helpers can record unconditionally.  Work handed
+    to other threads must run in a copy of the caller's context (see
+    ``contextvars.copy_context``) to be attributed to the call.
+    """
+    stats = _current_call.get()
+    if stats is not None:
+        stats.add(**counts)
+
+
+def record_error(error: BaseException) -> None:
+    """Mark the current tool call as failed; used by the tools' error handler."""
+    stats = _current_call.get()
+    if stats is not None:
+        stats.error = type(error).__name__
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds, in the Prometheus style."""
+
+    def __init__(self, buckets: Iterable[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Return ``(le, count)`` pairs with ``"+Inf"`` last."""
+        pairs = []
+        running = 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"count": self.count, "sum": self.sum, "buckets": dict(self.cumulative())}
+
+
+class ToolMetrics:
+    """Running totals and histograms per tool name, plus the stats of the shared caches."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tools: dict[str, dict[str, Any]] = {}
+        self._caches: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def _tool(self, name: str) -> dict[str, Any]:
+        tool = self._tools.get(name)
+        if tool is None:
+            tool = self._tools[name] = {
+                "calls": 0,
+                "errors": 0,
+                "latency_seconds": Histogram(LATENCY_BUCKETS),
+                "output_bytes": Histogram(OUTPUT_SIZE_BUCKETS),
+                **dict.fromkeys(CALL_COUNTERS, 0),
+            }
+        return tool
+
+    def observe(self, name: str, seconds: float, output_bytes: int, stats: CallStats) -> None:
+        with self._lock:
+            tool = self._tool(name)
+            tool["calls"] += 1
+            tool["errors"] += stats.error is not None
+            tool["latency_seconds"].observe(seconds)
+            tool["output_bytes"].observe(output_bytes)
+            for counter, value in stats.counters.items():
+                tool[counter] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tools.clear()
+
+    def register_cache(self, name: str, stats: Callable[[], dict[str, Any]]) -> None:
+        """Report ``stats()`` of a process-wide cache under ``name`` in the output.
+
+        ``stats`` returns at least the keys of ``CACHE_COUNTERS`` and
+        ``CACHE_GAUGES``; it is called each time the metrics are read.
+        """
+        with self._lock:
+            self._caches[name] = stats
+
+    def cache_stats(self) -> dict[str, dict[str, Any]]:
+        """Return the current stats of every registered cache."""
+        with self._lock:
+            caches = sorted(self._caches.items())
+        return {name: stats() for name, stats in caches}
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return every tool's totals and histograms as plain data."""
+        with self._lock:
+            return {
+                name: {
+                    key: value.to_dict() if isinstance(value, Histogram) else value
+                    for key, value in tool.items()
+                }
+                for name, tool in sorted(self._tools.items())
+            }
+
+    def to_prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        with self._lock:
+            tools = sorted(self._tools.items())
+            for metric, help_text in (
+                ("calls", "Tool calls"),
+                ("errors", "Tool calls that failed"),
+                *((counter, f"Total {counter.replace('_', ' ')} by tool calls") for counter in CALL_COUNTERS),
+            ):
+                lines.append(f"# HELP code_identifier_tool_{metric}_total {help_text}")
+                lines.append(f"# TYPE code_identifier_tool_{metric}_total counter")
+                lines.extend(f'code_identifier_tool_{metric}_total{{tool="{name}"}} {tool[metric]}' for name, tool in tools)
+            for metric, help_text in (
+                ("latency_seconds", "Wall time of tool calls"),
+                ("output_bytes", "Size of tool call outputs"),
+            ):
+                lines.append(f"# HELP code_identifier_tool_{metric} {help_text}")
+                lines.append(f"# TYPE code_identifier_tool_{metric} histogram")
+                for name, tool in tools:
+                    histogram = tool[metric]
+                    lines.extend(
+                        f'code_identifier_tool_{metric}_bucket{{tool="{name}",le="{bound}"}} {count}'
+                        for bound, count in histogram.cumulative()
+                    )
+                    lines.append(f'code_identifier_tool_{metric}_sum{{tool="{name}"}} {histogram.sum}')
+                    lines.append(f'code_identifier_tool_{metric}_count{{tool="{name}"}} {histogram.count}')
+
+        caches = self.cache_stats()
+        for key, metric_type in (
+            *((key, "counter") for key in CACHE_COUNTERS),
+            *((key, "gauge") for key in CACHE_GAUGES),
+        ):
+            metric = f"code_identifier_cache_{key}" + ("_total" if metric_type == "counter" else "")
+            lines.append(f"# HELP {metric} Cache {key.replace('_', ' ')}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            lines.extend(f'{metric}{{cache="{name}"}} {stats[key]}' for name, stats in caches.items())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write the metrics to ``path``: Prometheus text for ``.prom``/``.txt``, JSON otherwise."""
+        if os.path.splitext(path)[1] in (".prom", ".txt"):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps({"tools": self.to_dict(), "caches": self.cache_stats()}, indent=2) + "\n"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+# Collected for every instrumented tool in the process
+tool_metrics = ToolMetrics()
+
+
+def _output_size(output: Any) -> int:
+    if isinstance(output, (bytes, bytearray)):
+        return len(output)
+    text = output if isinstance(output, str) else json.dumps(output, default=str)
+    return len(text.encode("utf-8"))
+
+
+def instrument_tool(tool: FunctionTool) -> FunctionTool:
+    """Record wall time, output size and I/O counters of every call to ``tool``.
+
+    The tool's ``on_invoke_tool`` is wrapped in place, so the same tool object
+    keeps working wherever it is already referenced.  Instrumenting a tool
+    twice has no further effect.
+    """
+    if getattr(tool.on_invoke_tool, "_instrumented", False):
+        return tool
+    invoke = tool.on_invoke_tool
+
+    async def on_invoke_tool(ctx: Any, input: str) -> Any:
+        stats = CallStats()
+        token = _current_call.set(stats)
+        start = time.perf_counter()
+        output: Any = ""
+        try:
+            output = await invoke(ctx, input)
+            return output
+        except BaseException as e:
+            stats.error = stats.error or type(e).__name__
+            raise
+        finally:
+            _current_call.reset(token)
+            tool_metrics.observe(tool.name, time.perf_counter() - start, _output_size(output), stats)
+
+    on_invoke_tool._instrumented = True  # type: ignore[attr-defined]
+    tool.on_invoke_tool = on_invoke_tool
+    return tool
@@ -0,0 +1,121 @@
+"""Cached newline-offset indexes for reading line ranges of large files."""
+
+from __future__ import annotations
+
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+from ._instrumentation import record_io
+from ._shared import file_content_cache
+from ._snapshot import stat_path
+
+# Files whose line offsets are kept in memory
+LINE_INDEX_CACHE_ENTRIES = 512
+
+# Line endings of text-mode files (universal newlines): "\r\n", "\n" or a lone "\r"
+_LINE_ENDING = re.compile(rb"\r\n?|\n")
+_TEXT_LINE_ENDING = re.compile(r"\r\n?|\n")
+
+_line_offsets: OrderedDict[tuple[str, int, int], array] = OrderedDict()
+_line_offsets_lock = threading.Lock()
+
+
+def _build_line_offsets(data: bytes | mmap.mmap, size: int) -> array:
+    """Return the byte offset of every line start, followed by ``size``.
+
+    Lines end like they do for a file opened in text mode, so offsets agree
+    with iterating ``open(path)`` and with the line numbers of parsed trees.
+    """
+    offsets = array("Q", [0])
+    if data.find(b"\r") == -1:
+        position = data.find(b"\n")
+        while position != -1 and position + 1 < size:
+            offsets.append(position + 1)
+            position = data.find(b"\n", position + 1)
+    else:
+        offsets.extend(match.end() for match in _LINE_ENDING.finditer(data) if match.end() < size)
+    offsets.append(size)
+    return offsets
+
+
+def line_offsets(path: str, stat_result: os.stat_result, data: bytes | mmap.mmap) -> array:
+    """Return the cached line-start offsets of ``path``, building them on a miss.
+
+    Offsets are keyed by ``(path, mtime_ns, size)`` so an edited file is
+    re-indexed.  Line ``n`` (1-based) spans ``offsets[n - 1]:offsets[n]``.
+    """
+    key = (path, stat_result.st_mtime_ns, stat_result.st_size)
+    with _line_offsets_lock:
+        offsets = _line_offsets.get(key)
+        if offsets is not None:
+            _line_offsets.move_to_end(key)
+            record_io(cache_hits=1)
+            return offsets
+
+    offsets = _build_line_offsets(data, stat_result.st_size)
+    with _line_offsets_lock:
+        _line_offsets[key] = offsets
+        while len(_line_offsets) > LINE_INDEX_CACHE_ENTRIES:
+            _line_offsets.popitem(last=False)
+    return offsets
+
+
+def read_line_range(path: str, start_line: int, end_line: int | None, encoding: str) -> tuple[list[str], int]:
+    """Read lines ``start_line`` to ``end_line`` (1-based, inclusive) of a file.
+
+    Small files come from the shared content cache; for larger ones only the
+    bytes of the requested lines are copied out of an ``mmap``.  The newline
+    index is built once per file version, so repeated range reads
+    cost O(range) rather than O(file).  Lines end at ``"\\n"``, ``"\\r\\n"`` or a
+    lone ``"\\r"``, as in text mode.  ``encoding`` must encode those as the
+    same ASCII bytes (see :func:`supports_line_index`).
+
+    Returns:
+        Tuple of (lines without their line endings, total lines in the file).
+        The range is clamped to the file, so the list may be shorter than
+        requested or empty.
+    """
+    stat_result = stat_path(path)
+    if stat_result.st_size == 0:
+        return [], 0
+    if stat_result.st_size <= file_content_cache.max_file_bytes:
+        chunk, total_lines = _slice_lines(path, stat_result, file_content_cache.read_bytes(path, stat_result),
+                                          start_line, end_line)
+    else:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunk, total_lines = _slice_lines(path, stat_result, data, start_line, end_line)
+        record_io(files_opened=1, bytes_read=len(chunk))
+    if not chunk:
+        return [], total_lines
+
+    lines = _TEXT_LINE_ENDING.split(chunk.decode(encoding, errors="ignore"))
+    if chunk.endswith((b"\n", b"\r")):
+        lines.pop()
+    return lines, total_lines
+
+
+def _slice_lines(
+    path: str,
+    stat_result: os.stat_result,
+    data: bytes | mmap.mmap,
+    start_line: int,
+    end_line: int | None,
+) -> tuple[bytes, int]:
+    offsets = line_offsets(path, stat_result, data)
+    total_lines = len(offsets) - 1
+    last_line = total_lines if end_line is None else min(end_line, total_lines)
+    if start_line > last_line:
+        return b"", total_lines
+    return data[offsets[start_line - 1]:offsets[last_line]], total_lines
+
+
+def supports_line_index(encoding: str) -> bool:
+    """Return whether byte-level newline offsets are valid for ``encoding``."""
+    try:
+        return "\r\n".encode(encoding) == b"\r\n"
+    except LookupError:
+        return False
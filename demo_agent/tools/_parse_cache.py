@@ -0,0 +1,110 @@
+"""In-process LRU cache of ast-grep parse trees."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from ast_grep_py import SgRoot
+
+from ._instrumentation import record_io, tool_metrics
+
+# Estimated memory held by cached parse trees
+DEFAULT_PARSE_CACHE_BYTES = 256 * 1024 * 1024
+
+# A parsed tree takes up to ~30x the size of the source it was parsed from;
+# trees are charged at that rate against the budget
+TREE_BYTES_PER_SOURCE_BYTE = 30
+
+# Cache key: (path, mtime_ns, size, language)
+CacheKey = tuple[str, int, int, str]
+
+
+def decode_source(data: bytes) -> str:
+    """Decode file bytes the way text-mode ``open(errors="ignore")`` would."""
+    content = data.decode("utf-8", errors="ignore")
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content
+
+
+class ParseTreeCache:
+    """LRU cache of ``SgRoot`` objects keyed by file identity and language.
+
+    A key is ``(path, mtime_ns, size, language)``, so an edited file simply
+    misses and its stale tree ages out.  The budget is in estimated memory:
+    each tree is charged ``TREE_BYTES_PER_SOURCE_BYTE`` times its source
+    size, and least recently used trees are evicted until the cache fits.
+
+    Callers look a tree up with :meth:`get` and call :meth:`record_miss` only
+    when they go on to parse the file, so files a caller skips without
+    parsing do not count as misses.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_PARSE_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[CacheKey, tuple[SgRoot | None, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey, default: Any = None) -> Any:
+        """Return the cached tree for ``key`` (None for blank files), or ``default``."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            record_io(cache_hits=1)
+            return cached[0]
+
+    def record_miss(self) -> None:
+        """Count a lookup that found no tree and is followed by a parse."""
+        with self._lock:
+            self.misses += 1
+        record_io(cache_misses=1)
+
+    def put(self, key: CacheKey, root: SgRoot | None, size: int) -> None:
+        """Insert the parse tree of ``size`` source bytes, evicting least recently used ones to fit."""
+        size *= TREE_BYTES_PER_SOURCE_BYTE
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (root, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _evicted_key, (_root, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached tree; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and current size, for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared by every ast_grep call in the process
+parse_tree_cache = ParseTreeCache()
+tool_metrics.register_cache("parse_tree", parse_tree_cache.stats)
@@ -0,0 +1,229 @@
+"""Parallel byte-level content search used by the find tool."""
+
+from __future__ import annotations
+
+import contextvars
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from ._instrumentation import record_io
+from ._shared import file_content_cache
+from ._snapshot import stat_path
+
+# Bytes sniffed for a NUL to decide a file is binary (same heuristic as git)
+BINARY_SNIFF_BYTES = 8000
+
+# Window lowercased at a time for case-insensitive search of mapped files
+LOWERCASE_WINDOW_BYTES = 1 << 20
+
+# Files per unit of work handed to a worker thread
+SEARCH_SHARD_SIZE = 64
+
+# Threads of the search pool all search_files calls share, and the shards
+# one call keeps in flight when max_workers is not given
+DEFAULT_SEARCH_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+Predicate = Callable[[bytes | mmap.mmap], bool]
+Key = TypeVar("Key")
+
+
+def compile_search(search_text: str, case_sensitive: bool = True, whole_word: bool = False) -> Predicate:
+    """Build a predicate that tests raw file bytes for ``search_text``.
+
+    ASCII queries are matched directly on the bytes so file contents are never
+    decoded; case-insensitive queries lowercase the bytes window by window and
+    whole-word queries only run their regex on files that contain the text.
+    Non-ASCII queries fall back to decoding the file as UTF-8 to keep Unicode
+    case folding and word boundaries.
+    """
+    flags = 0 if case_sensitive else re.IGNORECASE
+    text_pattern = re.compile(r'\b' + re.escape(search_text) + r'\b', flags)
+    if not search_text.isascii():
+        if whole_word:
+            return lambda data: bool(text_pattern.search(bytes(data).decode("utf-8", errors="ignore")))
+        if case_sensitive:
+            return lambda data: search_text in bytes(data).decode("utf-8", errors="ignore")
+        search_text_lower = search_text.lower()
+        return lambda data: search_text_lower in bytes(data).decode("utf-8", errors="ignore").lower()
+
+    needle = search_text.encode("ascii")
+    if case_sensitive:
+        contains = lambda data: data.find(needle) != -1
+    else:
+        needle_lower = needle.lower()
+        contains = lambda data: _find_lower(data, needle_lower)
+    if not whole_word:
+        return contains
+
+    # Word boundaries need a regex; only run it on files that contain the text
+    occurrence_pattern = re.compile(rb'(?=' + re.escape(needle) + rb')', flags)
+    word_pattern = re.compile(rb'\b' + re.escape(needle) + rb'\b', flags)
+    return lambda data: contains(data) and _has_word(data, len(needle), occurrence_pattern, word_pattern, text_pattern)
+
+
+def _has_word(
+    data: bytes | mmap.mmap,
+    needle_length: int,
+    occurrence_pattern: re.Pattern[bytes],
+    word_pattern: re.Pattern[bytes],
+    text_pattern: re.Pattern[str],
+) -> bool:
+    """Whole-word search with the Unicode word boundaries of ``text_pattern``.
+
+    A bytes ``\\b`` treats every non-ASCII byte as a non-word character, so it
+    only agrees with the decoded text where both neighbours of an occurrence
+    are ASCII.  Those occurrences are checked on the bytes; any other one
+    (``caf`` in ``café``) is settled by decoding the file and searching the text.
+    """
+    ambiguous = False
+    for occurrence in occurrence_pattern.finditer(data):
+        start = occurrence.start()
+        end = start + needle_length
+        if (start > 0 and data[start - 1] >= 0x80) or (end < len(data) and data[end] >= 0x80):
+            ambiguous = True
+        elif word_pattern.match(data, start):
+            return True
+    return ambiguous and text_pattern.search(bytes(data).decode("utf-8", errors="ignore")) is not None
+
+
+def _find_lower(data: bytes | mmap.mmap, needle_lower: bytes) -> bool:
+    """Case-insensitive ASCII search, lowercasing at most one window at a time."""
+    if isinstance(data, bytes):
+        return needle_lower in data.lower()
+    overlap = len(needle_lower) - 1
+    for start in range(0, len(data), LOWERCASE_WINDOW_BYTES):
+        if needle_lower in data[start:start + LOWERCASE_WINDOW_BYTES + overlap].lower():
+            return True
+    return False
+
+
+def search_file(path: str, predicate: Predicate) -> bool:
+    """Return whether the text file at ``path`` satisfies ``predicate``.
+
+    Files small enough for the shared content cache are read through it.
+    Larger files have their first ``BINARY_SNIFF_BYTES`` read and are then
+    searched through a read-only ``mmap`` so their bytes are never copied
+    into Python objects.  Files with a NUL in those first bytes are binary
+    and never match.
+    """
+    try:
+        stat_result = stat_path(path)
+        if stat_result.st_size <= file_content_cache.max_file_bytes:
+            data = file_content_cache.read_bytes(path, stat_result)
+            return b"\0" not in data[:BINARY_SNIFF_BYTES] and predicate(data)
+
+        with open(path, "rb") as file_obj:
+            head = file_obj.read(BINARY_SNIFF_BYTES)
+            if b"\0" in head:
+                return False
+            record_io(files_opened=1, bytes_read=stat_result.st_size)
+            with mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return predicate(mapped)
+    except (OSError, ValueError):
+        # Unreadable files, or files truncated between stat and mmap
+        return False
+
+
+def _search_shard(
+    shard: list[tuple[Key, str]],
+    predicate: Predicate,
+    cancelled: threading.Event,
+) -> list[Key]:
+    matched = []
+    for key, path in shard:
+        if cancelled.is_set():
+            break
+        if search_file(path, predicate):
+            matched.append(key)
+    return matched
+
+
+def _shards(files: Iterable[tuple[Key, str]], shard_size: int) -> Iterator[list[tuple[Key, str]]]:
+    iterator = iter(files)
+    while shard := list(islice(iterator, shard_size)):
+        yield shard
+
+
+_search_executor: ThreadPoolExecutor | None = None
+_search_executor_lock = threading.Lock()
+
+
+def get_search_executor() -> ThreadPoolExecutor:
+    """Return the search thread pool, created on first use.
+
+    One bounded pool serves every :func:`search_files` call, so concurrent
+    ``find`` calls queue for the same ``DEFAULT_SEARCH_WORKERS`` threads
+    instead of each starting their own.  It is separate from the tool pool,
+    whose workers wait on these searches.
+    """
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(max_workers=DEFAULT_SEARCH_WORKERS, thread_name_prefix="find")
+        return _search_executor
+
+
+def search_files(
+    files: Iterable[tuple[Key, str]],
+    predicate: Predicate,
+    *,
+    max_results: int | None = None,
+    max_workers: int | None = None,
+    shard_size: int = SEARCH_SHARD_SIZE,
+) -> list[Key]:
+    """Search many files concurrently and return the keys of those that match.
+
+    ``files`` is consumed lazily in shards of ``shard_size`` and at most two
+    shards per worker are in flight, so walking and searching overlap.  The
+    shards run on the shared pool from :func:`get_search_executor`.  Results
+    keep the input order: once the shards completed so far, taken in order,
+    hold ``max_results`` matches, the remaining work is cancelled and nothing
+    more is pulled from ``files``.
+
+    Args:
+        files: Iterable of (key, absolute path) pairs; keys are returned as-is
+        predicate: Matcher built by :func:`compile_search`
+        max_results: Stop after this many matches (default: None for unlimited)
+        max_workers: Shards searched at once, half the shards in flight
+            (default: ``DEFAULT_SEARCH_WORKERS``)
+        shard_size: Files per unit of work (default: ``SEARCH_SHARD_SIZE``)
+
+    Returns:
+        Keys of matching files in input order, at most ``max_results`` of them.
+    """
+    max_workers = max_workers or DEFAULT_SEARCH_WORKERS
+    cancelled = threading.Event()
+    shards = _shards(files, shard_size)
+    in_flight: list[Future[list[Key]]] = []
+    matches: list[Key] = []
+
+    executor = get_search_executor()
+    try:
+        while True:
+            while len(in_flight) < max_workers * 2:
+                shard = next(shards, None)
+                if shard is None:
+                    break
+                in_flight.append(executor.submit(
+                    # Run in the caller's context so I/O is attributed to its tool call
+                    contextvars.copy_context().run, _search_shard, shard, predicate, cancelled
+                ))
+            if not in_flight:
+                break
+
+            # Consume shards strictly in order so the result is deterministic
+            matches.extend(in_flight.pop(0).result())
+            if max_results is not None and len(matches) >= max_results:
+                break
+    finally:
+        # Shards still running see the flag and stop at their next file
+        cancelled.set()
+        for future in in_flight:
+            future.cancel()
+
+    return matches[:max_results] if max_results is not None else matches
@@ -2,17 +2,62 @@
 
 from __future__ import annotations
 
+import io
 import os
+import re
+import hashlib
+import fnmatch
 import logging
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, List
+from typing import IO, Any, Callable, Collection, Iterator
 
 import pathspec
 from agents import RunContextWrapper
 
+from ._instrumentation import record_error, record_io, tool_metrics
+from ._snapshot import ChangeFeed, scandir_entries, stat_path
+
 logger = logging.getLogger(__name__)
 
 
+def env_flag(name: str) -> bool:
+    """Return whether the environment variable ``name`` is set to a truthy value."""
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_cache_dir(workspace_root: str) -> str:
+    """Return the directory holding on-disk caches for ``workspace_root``.
+
+    Caches live under ``$CODE_IDENTIFIER_CACHE_DIR`` (default:
+    ``$XDG_CACHE_HOME/code-identifier``) in a subdirectory named after a hash
+    of the workspace path, so nothing is ever written into the workspace.
+    """
+    base_dir = os.getenv("CODE_IDENTIFIER_CACHE_DIR") or os.path.join(
+        os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+        "code-identifier",
+    )
+    digest = hashlib.sha256(os.path.abspath(workspace_root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(base_dir, digest)
+
+
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+def hash_file(path: str) -> str | None:
+    """Return the SHA-256 of the file at ``path``, or None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
 def security_error_handler(context: RunContextWrapper[Any], error: Exception) -> str:
     """
     Custom error handler for file system tools.
@@ -26,7 +71,8 @@ def security_error_handler(context: RunContextWrapper[Any], error: Exception) ->
     Returns:
         A user-friendly error message for the LLM
     """
-    # Parameters are required by the error handler interface but not used in this implementation
+    # The context parameter is required by the error handler interface but not used here
+    record_error(error)
     return (
         f"Error: I encountered an error while trying to access a file or directory. "
         f"For security reasons, I can only access files within the current workspace directory "
@@ -53,21 +99,179 @@ def parse_gitignore(gitignore_path: str) -> pathspec.PathSpec:
     return pathspec.PathSpec.from_lines('gitwildmatch', patterns)
 
 
-def find_gitignore_files(workspace_root: str) -> List[str]:
-    """Return all ``.gitignore`` files within the workspace tree."""
+# Group of pathspec's gitwildmatch regexes matching the "/" after a directory,
+# which lets a pattern match everything below that directory
+_PATHSPEC_DIR_GROUP = "(?P<ps_d>/)"
 
-    discovered: list[str] = []
-    try:
-        for root, _dirs, files in os.walk(workspace_root):
-            if ".gitignore" in files:
-                discovered.append(os.path.join(root, ".gitignore"))
-    except (PermissionError, OSError):
-        pass
-    return discovered
+
+class _GitignoreRules:
+    """The patterns of one ``.gitignore``, each matched against a path itself.
+
+    pathspec matches a pattern against everything below a matching
+    directory too, so a directory-only negation such as ``!a/`` or ``!*/``
+    would re-include the files inside it.  Git only tests a path's own
+    name; ignored parent directories are handled separately.
+    """
+
+    def __init__(self, spec: pathspec.PathSpec) -> None:
+        # (include, regex for files, regex for directories), last pattern first
+        self._rules: list[tuple[bool, re.Pattern[str], re.Pattern[str]]] = []
+        for pattern in reversed(spec.patterns):
+            regex = getattr(pattern, "regex", None)
+            if pattern.include is None or regex is None:
+                continue
+            # Files never match through the group; directories only at their end
+            self._rules.append((
+                pattern.include,
+                re.compile(regex.pattern.replace(_PATHSPEC_DIR_GROUP, "(?!)"), regex.flags),
+                re.compile(regex.pattern.replace(_PATHSPEC_DIR_GROUP, "$"), regex.flags),
+            ))
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match(self, rel_path: str, is_dir: bool) -> bool | None:
+        """Return whether the last pattern matching ``rel_path`` ignores it, or None."""
+        for include, file_regex, dir_regex in self._rules:
+            if (dir_regex if is_dir else file_regex).search(rel_path) is not None:
+                return include
+        return None
+
+
+class GitignoreMatcher:
+    """Hierarchical ``.gitignore`` matcher for a single workspace.
+
+    ``.gitignore`` files are discovered lazily, one directory at a time, and
+    each one is compiled exactly once.  Rules are applied the way git applies
+    them: the deepest ``.gitignore`` with a matching pattern decides, the
+    last matching pattern inside a file wins (so ``!negations`` re-include
+    paths), a pattern only matches the path itself, and nothing below an
+    ignored directory can be re-included.  Directory decisions are memoised
+    so checking many siblings only costs one lookup per path.
+    """
+
+    def __init__(self, workspace_root: str) -> None:
+        self.workspace_root = os.path.abspath(workspace_root)
+        # Relative directory ("" for the root) -> (.gitignore mtime_ns or None, compiled rules or None)
+        self._specs: dict[str, tuple[int | None, _GitignoreRules | None]] = {}
+        # Relative directory -> whether the directory itself is ignored
+        self._ignored_dirs: dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self.checked_at = time.monotonic()
+
+    def _gitignore_path(self, rel_dir: str) -> str:
+        return os.path.join(self.workspace_root, rel_dir, ".gitignore")
+
+    def _spec_for(self, rel_dir: str) -> _GitignoreRules | None:
+        cached = self._specs.get(rel_dir)
+        if cached is not None:
+            return cached[1]
+
+        gitignore_path = self._gitignore_path(rel_dir)
+        try:
+            mtime_ns: int | None = os.stat(gitignore_path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        spec = _GitignoreRules(parse_gitignore(gitignore_path)) if mtime_ns is not None else None
+        if not spec:
+            spec = None
+        self._specs[rel_dir] = (mtime_ns, spec)
+        return spec
+
+    def revalidate(self) -> bool:
+        """Drop every cached decision if any known ``.gitignore`` changed.
+
+        Returns:
+            True if the caches were invalidated.
+        """
+        with self._lock:
+            self.checked_at = time.monotonic()
+            for rel_dir, (mtime_ns, _spec) in list(self._specs.items()):
+                try:
+                    current: int | None = os.stat(self._gitignore_path(rel_dir)).st_mtime_ns
+                except OSError:
+                    current = None
+                if current != mtime_ns:
+                    self._specs = {}
+                    self._ignored_dirs = {}
+                    return True
+        return False
+
+    def _match(self, rel_path: str, is_dir: bool) -> bool:
+        """Apply the ``.gitignore`` files above ``rel_path``, deepest first."""
+        parts = rel_path.split("/")
+        if parts[-1] == ".git":
+            return True
+
+        for depth in range(len(parts) - 1, -1, -1):
+            rel_dir = "/".join(parts[:depth])
+            spec = self._spec_for(rel_dir)
+            if spec is None:
+                continue
+            relative_path = rel_path[len(rel_dir) + 1:] if rel_dir else rel_path
+            include = spec.match(relative_path, is_dir)
+            if include is not None:
+                return include
+        return False
+
+    def is_dir_ignored(self, rel_dir: str) -> bool:
+        """Return whether the directory ``rel_dir`` (posix, workspace relative) is ignored."""
+        if not rel_dir:
+            return False
+        cached = self._ignored_dirs.get(rel_dir)
+        if cached is None:
+            parent = rel_dir.rpartition("/")[0]
+            cached = self.is_dir_ignored(parent) or self._match(rel_dir, True)
+            self._ignored_dirs[rel_dir] = cached
+        return cached
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Return whether ``rel_path`` (posix, workspace relative) is ignored."""
+        if rel_path in ("", "."):
+            return False
+        if is_dir:
+            return self.is_dir_ignored(rel_path)
+        parent = rel_path.rpartition("/")[0]
+        return self.is_dir_ignored(parent) or self._match(rel_path, False)
+
+
+# Seconds between checks of known .gitignore mtimes for a shared matcher
+GITIGNORE_REVALIDATE_INTERVAL = 1.0
+
+_gitignore_matchers: dict[str, GitignoreMatcher] = {}
+_gitignore_matchers_lock = threading.Lock()
+
+
+def get_gitignore_matcher(workspace_root: str) -> GitignoreMatcher:
+    """Return the shared :class:`GitignoreMatcher` for ``workspace_root``.
+
+    One matcher is kept per workspace for the lifetime of the process so every
+    tool call reuses the compiled ``.gitignore`` files.  The matcher is
+    revalidated against ``.gitignore`` mtimes at most once per
+    ``GITIGNORE_REVALIDATE_INTERVAL`` seconds.
+    """
+    key = os.path.abspath(workspace_root)
+    with _gitignore_matchers_lock:
+        matcher = _gitignore_matchers.get(key)
+        if matcher is None:
+            matcher = GitignoreMatcher(key)
+            _gitignore_matchers[key] = matcher
+            return matcher
+
+    if time.monotonic() - matcher.checked_at >= GITIGNORE_REVALIDATE_INTERVAL:
+        matcher.revalidate()
+    return matcher
 
 
-def should_ignore_path(path: str, workspace_root: str) -> bool:
-    """Determine whether ``path`` should be ignored based on gitignore rules."""
+def should_ignore_path(path: str, workspace_root: str, is_dir: bool | None = None) -> bool:
+    """Determine whether ``path`` should be ignored based on gitignore rules.
+
+    Args:
+        path: The path to check
+        workspace_root: The workspace the ``.gitignore`` files belong to
+        is_dir: Whether ``path`` is a directory; looked up on disk when None
+    """
 
     try:
         rel_path = os.path.relpath(path, workspace_root)
@@ -76,32 +280,271 @@ def should_ignore_path(path: str, workspace_root: str) -> bool:
 
     if rel_path == ".":
         return False
-    if rel_path == ".git" or rel_path.startswith(".git" + os.sep):
-        return True
+    if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+        # No workspace .gitignore applies outside the workspace
+        return False
 
     # Normalize path separators for cross-platform compatibility
     rel_path = rel_path.replace(os.sep, '/')
 
-    for gitignore_file in find_gitignore_files(workspace_root):
-        pathspec_obj = parse_gitignore(gitignore_file)
-        gitignore_dir = os.path.dirname(gitignore_file)
+    if is_dir is None:
+        is_dir = os.path.isdir(path)
 
-        try:
-            rel_from_gitignore = os.path.relpath(path, gitignore_dir)
-        except ValueError:
-            continue
+    return get_gitignore_matcher(workspace_root).is_ignored(rel_path, is_dir)
+
+
+class GlobPattern:
+    """A glob pattern matched one path segment at a time while walking.
 
-        if rel_from_gitignore == os.pardir or rel_from_gitignore.startswith(os.pardir + os.sep):
+    ``**`` matches zero or more directories and every other wildcard stays
+    within a single path segment, like :meth:`pathlib.Path.glob`.  Matching
+    state is a set of segment indexes, which lets a walker decide whether a
+    directory can contain a match before descending into it.
+    """
+
+    def __init__(self, pattern: str, include_hidden: bool = True) -> None:
+        self.pattern = pattern
+        self.include_hidden = include_hidden
+
+        segments: list[str] = []
+        for segment in pattern.replace(os.sep, "/").split("/"):
+            if segment in ("", "."):
+                continue
+            if segment == "**" and segments and segments[-1] == "**":
+                continue
+            segments.append(segment)
+
+        # Each segment is ("**", None), ("literal", name) or ("wildcard", (match, allows_hidden))
+        self._segments: list[tuple[str, Any]] = []
+        for segment in segments:
+            if segment == "**":
+                self._segments.append(("**", None))
+            elif any(char in segment for char in "*?["):
+                regex = re.compile(fnmatch.translate(segment))
+                self._segments.append(("wildcard", (regex.match, segment.startswith("."))))
+            else:
+                self._segments.append(("literal", segment))
+        self._length = len(self._segments)
+        self.start = self._closure({0})
+
+    def _closure(self, states: set[int]) -> frozenset[int]:
+        """Add the states reachable by letting ``**`` match zero directories."""
+        result = set(states)
+        pending = list(states)
+        while pending:
+            index = pending.pop()
+            if index < self._length and self._segments[index][0] == "**" and index + 1 not in result:
+                result.add(index + 1)
+                pending.append(index + 1)
+        return frozenset(result)
+
+    def advance(self, states: frozenset[int], name: str) -> frozenset[int]:
+        """Return the states reached after consuming the path segment ``name``.
+
+        An empty result means neither ``name`` nor anything below it can match.
+        """
+        hidden = name.startswith(".")
+        next_states: set[int] = set()
+        for index in states:
+            if index >= self._length:
+                continue
+            kind, value = self._segments[index]
+            if kind == "**":
+                if not hidden or self.include_hidden:
+                    next_states.add(index)
+            elif kind == "literal":
+                if name == value:
+                    next_states.add(index + 1)
+            else:
+                match, allows_hidden = value
+                if (not hidden or self.include_hidden or allows_hidden) and match(name):
+                    next_states.add(index + 1)
+        return self._closure(next_states) if next_states else frozenset()
+
+    def matches(self, states: frozenset[int]) -> bool:
+        """Return whether the path that produced ``states`` matches the pattern."""
+        return self._length in states
+
+    def can_descend(self, states: frozenset[int]) -> bool:
+        """Return whether paths below the one that produced ``states`` can match."""
+        return any(index < self._length for index in states)
+
+    def match_path(self, rel_path: str) -> bool:
+        """Return whether the posix, workspace relative ``rel_path`` matches."""
+        states = self.start
+        for name in rel_path.split("/"):
+            states = self.advance(states, name)
+            if not states:
+                return False
+        return self.matches(states)
+
+
+def walk_workspace(
+    pattern: str = "**/*",
+    workspace_root: str | None = None,
+    *,
+    include_dirs: bool = False,
+    include_hidden: bool = True,
+    sort_entries: bool = False,
+    reverse: bool = False,
+    descend: Callable[[str], bool] | None = None,
+) -> Iterator[tuple[str, os.DirEntry[str]]]:
+    """Walk the workspace once, yielding entries that match ``pattern``.
+
+    Directories are only entered when the glob pattern can still match below
+    them and they are not ignored by ``.gitignore``, so ``node_modules``,
+    ``.venv``, ``.git`` and build output are never scanned.  Symlinked
+    directories are not followed and symlinks resolving outside the workspace
+    are skipped.
+
+    Args:
+        pattern: Glob pattern relative to the workspace root (default: "**/*")
+        workspace_root: Directory to walk (defaults to current workspace)
+        include_dirs: Also yield matching directories (default: False)
+        include_hidden: Let wildcards match dot-files and dot-directories (default: True)
+        sort_entries: Visit each directory's entries, and its subdirectories,
+            in lowercased name order (default: False, scandir order)
+        reverse: With ``sort_entries``, visit them in descending order
+        descend: Called with a directory's relative path right before it is
+            scanned; returning False skips it and everything below it
+
+    Yields:
+        Tuples of (workspace relative posix path, ``os.DirEntry``).  The entry
+        caches its ``stat()`` result, so callers should use it instead of
+        calling ``os.stat`` again.
+    """
+    # Imported here: the index is built with the helpers of this module
+    from ._workspace_index import get_workspace_index
+
+    workspace_root = os.path.abspath(workspace_root or os.getcwd())
+    glob_pattern = GlobPattern(pattern, include_hidden=include_hidden)
+    matcher = get_gitignore_matcher(workspace_root)
+    index = get_workspace_index(workspace_root)
+
+    pending: list[tuple[str, str, frozenset[int]]] = [("", workspace_root, glob_pattern.start)]
+    while pending:
+        rel_dir, abs_dir, states = pending.pop()
+        if descend is not None and rel_dir and not descend(rel_dir):
             continue
+        # Listings from the workspace index already leave out ignored entries
+        entries = index.listing(rel_dir) if index is not None else None
+        filtered = entries is not None
+        if entries is None:
+            try:
+                entries = scandir_entries(abs_dir, workspace_root)
+            except OSError:
+                continue
+        record_io(files_walked=len(entries))
+        if sort_entries:
+            entries.sort(key=lambda entry: entry.name.lower(), reverse=reverse)
+
+        subdirs: list[tuple[str, str, frozenset[int]]] = []
+        for entry in entries:
+            next_states = glob_pattern.advance(states, entry.name)
+            if not next_states:
+                continue
+
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir()
+                is_symlink = entry.is_symlink()
+            except OSError:
+                continue
+
+            if not filtered:
+                if matcher.is_ignored(rel_path, is_dir):
+                    continue
+                if is_symlink and not is_valid_path(entry.path, workspace_root, check_gitignore=False)[0]:
+                    continue
+
+            if glob_pattern.matches(next_states) and (include_dirs or not is_dir):
+                yield rel_path, entry
+            if is_dir and not is_symlink and glob_pattern.can_descend(next_states):
+                subdirs.append((rel_path, entry.path, next_states))
+
+        # Reversed so directories are visited in the order they were listed
+        pending.extend(reversed(subdirs))
+
+
+def walk_changes(
+    pattern: str,
+    workspace_root: str,
+    changes: ChangeFeed,
+    known_dirs: Collection[str],
+    *,
+    include_dirs: bool = False,
+) -> tuple[list[tuple[str, os.DirEntry[str]]], set[str], Callable[[str], bool]]:
+    """Walk again only what ``changes`` reports, to update an index built with :func:`walk_workspace`.
+
+    The directories in ``changes.dirs`` are listed again, as is everything
+    below ``changes.trees`` and any new directory found on the way, i.e. one
+    not in ``known_dirs``.  Their ancestors are entered only to reach them.
 
-        # Normalize path separators for pathspec
-        rel_from_gitignore = rel_from_gitignore.replace(os.sep, '/')
+    Returns:
+        The (path, entry) pairs matching ``pattern`` in the directories
+        listed again, those directories, and a predicate telling whether the
+        index's files for a known directory are out of date: the directory
+        was listed again or is gone.  Those files are replaced by the ones
+        returned; the files of any other directory are unchanged.
+    """
+    if any(path.rpartition("/")[2] == ".gitignore" for path in changes.files):
+        get_gitignore_matcher(workspace_root).revalidate()
+
+    def under_tree(rel_dir: str) -> bool:
+        while rel_dir not in changes.trees:
+            if not rel_dir:
+                return False
+            rel_dir = rel_dir.rpartition("/")[0]
+        return True
 
-        # Check if the path matches any pattern in this gitignore
-        if pathspec_obj.match_file(rel_from_gitignore):
+    ancestors: set[str] = set()
+    for rel_dir in changes.dirs | changes.trees:
+        while rel_dir and rel_dir not in ancestors:
+            rel_dir = rel_dir.rpartition("/")[0]
+            ancestors.add(rel_dir)
+    listed: set[str] = {""} if "" in changes.dirs or "" in changes.trees else set()
+    reached: set[str] = set()
+
+    def descend(rel_dir: str) -> bool:
+        reached.add(rel_dir)
+        if (
+            rel_dir in changes.dirs
+            or under_tree(rel_dir)
+            or (rel_dir not in known_dirs and rel_dir.rpartition("/")[0] in listed)
+        ):
+            listed.add(rel_dir)
             return True
+        return rel_dir in ancestors
 
-    return False
+    entries = [
+        (rel_path, entry)
+        for rel_path, entry in walk_workspace(pattern, workspace_root, include_dirs=include_dirs, descend=descend)
+        if rel_path.rpartition("/")[0] in listed
+    ]
+
+    def is_stale(rel_dir: str) -> bool:
+        if rel_dir in listed or under_tree(rel_dir):
+            return True
+        # Gone if the walk listed an ancestor but never reached it
+        child = rel_dir
+        while child:
+            parent = child.rpartition("/")[0]
+            if parent in listed:
+                return child not in reached
+            child = parent
+        return False
+
+    return entries, listed, is_stale
+
+
+def walk_order_key(rel_path: str) -> tuple[tuple[int, str], ...]:
+    """Sort key putting paths in the order ``walk_workspace(sort_entries=True)`` yields them.
+
+    A directory's files come before its subdirectories, each in lowercased
+    name order, and a subdirectory's whole subtree before the next one.
+    """
+    *dirs, name = rel_path.split("/")
+    return tuple((1, part.lower()) for part in dirs) + ((0, name.lower()),)
 
 
 def is_valid_path(path: str, base_path: str | None = None, check_gitignore: bool = True) -> tuple[bool, str | None]:
@@ -135,4 +578,114 @@ def is_valid_path(path: str, base_path: str | None = None, check_gitignore: bool
         return True, str(abs_path)
 
     except (ValueError, OSError):
-        return False, None
\ No newline at end of file
+        return False, None
+
+# Shared file content cache
+
+# Total bytes of file contents kept in memory across all tools
+DEFAULT_CONTENT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Larger files are always read from disk (or mmap) and never cached
+MAX_CACHED_FILE_BYTES = 4 * 1024 * 1024
+
+
+class FileContentCache:
+    """Byte-budgeted LRU cache of raw file contents shared by every tool.
+
+    Entries are keyed by path and validated against the file's current
+    ``st_mtime_ns`` and ``st_size``, so an edited file is re-read.  Contents
+    are kept as bytes and each tool decodes them the way it needs.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_CONTENT_CACHE_BYTES,
+        max_file_bytes: int = MAX_CACHED_FILE_BYTES,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        # Path -> (mtime_ns, size, contents)
+        self._entries: OrderedDict[str, tuple[int, int, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def read_bytes(self, path: str, stat_result: os.stat_result | None = None) -> bytes:
+        """Return the contents of ``path``, from memory when it is unchanged.
+
+        Args:
+            path: Absolute path of the file
+            stat_result: A current stat of the file, if the caller has one
+
+        Raises:
+            OSError: If the file cannot be stat'ed or read.
+        """
+        if stat_result is None:
+            stat_result = stat_path(path)
+
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == stat_result.st_mtime_ns and cached[1] == stat_result.st_size:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                record_io(cache_hits=1)
+                return cached[2]
+            self.misses += 1
+        record_io(cache_misses=1)
+
+        with open(path, "rb") as file_obj:
+            opened_stat = os.fstat(file_obj.fileno())
+            data = file_obj.read()
+        record_io(files_opened=1, bytes_read=len(data))
+
+        if len(data) <= self.max_file_bytes and len(data) == opened_stat.st_size:
+            with self._lock:
+                previous = self._entries.pop(path, None)
+                if previous is not None:
+                    self.current_bytes -= len(previous[2])
+                self._entries[path] = (opened_stat.st_mtime_ns, opened_stat.st_size, data)
+                self.current_bytes += len(data)
+                while self.current_bytes > self.max_bytes:
+                    _evicted_path, (_mtime, _size, evicted) = self._entries.popitem(last=False)
+                    self.current_bytes -= len(evicted)
+                    self.evictions += 1
+        return data
+
+    def open_text(self, path: str, encoding: str = "utf-8", errors: str = "ignore") -> IO[str]:
+        """Open ``path`` for reading text, backed by the cache when it fits.
+
+        The returned stream behaves like ``open(path, "r", encoding=...,
+        errors=...)``, including universal newlines.
+        """
+        stat_result = stat_path(path)
+        if stat_result.st_size > self.max_file_bytes:
+            record_io(files_opened=1, bytes_read=stat_result.st_size)
+            return open(path, "r", encoding=encoding, errors=errors)
+        return io.TextIOWrapper(io.BytesIO(self.read_bytes(path, stat_result)), encoding=encoding, errors=errors)
+
+    def clear(self) -> None:
+        """Drop every cached file; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and current size, as reported in the tool metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared by every tool in the process
+file_content_cache = FileContentCache()
+tool_metrics.register_cache("file_content", file_content_cache.stats)
@@ -0,0 +1,574 @@
+"""In-process snapshot of workspace directory listings and file metadata."""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ENV = "CODE_IDENTIFIER_WORKSPACE_SNAPSHOT"
+
+# Values of CODE_IDENTIFIER_WORKSPACE_SNAPSHOT; "auto" uses inotify where the
+# platform has it and polling elsewhere.  The snapshot is off unless it is set,
+# since it keeps watches and a background thread for the life of the process
+SNAPSHOT_MODES = ("auto", "inotify", "poll", "off")
+
+# Seconds a polled directory listing is trusted before its mtime is checked
+# again; cached file stats below it are dropped at the same time
+POLL_INTERVAL = 1.0
+
+# Seconds between reads of pending inotify events
+EVENT_DRAIN_INTERVAL = 0.05
+
+# Paths a change feed holds before it gives up and asks for a full pass
+MAX_FEED_PATHS = 50_000
+
+# inotify(7) constants
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+_LISTING_CHANGED = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+_CONTENT_CHANGED = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE
+_DIR_GONE = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class SnapshotEntry:
+    """A directory entry served from the snapshot, usable like ``os.DirEntry``.
+
+    The type comes from the directory scan; ``stat()`` is taken on first use
+    and kept until the snapshot learns the file changed.
+    """
+
+    __slots__ = ("name", "path", "_is_dir", "_is_symlink", "_stat")
+
+    def __init__(self, name: str, path: str, is_dir: bool, is_symlink: bool) -> None:
+        self.name = name
+        self.path = path
+        self._is_dir = is_dir
+        self._is_symlink = is_symlink
+        self._stat: os.stat_result | None = None
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        return self._is_dir and (follow_symlinks or not self._is_symlink)
+
+    def is_file(self, *, follow_symlinks: bool = True) -> bool:
+        return not self._is_dir and (follow_symlinks or not self._is_symlink)
+
+    def is_symlink(self) -> bool:
+        return self._is_symlink
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        if not follow_symlinks:
+            return os.lstat(self.path)
+        stat_result = self._stat
+        if stat_result is None:
+            stat_result = self._stat = os.stat(self.path)
+        return stat_result
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"<SnapshotEntry {self.name!r}>"
+
+
+class ChangeFeed:
+    """Workspace relative paths changed since a consumer last read its feed.
+
+    ``dirs`` had entries created, deleted or renamed.  ``trees`` must be read
+    again with everything below them: directories that appeared, went away,
+    or whose ``.gitignore`` changed.  ``files`` were written to.  When
+    ``everything`` is set events were lost and nothing can be trusted.
+    """
+
+    __slots__ = ("dirs", "trees", "files", "everything")
+
+    def __init__(self) -> None:
+        self.dirs: set[str] = set()
+        self.trees: set[str] = set()
+        self.files: set[str] = set()
+        self.everything = False
+
+    def __bool__(self) -> bool:
+        return self.everything or bool(self.dirs or self.trees or self.files)
+
+    def _record(self, mask: int, rel_dir: str, name: str) -> None:
+        if self.everything:
+            return
+        if not name:
+            self.trees.add(rel_dir)
+        else:
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if mask & _LISTING_CHANGED:
+                self.dirs.add(rel_dir)
+                if mask & IN_ISDIR:
+                    self.trees.add(rel_path)
+            if not mask & IN_ISDIR:
+                self.files.add(rel_path)
+            if name == ".gitignore":
+                self.trees.add(rel_dir)
+        if len(self.dirs) + len(self.trees) + len(self.files) > MAX_FEED_PATHS:
+            self._overflow()
+
+    def _overflow(self) -> None:
+        self.everything = True
+        self.dirs.clear()
+        self.trees.clear()
+        self.files.clear()
+
+
+class _Listing:
+    __slots__ = ("entries", "by_name", "mtime_ns", "checked_at")
+
+    def __init__(self, entries: list[SnapshotEntry], mtime_ns: int) -> None:
+        self.entries = entries
+        self.by_name = {entry.name: entry for entry in entries}
+        self.mtime_ns = mtime_ns
+        self.checked_at = time.monotonic()
+
+
+class _Inotify:
+    """Minimal non-blocking inotify(7) binding over ctypes."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def add_watch(self, path: str) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self) -> list[tuple[int, int, str]]:
+        """Return every pending ``(wd, mask, name)`` event without blocking."""
+        events = []
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buffer, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class WorkspaceSnapshot:
+    """Directory listings and file stats of one workspace, kept in memory.
+
+    A directory is scanned the first time it is listed and then served from
+    memory.  With inotify every listed directory is watched: creations,
+    deletions and renames drop its listing, writes drop the stat of the file
+    written.  Without inotify, or once the kernel's watch limit is reached,
+    a listing is trusted for ``POLL_INTERVAL`` seconds, then kept only if the
+    directory's mtime is unchanged, with the cached file stats below it
+    dropped.  Either way, after warm-up a walk of an unchanged workspace
+    makes next to no metadata system calls.
+    """
+
+    def __init__(self, workspace_root: str, mode: str = "auto") -> None:
+        self.workspace_root = os.path.abspath(workspace_root)
+        self._root_prefix = os.path.join(self.workspace_root, "")
+        self._lock = threading.RLock()
+        self._listings: dict[str, _Listing] = {}
+        self._inotify: _Inotify | None = None
+        self._watches: dict[int, str] = {}
+        self._watched_dirs: dict[str, int] = {}
+        self._drained_at = 0.0
+        self._feeds: list[ChangeFeed] = []
+        self.counters = dict.fromkeys(("scans", "served", "events", "invalidations"), 0)
+
+        if mode in ("auto", "inotify") and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.debug(f"inotify unavailable, polling {self.workspace_root}: {e}")
+        self.mode = "inotify" if self._inotify is not None else "poll"
+
+    def _rel_dir(self, abs_dir: str) -> str | None:
+        # A prefix check, not os.path.relpath: this runs once per stat'ed file
+        abs_dir = os.path.normpath(abs_dir)
+        if abs_dir == self.workspace_root:
+            return ""
+        if not abs_dir.startswith(self._root_prefix):
+            return None
+        return abs_dir[len(self._root_prefix):].replace(os.sep, "/")
+
+    def _abs_dir(self, rel_dir: str) -> str:
+        return os.path.join(self.workspace_root, rel_dir) if rel_dir else self.workspace_root
+
+    def _fall_back_to_polling(self, reason: OSError) -> None:
+        logger.debug(f"Falling back to polling {self.workspace_root}: {reason}")
+        if self._inotify is not None:
+            self._inotify.close()
+        self._inotify = None
+        self._watches.clear()
+        self._watched_dirs.clear()
+        self.mode = "poll"
+        for feed in self._feeds:
+            feed._overflow()
+        self._feeds.clear()
+        # Nothing was polled so far; have every listing checked on next use
+        for listing in self._listings.values():
+            listing.checked_at = 0.0
+
+    def _forget(self, rel_dir: str) -> None:
+        """Drop the listings, and watches, of ``rel_dir`` and everything below it."""
+        prefix = rel_dir + "/" if rel_dir else ""
+        for key in [key for key in self._listings if key == rel_dir or key.startswith(prefix)]:
+            del self._listings[key]
+        for key in [key for key in self._watched_dirs if key == rel_dir or key.startswith(prefix)]:
+            wd = self._watched_dirs.pop(key)
+            self._watches.pop(wd, None)
+            if self._inotify is not None:
+                self._inotify.rm_watch(wd)
+
+    def _drain_events(self, force: bool = False) -> None:
+        if self._inotify is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._drained_at < EVENT_DRAIN_INTERVAL:
+            return
+        self._drained_at = now
+        for wd, mask, name in self._inotify.read_events():
+            self.counters["events"] += 1
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: trust nothing
+                self._listings.clear()
+                self.counters["invalidations"] += 1
+                for feed in self._feeds:
+                    feed._overflow()
+                continue
+            rel_dir = self._watches.get(wd)
+            if rel_dir is None:
+                continue
+            if name or mask & _DIR_GONE:
+                for feed in self._feeds:
+                    feed._record(mask, rel_dir, name)
+            if not name:
+                if mask & _DIR_GONE:
+                    self._forget(rel_dir)
+                    self.counters["invalidations"] += 1
+                continue
+
+            if mask & _LISTING_CHANGED:
+                self._listings.pop(rel_dir, None)
+                self.counters["invalidations"] += 1
+                if mask & IN_ISDIR:
+                    # A directory moved or deleted: its old subtree is stale
+                    self._forget(f"{rel_dir}/{name}" if rel_dir else name)
+            elif mask & _CONTENT_CHANGED:
+                listing = self._listings.get(rel_dir)
+                entry = listing.by_name.get(name) if listing else None
+                if entry is not None:
+                    entry._stat = None
+
+    def _watch(self, rel_dir: str) -> None:
+        if self._inotify is None or rel_dir in self._watched_dirs:
+            return
+        try:
+            wd = self._inotify.add_watch(self._abs_dir(rel_dir))
+        except OSError as e:
+            if e.errno in (errno.ENOSPC, errno.ENOMEM):
+                self._fall_back_to_polling(e)
+            else:
+                raise
+        else:
+            self._watches[wd] = rel_dir
+            self._watched_dirs[rel_dir] = wd
+
+    def _scan(self, rel_dir: str) -> _Listing:
+        abs_dir = self._abs_dir(rel_dir)
+        # Watched before scanning, so nothing done during the scan is missed
+        self._watch(rel_dir)
+
+        # Only polling compares directory mtimes; inotify reports changes itself
+        mtime_ns = os.stat(abs_dir).st_mtime_ns if self._inotify is None else 0
+        entries = []
+        append = entries.append
+        with os.scandir(abs_dir) as iterator:
+            for raw in iterator:
+                try:
+                    append(SnapshotEntry(raw.name, raw.path, raw.is_dir(), raw.is_symlink()))
+                except OSError:
+                    append(SnapshotEntry(raw.name, raw.path, False, False))
+        self.counters["scans"] += 1
+        listing = _Listing(entries, mtime_ns)
+        self._listings[rel_dir] = listing
+        return listing
+
+    def _listing(self, rel_dir: str, scan: bool = True) -> _Listing | None:
+        self._drain_events()
+        listing = self._listings.get(rel_dir)
+        if listing is not None and self._inotify is None and time.monotonic() - listing.checked_at >= POLL_INTERVAL:
+            try:
+                mtime_ns = os.stat(self._abs_dir(rel_dir)).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if mtime_ns != listing.mtime_ns:
+                # Subdirectories are checked against their own mtimes, except
+                # those no longer here, which are forgotten with their subtree
+                del self._listings[rel_dir]
+                self.counters["invalidations"] += 1
+                stale_dirs = [entry.name for entry in listing.entries if entry.is_dir()]
+                listing = None
+                if mtime_ns is not None:
+                    listing = self._scan(rel_dir)
+                for name in stale_dirs:
+                    current = listing.by_name.get(name) if listing else None
+                    if current is None or not current.is_dir():
+                        self._forget(f"{rel_dir}/{name}" if rel_dir else name)
+                if listing is not None:
+                    return listing
+            else:
+                listing.checked_at = time.monotonic()
+                for entry in listing.entries:
+                    entry._stat = None
+        if listing is None and scan:
+            listing = self._scan(rel_dir)
+        elif listing is not None:
+            self.counters["served"] += 1
+        return listing
+
+    def scandir(self, abs_dir: str) -> list[SnapshotEntry]:
+        """Return the entries of ``abs_dir``, like ``list(os.scandir(abs_dir))``.
+
+        Raises:
+            OSError: If the directory cannot be listed.
+        """
+        rel_dir = self._rel_dir(abs_dir)
+        if rel_dir is None:
+            raise ValueError(f"{abs_dir} is outside {self.workspace_root}")
+        with self._lock:
+            return list(self._listing(rel_dir).entries)
+
+    def stat(self, path: str) -> os.stat_result:
+        """Return ``os.stat(path)``, from the snapshot when its directory was listed.
+
+        Raises:
+            OSError: If the file does not exist or cannot be stat'ed.
+        """
+        rel_dir = self._rel_dir(os.path.dirname(os.path.abspath(path)))
+        if rel_dir is not None:
+            with self._lock:
+                listing = self._listing(rel_dir, scan=False)
+                entry = listing.by_name.get(os.path.basename(path)) if listing else None
+            if entry is not None:
+                return entry.stat()
+        return os.stat(path)
+
+    def watch(self, abs_dir: str) -> None:
+        """Report changes to ``abs_dir`` in change feeds without listing it.
+
+        For indexes that list directories themselves; call it before the
+        listing, so nothing done in between is missed.
+
+        Raises:
+            OSError: If the directory cannot be watched.
+        """
+        rel_dir = self._rel_dir(abs_dir)
+        if rel_dir is not None:
+            with self._lock:
+                self._watch(rel_dir)
+
+    def change_feed(self) -> ChangeFeed | None:
+        """Start collecting changes for a consumer, or return None when polling.
+
+        Only directories the snapshot watches are reported: those listed
+        through it or passed to :meth:`watch`.
+        """
+        with self._lock:
+            if self._inotify is None:
+                return None
+            feed = ChangeFeed()
+            self._feeds.append(feed)
+            return feed
+
+    def read_changes(self, feed: ChangeFeed) -> ChangeFeed | None:
+        """Return the changes collected in ``feed`` and start it afresh.
+
+        Returns None once the snapshot fell back to polling, after which the
+        feed gets nothing.
+        """
+        with self._lock:
+            self._drain_events(force=True)
+            changes = ChangeFeed()
+            changes.everything = feed.everything
+            changes.dirs, feed.dirs = feed.dirs, changes.dirs
+            changes.trees, feed.trees = feed.trees, changes.trees
+            changes.files, feed.files = feed.files, changes.files
+            feed.everything = False
+            if feed not in self._feeds:
+                return None
+            return changes
+
+    def close_feed(self, feed: ChangeFeed) -> None:
+        """Stop collecting changes in ``feed``."""
+        with self._lock:
+            if feed in self._feeds:
+                self._feeds.remove(feed)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._forget("")
+            self.counters["invalidations"] += 1
+            for feed in self._feeds:
+                feed._overflow()
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters and sizes, for checking how much the snapshot serves."""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "listings": len(self._listings),
+                "watches": len(self._watches),
+                **self.counters,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._forget("")
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+
+class WorkspaceChanges:
+    """Tells an index of a workspace what to reconcile, and when.
+
+    With inotify that is what the snapshot's change feed reports, and the
+    whole workspace only on first use or after events were lost.  When
+    polling, or with the snapshot off, it is the whole workspace at most
+    once per ``interval`` seconds.
+    """
+
+    def __init__(self, workspace_root: str, interval: float) -> None:
+        self.workspace_root = workspace_root
+        self.interval = interval
+        self._snapshot: WorkspaceSnapshot | None = None
+        self._feed: ChangeFeed | None = None
+        self._full_at: float | None = None
+
+    def take(self) -> ChangeFeed | None:
+        """Return the changes to reconcile, or None to reconcile everything.
+
+        The returned feed is empty when nothing is due.  A failed full
+        reconciliation must be followed by :meth:`reset`.
+        """
+        now = time.monotonic()
+        if self._feed is not None:
+            changes = self._snapshot.read_changes(self._feed)
+            if changes is not None and not changes.everything:
+                return changes
+        elif self._full_at is not None and now - self._full_at < self.interval:
+            return ChangeFeed()
+        self.reset()
+        # Registered before the full pass, so changes made during it are kept
+        self._snapshot = get_workspace_snapshot(self.workspace_root)
+        self._feed = self._snapshot.change_feed() if self._snapshot is not None else None
+        self._full_at = now
+        return None
+
+    def reset(self) -> None:
+        """Have the next :meth:`take` ask for the whole workspace again."""
+        if self._feed is not None:
+            self._snapshot.close_feed(self._feed)
+        self._feed = None
+        self._full_at = None
+
+
+def snapshot_mode() -> str:
+    """Return the configured snapshot mode, one of ``SNAPSHOT_MODES`` ("off" when unset)."""
+    mode = os.getenv(SNAPSHOT_ENV, "").strip().lower() or "off"
+    return mode if mode in SNAPSHOT_MODES else "off"
+
+
+_snapshots: dict[str, WorkspaceSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_workspace_snapshot(workspace_root: str, create: bool = True) -> WorkspaceSnapshot | None:
+    """Return the shared snapshot of ``workspace_root``, or None when disabled.
+
+    With ``create`` False only an existing snapshot is returned, so helpers
+    running in worker processes never set up watches of their own.
+    """
+    mode = snapshot_mode()
+    if mode == "off":
+        return None
+    key = os.path.abspath(workspace_root)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None and create:
+            snapshot = _snapshots[key] = WorkspaceSnapshot(key, mode)
+        return snapshot
+
+
+def scandir_entries(abs_dir: str, workspace_root: str) -> list[Any]:
+    """List ``abs_dir`` through the workspace snapshot, or directly when it is off.
+
+    Raises:
+        OSError: If the directory cannot be listed.
+    """
+    snapshot = get_workspace_snapshot(workspace_root)
+    if snapshot is not None and snapshot._rel_dir(abs_dir) is not None:
+        return snapshot.scandir(abs_dir)
+    with os.scandir(abs_dir) as iterator:
+        return list(iterator)
+
+
+def stat_path(path: str, workspace_root: str | None = None) -> os.stat_result:
+    """Return ``os.stat(path)``, served by an existing workspace snapshot when possible.
+
+    Raises:
+        OSError: If the file does not exist or cannot be stat'ed.
+    """
+    snapshot = get_workspace_snapshot(workspace_root or os.getcwd(), create=False)
+    if snapshot is not None:
+        return snapshot.stat(path)
+    return os.stat(path)
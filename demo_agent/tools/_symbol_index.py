@@ -0,0 +1,579 @@
+"""In-memory index of definitions and imports behind lookup_symbol and resolve_import."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Iterable, NamedTuple
+
+from ast_grep_py import SgNode, SgRoot
+
+from ._instrumentation import record_io
+from ._parse_cache import decode_source, parse_tree_cache
+from ._shared import logger, walk_changes, walk_workspace
+from ._snapshot import ChangeFeed, WorkspaceChanges, stat_path
+
+# Seconds between full reconciliations of the index when there is no change feed
+SYMBOL_REFRESH_INTERVAL = 2.0
+
+# Files indexed, and the language they are parsed as
+SYMBOL_FILE_PATTERN = "**/*.py"
+SYMBOL_LANGUAGE = "python"
+
+# Base classes that make a class an ORM model, matched on their last dotted part
+MODEL_BASE_NAMES = frozenset({"Model", "Base", "DeclarativeBase", "SQLModel", "Document", "EmbeddedDocument"})
+
+# Re-exports (e.g. a package __init__ importing from a submodule) followed per name
+MAX_REEXPORT_DEPTH = 3
+
+_MISSING = object()
+
+
+class Definition(NamedTuple):
+    """A class or function definition."""
+
+    name: str
+    qualname: str
+    kind: str  # "class", "model", "function" or "method"
+    path: str
+    start_line: int
+    end_line: int
+    signature: str
+    bases: tuple[str, ...] = ()
+
+
+class Import(NamedTuple):
+    """One import statement; ``names`` holds (name, alias) pairs, empty for ``import x``."""
+
+    module: str
+    names: tuple[tuple[str, str | None], ...]
+    alias: str | None
+    line: int
+
+
+class Resolution(NamedTuple):
+    """Where an imported name points.
+
+    ``status`` is ``"definition"`` (``definitions`` is set), ``"module"`` (the
+    name is a submodule at ``path``, a directory for a package without
+    ``__init__.py``), ``"external"`` (the module is not in the workspace) or
+    ``"missing"`` (``path`` does not define the name; None when a relative
+    module is not found at all).
+    """
+
+    status: str
+    path: str | None = None
+    definitions: tuple[Definition, ...] = ()
+
+
+class FileSymbols(NamedTuple):
+    mtime_ns: int
+    size: int
+    definitions: list[Definition]
+    imports: list[Import]
+
+
+def _signature(node: SgNode) -> str:
+    # Header up to the body, on one line
+    text = node.text()
+    body = node.field("body")
+    if body is not None:
+        text = text[: body.range().start.index - node.range().start.index]
+    return " ".join(text.split()).rstrip(":") + ":"
+
+
+def _extract_definitions(root: SgNode, path: str) -> list[Definition]:
+    definitions = []
+    for node in root.find_all(any=[{"kind": "class_definition"}, {"kind": "function_definition"}]):
+        name_node = node.field("name")
+        if name_node is None:
+            continue
+        name = name_node.text()
+
+        # Qualify with enclosing classes and functions, innermost last
+        enclosing = [
+            ancestor
+            for ancestor in node.ancestors()
+            if ancestor.kind() in ("class_definition", "function_definition")
+        ]
+        qualname = ".".join([ancestor.field("name").text() for ancestor in reversed(enclosing)] + [name])
+
+        bases: tuple[str, ...] = ()
+        if node.kind() == "class_definition":
+            superclasses = node.field("superclasses")
+            if superclasses is not None:
+                bases = tuple(
+                    child.text() for child in superclasses.children()
+                    if child.is_named() and child.kind() != "keyword_argument"
+                )
+            kind = "class"
+        else:
+            kind = "method" if enclosing and enclosing[0].kind() == "class_definition" else "function"
+
+        node_range = node.range()
+        definitions.append(Definition(
+            name=name,
+            qualname=qualname,
+            kind=kind,
+            path=path,
+            start_line=node_range.start.line + 1,
+            end_line=node_range.end.line + 1,
+            signature=_signature(node),
+            bases=bases,
+        ))
+    return definitions
+
+
+def _imported_name(node: SgNode) -> tuple[str, str | None]:
+    if node.kind() == "aliased_import":
+        return node.field("name").text(), node.field("alias").text()
+    return node.text(), None
+
+
+def _extract_imports(root: SgNode) -> list[Import]:
+    imports = []
+    for node in root.find_all(any=[{"kind": "import_statement"}, {"kind": "import_from_statement"}]):
+        line = node.range().start.line + 1
+        if node.kind() == "import_statement":
+            for child in node.children():
+                if child.kind() in ("dotted_name", "aliased_import"):
+                    module, alias = _imported_name(child)
+                    imports.append(Import(module=module, names=(), alias=alias, line=line))
+            continue
+
+        module_node = node.field("module_name")
+        if module_node is None:
+            continue
+        names = tuple(
+            _imported_name(child) for child in node.children()
+            if child.kind() in ("dotted_name", "aliased_import") and child != module_node
+        )
+        if any(child.kind() == "wildcard_import" for child in node.children()):
+            names += (("*", None),)
+        imports.append(Import(module=module_node.text(), names=names, alias=None, line=line))
+    return imports
+
+
+def _derives_from(definition: Definition, model_names: set[str]) -> bool:
+    return any(base.rsplit(".", 1)[-1] in model_names for base in definition.bases)
+
+
+def module_name(rel_path: str) -> str:
+    """Return the dotted module name of a workspace-relative ``.py`` path."""
+    parts = rel_path[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+class SymbolIndex:
+    """Definitions and imports of the Python files in a workspace.
+
+    The index keeps the list of files, with their mtimes and sizes, up to
+    date; with inotify only the files the workspace snapshot reports as
+    changed are looked at again.  A file is parsed with ast-grep the first
+    time its symbols are asked for, and again only once it changed, so
+    resolving a few imports parses a few files; :meth:`find_definitions`
+    parses them all.  Classes deriving from a known ORM base, directly or
+    through another model among the files parsed so far, are reported with
+    kind ``"model"``.
+    """
+
+    def __init__(self, workspace_root: str) -> None:
+        self.workspace_root = os.path.abspath(workspace_root)
+        self._lock = threading.Lock()
+        self._changes = WorkspaceChanges(self.workspace_root, SYMBOL_REFRESH_INTERVAL)
+        # Path -> (mtime_ns, size) of every indexed file
+        self._stats: dict[str, tuple[int, int]] = {}
+        # Directory -> its indexed files, and the directories the last walks entered
+        self._dir_files: dict[str, set[str]] = defaultdict(set)
+        self._dirs: set[str] = set()
+        # Symbols of the files parsed since they last changed, and the others
+        self._files: dict[str, FileSymbols] = {}
+        self._unparsed: set[str] = set()
+        # Lookups derived from the above, rebuilt on first use after a change
+        self._modules: dict[str, str] | None = None
+        # Dotted package name -> directory, including packages without __init__.py
+        self._packages: dict[str, str] | None = None
+        self._model_names: set[str] | None = None
+        self._by_name: dict[str, list[Definition]] | None = None
+        self.refreshed_at: float | None = None
+
+    def refresh(self) -> tuple[int, int]:
+        """Reconcile the list of files with what changed in the workspace.
+
+        The whole workspace is walked the first time, after the snapshot lost
+        events, and, without inotify, at most once per
+        ``SYMBOL_REFRESH_INTERVAL`` seconds.  Otherwise only the directories
+        and files in the snapshot's change feed are looked at.  Changed files
+        are parsed again when their symbols are next asked for.
+
+        Returns:
+            Tuple of (files changed, files removed).
+        """
+        with self._lock:
+            changes = self._changes.take()
+            if changes is not None and not changes:
+                return 0, 0
+            try:
+                return self._reconcile(changes)
+            except BaseException:
+                self._changes.reset()
+                raise
+
+    def _reconcile(self, changes: ChangeFeed | None) -> tuple[int, int]:
+        if changes is None:
+            dirs = {""}
+
+            def descend(rel_dir: str) -> bool:
+                dirs.add(rel_dir)
+                return True
+
+            entries = list(walk_workspace(SYMBOL_FILE_PATTERN, self.workspace_root, descend=descend))
+            self._dirs = dirs
+            written: set[str] = set()
+            is_stale = None
+        else:
+            entries, listed, is_stale = walk_changes(SYMBOL_FILE_PATTERN, self.workspace_root, changes, self._dirs)
+            self._dirs.difference_update(
+                [rel_dir for rel_dir in self._dirs if rel_dir not in listed and is_stale(rel_dir)]
+            )
+            self._dirs |= listed
+            written = changes.files
+
+        seen: set[str] = set()
+        changed = 0
+        for rel_path, entry in entries:
+            try:
+                stat_info = entry.stat()
+            except OSError:
+                continue
+            seen.add(rel_path)
+            changed += self._update(rel_path, stat_info)
+        # Files written in directories whose listing did not change
+        for rel_path in written:
+            if rel_path in seen or rel_path not in self._stats:
+                continue
+            try:
+                stat_info = stat_path(os.path.join(self.workspace_root, rel_path), self.workspace_root)
+            except OSError:
+                continue
+            changed += self._update(rel_path, stat_info)
+
+        if is_stale is None:
+            deleted = [rel_path for rel_path in self._stats if rel_path not in seen]
+        else:
+            deleted = [
+                rel_path
+                for rel_dir, paths in self._dir_files.items()
+                if is_stale(rel_dir)
+                for rel_path in paths
+                if rel_path not in seen
+            ]
+        for rel_path in deleted:
+            del self._stats[rel_path]
+            self._forget_symbols(rel_path)
+            rel_dir = rel_path.rpartition("/")[0]
+            self._dir_files[rel_dir].discard(rel_path)
+            if not self._dir_files[rel_dir]:
+                del self._dir_files[rel_dir]
+        if deleted:
+            self._modules = self._packages = None
+        if changed or deleted:
+            logger.debug("Symbol index: %d files changed, %d removed", changed, len(deleted))
+        self.refreshed_at = time.monotonic()
+        return changed, len(deleted)
+
+    def _update(self, rel_path: str, stat_info: os.stat_result) -> bool:
+        """Record the mtime and size of ``rel_path``; return whether they changed."""
+        stat_key = (stat_info.st_mtime_ns, stat_info.st_size)
+        known = self._stats.get(rel_path)
+        if known == stat_key:
+            return False
+        if known is None:
+            self._dir_files[rel_path.rpartition("/")[0]].add(rel_path)
+            self._modules = self._packages = None
+        self._stats[rel_path] = stat_key
+        self._forget_symbols(rel_path)
+        self._unparsed.add(rel_path)
+        return True
+
+    def _forget_symbols(self, rel_path: str) -> None:
+        self._unparsed.discard(rel_path)
+        if self._files.pop(rel_path, None) is not None:
+            self._model_names = None
+            self._by_name = None
+
+    def _symbols(self, rel_path: str) -> FileSymbols | None:
+        """Return the symbols of an indexed file, parsing it if needed; the lock must be held."""
+        symbols = self._files.get(rel_path)
+        if symbols is not None:
+            return symbols
+        stat_key = self._stats.get(rel_path)
+        if stat_key is None:
+            return None
+        abs_path = os.path.join(self.workspace_root, rel_path)
+        symbols = self._files[rel_path] = self._index_file(rel_path, abs_path, *stat_key)
+        self._unparsed.discard(rel_path)
+        self._by_name = None
+        # Adding classes only adds models, so known ones stay valid unless one is new
+        if self._model_names is not None and any(
+            definition.kind == "class"
+            and definition.name not in self._model_names
+            and _derives_from(definition, self._model_names)
+            for definition in symbols.definitions
+        ):
+            self._model_names = None
+        return symbols
+
+    def _index_file(self, rel_path: str, abs_path: str, mtime_ns: int, size: int) -> FileSymbols:
+        definitions: list[Definition] = []
+        imports: list[Import] = []
+        try:
+            # Reuse a tree ast_grep already parsed, but do not flush the shared
+            # caches with every file of the workspace
+            root = parse_tree_cache.get((abs_path, mtime_ns, size, SYMBOL_LANGUAGE), _MISSING)
+            if root is _MISSING:
+                parse_tree_cache.record_miss()
+                with open(abs_path, "rb") as f:
+                    data = f.read()
+                record_io(files_opened=1, bytes_read=len(data))
+                content = decode_source(data)
+                root = SgRoot(content, SYMBOL_LANGUAGE) if content.strip() else None
+            if root is not None:
+                root_node = root.root()
+                definitions = _extract_definitions(root_node, rel_path)
+                imports = _extract_imports(root_node)
+        except Exception as e:
+            # Unreadable or unparsable files are indexed as empty
+            logger.debug(f"Could not index symbols of {rel_path}: {e}")
+        return FileSymbols(mtime_ns, size, definitions, imports)
+
+    def _classified(self, definition: Definition) -> Definition:
+        if definition.kind != "class" or not definition.bases:
+            return definition
+        if self._model_names is None:
+            model_names = set(MODEL_BASE_NAMES)
+            classes = [
+                definition
+                for symbols in self._files.values()
+                for definition in symbols.definitions
+                if definition.kind == "class"
+            ]
+            # Propagate through workspace base classes (e.g. abstract TimestampedModel)
+            while True:
+                new_models = {
+                    definition.name
+                    for definition in classes
+                    if definition.name not in model_names and _derives_from(definition, model_names)
+                }
+                if not new_models:
+                    break
+                model_names |= new_models
+            self._model_names = model_names
+        return definition._replace(kind="model") if _derives_from(definition, self._model_names) else definition
+
+    def find_definitions(self, name: str, kinds: Iterable[str] | None = None) -> list[Definition]:
+        """Return definitions whose name or qualified name (``Class.method``) is ``name``.
+
+        Every file not parsed yet is parsed first.
+        """
+        kinds = set(kinds) if kinds else None
+        with self._lock:
+            for rel_path in list(self._unparsed):
+                self._symbols(rel_path)
+            if self._by_name is None:
+                by_name: dict[str, list[Definition]] = {}
+                for rel_path in sorted(self._files):
+                    for definition in self._files[rel_path].definitions:
+                        definition = self._classified(definition)
+                        by_name.setdefault(definition.name, []).append(definition)
+                        if definition.qualname != definition.name:
+                            by_name.setdefault(definition.qualname, []).append(definition)
+                self._by_name = by_name
+            return [
+                definition for definition in self._by_name.get(name, [])
+                if kinds is None or definition.kind in kinds
+            ]
+
+    def _parse_bases(self, rel_path: str, visited: set[str]) -> None:
+        """Parse the files the imported base classes of ``rel_path``'s classes come from.
+
+        Followed up to ``MAX_REEXPORT_DEPTH`` files deep, so a class deriving
+        from a model defined elsewhere is classified without parsing every file.
+        """
+        visited.add(rel_path)
+        with self._lock:
+            symbols = self._symbols(rel_path)
+        if symbols is None or len(visited) > MAX_REEXPORT_DEPTH:
+            return
+        imported = {
+            alias or name: (statement.module, name)
+            for statement in symbols.imports
+            for name, alias in statement.names
+            if name != "*"
+        }
+        for definition in symbols.definitions:
+            if definition.kind != "class":
+                continue
+            for base in definition.bases:
+                if base in MODEL_BASE_NAMES or base not in imported:
+                    continue
+                module, name = imported[base]
+                resolution = self.resolve_name(module, rel_path, name)
+                if resolution.status == "definition" and resolution.path not in visited:
+                    self._parse_bases(resolution.path, visited)
+
+    def _definitions(self, rel_path: str) -> list[Definition]:
+        with self._lock:
+            symbols = self._symbols(rel_path)
+            return list(symbols.definitions) if symbols else []
+
+    def definitions_in(self, rel_path: str) -> list[Definition]:
+        """Return the definitions of an indexed file, in source order."""
+        self._parse_bases(rel_path, set())
+        with self._lock:
+            symbols = self._symbols(rel_path)
+            return [self._classified(definition) for definition in symbols.definitions] if symbols else []
+
+    def imports_of(self, rel_path: str) -> list[Import] | None:
+        """Return the imports of an indexed file, or None if it is not indexed."""
+        with self._lock:
+            symbols = self._symbols(rel_path)
+            return list(symbols.imports) if symbols else None
+
+    def _absolute_module(self, module: str, from_file: str | None) -> str | None:
+        """Return the dotted name of ``module``, resolving a relative one against ``from_file``."""
+        if not module.startswith("."):
+            return module
+        if from_file is None:
+            return None
+        level = len(module) - len(module.lstrip("."))
+        package = module_name(from_file).split(".") if module_name(from_file) else []
+        if not from_file.endswith("__init__.py"):
+            package = package[:-1]
+        if level - 1 > len(package):
+            return None
+        package = package[:len(package) - (level - 1)]
+        return ".".join(package + ([module.lstrip(".")] if module.lstrip(".") else []))
+
+    def _lookup(self, module: str) -> str | None:
+        names = self._modules
+        path = names.get(module)
+        if path is not None or not module:
+            return path
+        suffix = "." + module
+        matches = sorted((name for name in names if name.endswith(suffix)), key=lambda name: name.count("."))
+        if matches and (len(matches) == 1 or matches[0].count(".") < matches[1].count(".")):
+            return names[matches[0]]
+        return None
+
+    def _build_modules(self) -> None:
+        self._modules = {module_name(rel_path): rel_path for rel_path in self._stats}
+        self._packages = {}
+        for rel_path in self._stats:
+            parts = rel_path.split("/")[:-1]
+            for depth in range(len(parts), -1, -1):
+                package = ".".join(parts[:depth])
+                if package in self._packages:
+                    break
+                self._packages[package] = "/".join(parts[:depth])
+
+    def resolve_module(self, module: str, from_file: str | None = None) -> str | None:
+        """Return the workspace file defining ``module``, or None if there is none.
+
+        Relative modules (``.models``, ``..utils``) are resolved against
+        ``from_file``.  Absolute modules are looked up from the workspace root
+        first, then as the unique shortest suffix of an indexed module name,
+        which covers ``src/`` layouts and apps on a nested ``sys.path`` entry.
+        """
+        module = self._absolute_module(module, from_file)
+        if module is None:
+            return None
+        with self._lock:
+            if self._modules is None:
+                self._build_modules()
+            return self._lookup(module)
+
+    def resolve_package(self, module: str, from_file: str | None = None) -> str | None:
+        """Return the workspace directory of package ``module``, or None if there is none.
+
+        Unlike :meth:`resolve_module` this finds packages without an
+        ``__init__.py``, by their full dotted name only, so a directory named
+        like a third-party package does not shadow it; the workspace root is
+        ``""``.
+        """
+        module = self._absolute_module(module, from_file)
+        if module is None:
+            return None
+        with self._lock:
+            if self._packages is None:
+                self._build_modules()
+            return self._packages.get(module)
+
+    def resolve_name(self, module: str, from_file: str | None, name: str, depth: int = 0) -> Resolution:
+        """Resolve ``name`` as imported by ``from {module} import {name}`` in ``from_file``.
+
+        Names the module re-exports through its own imports, including
+        wildcard imports, are followed up to ``MAX_REEXPORT_DEPTH`` hops.
+        """
+        # "from package import module", also from packages without __init__.py
+        submodule = module + name if module.endswith(".") else f"{module}.{name}"
+        rel_path = self.resolve_module(module, from_file)
+        if rel_path is None:
+            package = self.resolve_package(module, from_file)
+            if package is None and not module.startswith("."):
+                return Resolution("external")
+            submodule_path = self.resolve_module(submodule, from_file)
+            if submodule_path is None:
+                submodule_path = self.resolve_package(submodule, from_file)
+            if submodule_path is not None:
+                return Resolution("module", submodule_path)
+            # Relative imports always point into the workspace
+            return Resolution("missing", package)
+
+        definitions = tuple(definition for definition in self._definitions(rel_path) if definition.qualname == name)
+        if definitions:
+            self._parse_bases(rel_path, set())
+            with self._lock:
+                definitions = tuple(self._classified(definition) for definition in definitions)
+            return Resolution("definition", rel_path, definitions)
+
+        submodule_path = self.resolve_module(submodule, from_file)
+        if submodule_path is None:
+            submodule_path = self.resolve_package(submodule, from_file)
+        if submodule_path is not None:
+            return Resolution("module", submodule_path)
+
+        if depth < MAX_REEXPORT_DEPTH:
+            for imported in self.imports_of(rel_path) or []:
+                for imported_name, alias in imported.names:
+                    if (alias or imported_name) == name:
+                        return self.resolve_name(imported.module, rel_path, imported_name, depth + 1)
+                    if imported_name == "*":
+                        resolution = self.resolve_name(imported.module, rel_path, name, depth + 1)
+                        if resolution.status in ("definition", "module"):
+                            return resolution
+        return Resolution("missing", rel_path)
+
+
+_symbol_indexes: dict[str, SymbolIndex] = {}
+_symbol_indexes_lock = threading.Lock()
+
+
+def get_symbol_index(workspace_root: str) -> SymbolIndex:
+    """Return the symbol index of ``workspace_root``, refreshed if it is stale.
+
+    The index is built on first use and then reconciled with what changed
+    since the previous call (see :meth:`SymbolIndex.refresh`).
+    """
+    key = os.path.abspath(workspace_root)
+    with _symbol_indexes_lock:
+        index = _symbol_indexes.get(key)
+        if index is None:
+            index = _symbol_indexes[key] = SymbolIndex(key)
+
+    index.refresh()
+    return index
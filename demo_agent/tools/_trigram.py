@@ -0,0 +1,362 @@
+"""Optional persistent trigram index used by the find tool to pick candidate files."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+from ._instrumentation import record_io
+from ._shared import env_flag, get_cache_dir, logger, walk_changes, walk_order_key, walk_workspace
+from ._search import BINARY_SNIFF_BYTES
+from ._snapshot import ChangeFeed, WorkspaceChanges, stat_path
+
+# Environment variable that turns the index on
+TRIGRAM_INDEX_ENV = "CODE_IDENTIFIER_TRIGRAM_INDEX"
+
+# Files larger than this are not indexed and are always treated as candidates
+MAX_INDEXED_FILE_BYTES = 1 << 20
+
+# Files indexed per write transaction while (re)building
+INDEX_BATCH_FILES = 2000
+
+# Seconds between full reconciliations of the index when there is no change feed
+TRIGRAM_REFRESH_INTERVAL = 2.0
+
+# Posting lists are split into blobs of at most this many consecutive file ids,
+# so re-indexing a file rewrites small blobs however large the workspace is
+POSTING_BUCKET_BITS = 10
+
+SCHEMA_VERSION = "3"
+
+# Values of files.kind
+_INDEXED = 0
+_UNINDEXED = 1
+_BINARY = 2
+
+
+def extract_trigrams(data: bytes) -> set[int]:
+    """Return the distinct trigrams of ``data`` after ASCII lowercasing.
+
+    Trigrams are packed into integers (``b0 << 16 | b1 << 8 | b2``).  Lowercasing
+    lets one index serve case-sensitive and case-insensitive queries; exact
+    matching is always re-checked against the file afterwards.
+    """
+    data = data.lower()
+    # zip over shifted views runs in C; only distinct trigrams are packed
+    return {(b0 << 16) | (b1 << 8) | b2 for b0, b1, b2 in set(zip(data, data[1:], data[2:]))}
+
+
+def _posting_key(trigram: int, file_id: int) -> int:
+    """Return the postings row holding ``file_id`` in the list of ``trigram``."""
+    return (trigram << 32) | (file_id >> POSTING_BUCKET_BITS)
+
+
+class TrigramIndex:
+    """On-disk trigram index of the text files in a workspace.
+
+    Each trigram maps to a posting list of file ids, stored as SQLite rows of
+    up to ``1 << POSTING_BUCKET_BITS`` ids keyed by the trigram in the upper
+    bits, so a query only reads the posting lists of its own trigrams and an
+    update only rewrites the rows of the file ids it touches.  The index is
+    reconciled with the filesystem from file mtimes and sizes: only new or
+    changed files are re-read, and deleted files are dropped.  With inotify
+    only the directories and files the workspace snapshot reports as changed
+    are looked at again.
+    """
+
+    def __init__(self, workspace_root: str, db_path: str) -> None:
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._changes = WorkspaceChanges(self.workspace_root, TRIGRAM_REFRESH_INTERVAL)
+        self.refreshed_at: float | None = None
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._create_schema()
+
+        # Path -> (id, mtime_ns, size, kind), mirrored from the files table
+        self._files: dict[str, tuple[int, int, int, int]] = {}
+        self._paths_by_id: dict[int, str] = {}
+        # Files too large to index, which every query returns
+        self._unindexed: set[str] = set()
+        # Directory -> its files, and the directories the last walks entered
+        self._dir_files: dict[str, set[str]] = defaultdict(set)
+        self._dirs: set[str] = set()
+        for file_id, path, mtime_ns, size, kind in self._connection.execute(
+            "SELECT id, path, mtime_ns, size, kind FROM files"
+        ):
+            path = os.fsdecode(path)
+            self._files[path] = (file_id, mtime_ns, size, kind)
+            self._paths_by_id[file_id] = path
+            self._dir_files[path.rpartition("/")[0]].add(path)
+            if kind == _UNINDEXED:
+                self._unindexed.add(path)
+
+    def _create_schema(self) -> None:
+        connection = self._connection
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = connection.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is None or row[0] != SCHEMA_VERSION:
+            with connection:
+                connection.execute("DROP TABLE IF EXISTS files")
+                connection.execute("DROP TABLE IF EXISTS postings")
+                connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,)
+                )
+        with connection:
+            # Paths are stored as os.fsencode()d blobs so undecodable names survive
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "id INTEGER PRIMARY KEY, path BLOB UNIQUE NOT NULL, mtime_ns INTEGER NOT NULL, "
+                "size INTEGER NOT NULL, kind INTEGER NOT NULL, trigrams BLOB)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS postings (key INTEGER PRIMARY KEY, file_ids BLOB NOT NULL)"
+            )
+
+    def refresh(self) -> tuple[int, int]:
+        """Reconcile the index with what changed in the workspace.
+
+        The whole workspace is walked the first time, after the snapshot lost
+        events, and, without inotify, at most once per
+        ``TRIGRAM_REFRESH_INTERVAL`` seconds.  Otherwise only the directories
+        and files in the snapshot's change feed are looked at, so an
+        unchanged workspace costs nothing to keep up to date.
+
+        Returns:
+            Tuple of (files re-indexed, files removed).
+        """
+        with self._lock:
+            changes = self._changes.take()
+            if changes is not None and not changes:
+                return 0, 0
+            try:
+                return self._reconcile(changes)
+            except BaseException:
+                self._changes.reset()
+                raise
+
+    def _reconcile(self, changes: ChangeFeed | None) -> tuple[int, int]:
+        if changes is None:
+            entries = list(walk_workspace("**/*", self.workspace_root, include_dirs=True))
+            self._dirs = {""}
+            written: set[str] = set()
+            is_stale = None
+        else:
+            entries, listed, is_stale = walk_changes(
+                "**/*", self.workspace_root, changes, self._dirs, include_dirs=True
+            )
+            self._dirs.difference_update(
+                [rel_dir for rel_dir in self._dirs if rel_dir not in listed and is_stale(rel_dir)]
+            )
+            written = changes.files
+
+        changed: list[tuple[str, str, int, int]] = []
+        seen: set[str] = set()
+        for rel_path, entry in entries:
+            try:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        self._dirs.add(rel_path)
+                    continue
+                stat_info = entry.stat()
+            except OSError:
+                continue
+            seen.add(rel_path)
+            known = self._files.get(rel_path)
+            if known is None or known[1] != stat_info.st_mtime_ns or known[2] != stat_info.st_size:
+                changed.append((rel_path, entry.path, stat_info.st_mtime_ns, stat_info.st_size))
+        # Files written in directories whose listing did not change
+        for rel_path in written:
+            known = self._files.get(rel_path)
+            if known is None or rel_path in seen:
+                continue
+            abs_path = os.path.join(self.workspace_root, rel_path)
+            try:
+                stat_info = stat_path(abs_path, self.workspace_root)
+            except OSError:
+                continue
+            if known[1] != stat_info.st_mtime_ns or known[2] != stat_info.st_size:
+                changed.append((rel_path, abs_path, stat_info.st_mtime_ns, stat_info.st_size))
+
+        if is_stale is None:
+            deleted = [path for path in self._files if path not in seen]
+        else:
+            deleted = [
+                path
+                for rel_dir, paths in self._dir_files.items()
+                if is_stale(rel_dir)
+                for path in paths
+                if path not in seen
+            ]
+        stale = deleted + [rel_path for rel_path, *_rest in changed if rel_path in self._files]
+        if stale:
+            self._remove(stale)
+        for start in range(0, len(changed), INDEX_BATCH_FILES):
+            self._add(changed[start:start + INDEX_BATCH_FILES])
+
+        self.refreshed_at = time.monotonic()
+        if changed or deleted:
+            logger.debug("Trigram index: %d files indexed, %d removed", len(changed), len(deleted))
+        return len(changed), len(deleted)
+
+    def _remove(self, paths: list[str]) -> None:
+        removals: dict[int, set[int]] = defaultdict(set)
+        connection = self._connection
+        with connection:
+            for path in paths:
+                # A path can be listed twice, e.g. as deleted and as changed
+                known = self._files.pop(path, None)
+                if known is None:
+                    continue
+                file_id = known[0]
+                del self._paths_by_id[file_id]
+                self._unindexed.discard(path)
+                rel_dir = path.rpartition("/")[0]
+                self._dir_files[rel_dir].discard(path)
+                if not self._dir_files[rel_dir]:
+                    del self._dir_files[rel_dir]
+                row = connection.execute("SELECT trigrams FROM files WHERE id = ?", (file_id,)).fetchone()
+                connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                if row and row[0]:
+                    for trigram in array("I", row[0]):
+                        removals[_posting_key(trigram, file_id)].add(file_id)
+
+            for key, file_ids in removals.items():
+                row = connection.execute("SELECT file_ids FROM postings WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                remaining = array("I", (file_id for file_id in array("I", row[0]) if file_id not in file_ids))
+                if remaining:
+                    connection.execute("UPDATE postings SET file_ids = ? WHERE key = ?", (remaining.tobytes(), key))
+                else:
+                    connection.execute("DELETE FROM postings WHERE key = ?", (key,))
+
+    def _add(self, files: list[tuple[str, str, int, int]]) -> None:
+        additions: dict[int, array] = defaultdict(lambda: array("I"))
+        connection = self._connection
+        with connection:
+            for rel_path, abs_path, mtime_ns, size in files:
+                kind = _UNINDEXED
+                trigrams = None
+                if size <= MAX_INDEXED_FILE_BYTES:
+                    try:
+                        with open(abs_path, "rb") as file_obj:
+                            data = file_obj.read()
+                        record_io(files_opened=1, bytes_read=len(data))
+                    except OSError:
+                        continue
+                    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+                        kind = _BINARY
+                    else:
+                        kind = _INDEXED
+                        trigrams = array("I", sorted(extract_trigrams(data)))
+
+                cursor = connection.execute(
+                    "INSERT INTO files (path, mtime_ns, size, kind, trigrams) VALUES (?, ?, ?, ?, ?)",
+                    (os.fsencode(rel_path), mtime_ns, size, kind, trigrams.tobytes() if trigrams is not None else None),
+                )
+                file_id = cursor.lastrowid
+                self._files[rel_path] = (file_id, mtime_ns, size, kind)
+                self._paths_by_id[file_id] = rel_path
+                self._dir_files[rel_path.rpartition("/")[0]].add(rel_path)
+                if kind == _UNINDEXED:
+                    self._unindexed.add(rel_path)
+                if trigrams is not None:
+                    for trigram in trigrams:
+                        additions[_posting_key(trigram, file_id)].append(file_id)
+
+            for key, file_ids in additions.items():
+                row = connection.execute("SELECT file_ids FROM postings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    existing = array("I", row[0])
+                    existing.extend(file_ids)
+                    file_ids = existing
+                connection.execute(
+                    "INSERT OR REPLACE INTO postings (key, file_ids) VALUES (?, ?)", (key, file_ids.tobytes())
+                )
+
+    def candidates(self, search_text: str, case_sensitive: bool = True) -> list[str] | None:
+        """Return the files that may contain ``search_text``, in sorted walk order.
+
+        The order is the one ``walk_workspace(sort_entries=True)`` visits them
+        in, so a search capped at N results returns the same files with and
+        without the index.
+
+        Returns None when the index cannot narrow the search: the query is
+        shorter than a trigram, or it is a case-insensitive non-ASCII query
+        that ASCII lowercasing cannot fold.  Files too large to index are
+        always included; binary files never are.
+        """
+        if not case_sensitive and not search_text.isascii():
+            return None
+        needle = search_text.encode("utf-8")
+        if len(needle) < 3:
+            return None
+
+        query = sorted(extract_trigrams(needle))
+        with self._lock:
+            postings: list[array] = []
+            for trigram in query:
+                posting = array("I")
+                for row in self._connection.execute(
+                    "SELECT file_ids FROM postings WHERE key BETWEEN ? AND ?",
+                    (trigram << 32, (trigram << 32) | 0xFFFFFFFF),
+                ):
+                    posting.frombytes(row[0])
+                if not posting:
+                    break
+                postings.append(posting)
+
+            file_ids: set[int] = set()
+            if len(postings) == len(query):
+                postings.sort(key=len)
+                file_ids = set(postings[0])
+                for posting in postings[1:]:
+                    if not file_ids:
+                        break
+                    file_ids.intersection_update(posting)
+
+            paths = [self._paths_by_id[file_id] for file_id in file_ids]
+            paths.extend(self._unindexed)
+        return sorted(paths, key=walk_order_key)
+
+
+_trigram_indexes: dict[str, TrigramIndex] = {}
+_trigram_indexes_lock = threading.Lock()
+
+
+def get_trigram_index(workspace_root: str) -> TrigramIndex | None:
+    """Return the refreshed trigram index for ``workspace_root``, if enabled.
+
+    The index is opt-in through the ``CODE_IDENTIFIER_TRIGRAM_INDEX``
+    environment variable and stored under :func:`get_cache_dir`.  Each call
+    reconciles it with what changed since the previous one (see
+    :meth:`TrigramIndex.refresh`), so repeated queries skip the walk.
+    """
+    if not env_flag(TRIGRAM_INDEX_ENV):
+        return None
+
+    key = os.path.abspath(workspace_root)
+    with _trigram_indexes_lock:
+        index = _trigram_indexes.get(key)
+        if index is None:
+            try:
+                index = TrigramIndex(key, os.path.join(get_cache_dir(key), "trigram.sqlite"))
+            except (OSError, sqlite3.Error) as err:
+                logger.warning("Trigram index unavailable for %s: %s", key, err)
+                return None
+            _trigram_indexes[key] = index
+
+    try:
+        index.refresh()
+    except sqlite3.Error as err:
+        logger.warning("Trigram index refresh failed for %s: %s", key, err)
+        return None
+    return index
@@ -0,0 +1,423 @@
+"""Optional persistent index of the workspace's directory listings and file hashes."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+
+from ._instrumentation import record_io
+from ._shared import GitignoreMatcher, env_flag, get_cache_dir, get_gitignore_matcher, hash_file, is_valid_path, logger
+from ._snapshot import ChangeFeed, SnapshotEntry, WorkspaceChanges, get_workspace_snapshot, scandir_entries
+
+# Environment variable that turns the index on
+WORKSPACE_INDEX_ENV = "CODE_IDENTIFIER_WORKSPACE_INDEX"
+
+# Seconds between full reconciliations of the index when there is no change feed
+WORKSPACE_INDEX_REFRESH_INTERVAL = 2.0
+
+# Directories and files modified this recently are not trusted to be
+# unchanged while their mtime is: a second change within the filesystem's
+# timestamp granularity would leave it the same
+RACY_MTIME_NS = 2_000_000_000
+
+# Stored instead of the mtime of a directory listed within RACY_MTIME_NS of
+# its last change, so the next refresh lists it again
+_RACY = -1
+
+SCHEMA_VERSION = "1"
+
+# Entry type codes stored in front of each name of a listing
+_TYPE_CODES = {(False, False): "f", (True, False): "d", (False, True): "l", (True, True): "L"}
+_CODE_TYPES = {code: entry_type for entry_type, code in _TYPE_CODES.items()}
+
+
+def _mtime_ns(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class _IndexedDir:
+    """One directory of the index: its mtime, its ``.gitignore``'s, and its entries."""
+
+    __slots__ = ("mtime_ns", "gitignore_mtime_ns", "entries")
+
+    def __init__(self, mtime_ns: int, gitignore_mtime_ns: int | None, entries: dict[str, tuple[bool, bool]]) -> None:
+        self.mtime_ns = mtime_ns
+        self.gitignore_mtime_ns = gitignore_mtime_ns
+        # Name -> (is_dir, is_symlink)
+        self.entries = entries
+
+    def encode(self) -> bytes:
+        return os.fsencode("\0".join(_TYPE_CODES[entry_type] + name for name, entry_type in self.entries.items()))
+
+    @staticmethod
+    def decode(data: bytes) -> dict[str, tuple[bool, bool]]:
+        if not data:
+            return {}
+        return {item[1:]: _CODE_TYPES[item[0]] for item in os.fsdecode(data).split("\0")}
+
+
+class WorkspaceIndex:
+    """On-disk index of the directories a workspace walk visits.
+
+    For every directory that is not ``.gitignore``d the index stores its
+    mtime and its entries that are neither ignored nor symlinks leaving the
+    workspace, so walks read listings from memory instead of scanning and
+    matching ``.gitignore`` rules again.  Reconciling it with the filesystem
+    costs one ``stat`` per directory and per ``.gitignore``: a directory is
+    listed again only when its mtime changed, and a changed ``.gitignore``
+    re-lists its whole subtree.  With inotify that full pass runs once, and
+    then only the directories the workspace snapshot reports as changed are
+    listed again.
+
+    The entries handed out keep their ``stat()`` until the snapshot reports
+    the file written, or, without inotify, until the next full pass.
+    Content hashes are stored with the size and mtime they were taken at and
+    recomputed once either differs.
+    """
+
+    def __init__(self, workspace_root: str, db_path: str) -> None:
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.db_path = db_path
+        self._root_prefix = os.path.join(self.workspace_root, "")
+        self._lock = threading.Lock()
+        self._changes = WorkspaceChanges(self.workspace_root, WORKSPACE_INDEX_REFRESH_INTERVAL)
+        self.refreshed_at: float | None = None
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._create_schema()
+
+        self._dirs: dict[str, _IndexedDir] = {}
+        for path, mtime_ns, gitignore_mtime_ns, entries in self._connection.execute(
+            "SELECT path, mtime_ns, gitignore_mtime_ns, entries FROM dirs"
+        ):
+            self._dirs[os.fsdecode(path)] = _IndexedDir(mtime_ns, gitignore_mtime_ns, _IndexedDir.decode(entries))
+        # Directory -> the entries handed out by listing(), by name
+        self._entries: dict[str, dict[str, SnapshotEntry]] = {}
+        # Relative path -> (size, mtime_ns, sha256)
+        self._hashes: dict[str, tuple[int, int, str]] = {
+            os.fsdecode(path): (size, mtime_ns, sha256)
+            for path, size, mtime_ns, sha256 in self._connection.execute(
+                "SELECT path, size, mtime_ns, sha256 FROM hashes"
+            )
+        }
+
+    def _create_schema(self) -> None:
+        connection = self._connection
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = connection.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is None or row[0] != SCHEMA_VERSION:
+            with connection:
+                connection.execute("DROP TABLE IF EXISTS dirs")
+                connection.execute("DROP TABLE IF EXISTS hashes")
+                connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,)
+                )
+        with connection:
+            # Paths are stored as os.fsencode()d blobs so undecodable names survive
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                "path BLOB PRIMARY KEY, mtime_ns INTEGER NOT NULL, gitignore_mtime_ns INTEGER, entries BLOB NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                "path BLOB PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL)"
+            )
+
+    def _abs_dir(self, rel_dir: str) -> str:
+        return os.path.join(self.workspace_root, rel_dir) if rel_dir else self.workspace_root
+
+    def _rel_path(self, abs_path: str) -> str | None:
+        abs_path = os.path.normpath(abs_path)
+        if not abs_path.startswith(self._root_prefix):
+            return None
+        return abs_path[len(self._root_prefix):].replace(os.sep, "/")
+
+    def refresh(self) -> tuple[int, int]:
+        """Reconcile the index with what changed in the workspace.
+
+        Every directory is checked the first time, after the snapshot lost
+        events, and, without inotify, at most once per
+        ``WORKSPACE_INDEX_REFRESH_INTERVAL`` seconds.  Otherwise only the
+        directories and files in the snapshot's change feed are looked at.
+
+        Returns:
+            Tuple of (directories listed again, directories removed).
+        """
+        with self._lock:
+            changes = self._changes.take()
+            if changes is not None and not changes:
+                return 0, 0
+            try:
+                if changes is None:
+                    listed, removed = self._reconcile_all()
+                else:
+                    listed, removed = self._reconcile(changes)
+                if listed or removed:
+                    self._save(listed, removed)
+            except BaseException:
+                self._changes.reset()
+                raise
+            if listed or removed:
+                logger.debug("Workspace index: %d directories listed, %d removed", len(listed), len(removed))
+            self.refreshed_at = time.monotonic()
+            return len(listed), len(removed)
+
+    def _reconcile_all(self) -> tuple[list[str], set[str]]:
+        """Check every directory's mtime, and list again those that changed."""
+        matcher = get_gitignore_matcher(self.workspace_root)
+        snapshot = get_workspace_snapshot(self.workspace_root)
+        known_dirs = set(self._dirs)
+        seen: set[str] = set()
+        listed: list[str] = []
+        # Stats handed out may be outdated by now
+        self._entries.clear()
+
+        pending = [""]
+        while pending:
+            rel_dir = pending.pop()
+            abs_dir = self._abs_dir(rel_dir)
+            if snapshot is not None:
+                # Watched before the stat, so the change feed reports what follows
+                try:
+                    snapshot.watch(abs_dir)
+                except OSError:
+                    pass
+            mtime_ns = _mtime_ns(abs_dir)
+            if mtime_ns is None:
+                continue
+            indexed = self._dirs.get(rel_dir)
+            if indexed is None or indexed.mtime_ns != mtime_ns or indexed.gitignore_mtime_ns is not None:
+                # A .gitignore added or removed changes the directory's mtime
+                gitignore_mtime_ns = _mtime_ns(os.path.join(abs_dir, ".gitignore"))
+            else:
+                gitignore_mtime_ns = None
+            if indexed is not None and gitignore_mtime_ns != indexed.gitignore_mtime_ns:
+                # Its rules apply to everything below, so the subtree is listed again
+                matcher.revalidate()
+                self._drop(rel_dir)
+                indexed = None
+
+            if indexed is None or indexed.mtime_ns != mtime_ns:
+                try:
+                    indexed = self._list(rel_dir, abs_dir, mtime_ns, gitignore_mtime_ns, matcher)
+                except OSError:
+                    self._dirs.pop(rel_dir, None)
+                    continue
+                self._dirs[rel_dir] = indexed
+                listed.append(rel_dir)
+            seen.add(rel_dir)
+            pending.extend(
+                f"{rel_dir}/{name}" if rel_dir else name
+                for name, (is_dir, is_symlink) in indexed.entries.items()
+                if is_dir and not is_symlink
+            )
+
+        removed = known_dirs - seen
+        for rel_dir in removed:
+            self._dirs.pop(rel_dir, None)
+        return listed, removed
+
+    def _reconcile(self, changes: ChangeFeed) -> tuple[list[str], set[str]]:
+        """List again the directories ``changes`` reports, and any new ones below them."""
+        matcher = get_gitignore_matcher(self.workspace_root)
+        if any(path.rpartition("/")[2] == ".gitignore" for path in changes.files):
+            matcher.revalidate()
+        for rel_path in changes.files:
+            rel_dir, _sep, name = rel_path.rpartition("/")
+            entry = self._entries.get(rel_dir, {}).get(name)
+            if entry is not None:
+                entry._stat = None
+
+        known_dirs = set(self._dirs)
+        pending = {rel_dir for rel_dir in changes.dirs if rel_dir in self._dirs}
+        for tree in changes.trees:
+            # Listed again from its parent, which finds it missing, moved or new
+            self._drop(tree)
+            pending.discard(tree)
+            parent = tree.rpartition("/")[0]
+            if not tree or parent in self._dirs:
+                pending.add(parent if tree else "")
+        pending = {rel_dir for rel_dir in pending if rel_dir in self._dirs or not rel_dir}
+
+        listed: list[str] = []
+        stack = sorted(pending)
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = self._abs_dir(rel_dir)
+            mtime_ns = _mtime_ns(abs_dir)
+            previous = self._dirs.get(rel_dir)
+            indexed = None
+            if mtime_ns is not None:
+                try:
+                    indexed = self._list(
+                        rel_dir, abs_dir, mtime_ns, _mtime_ns(os.path.join(abs_dir, ".gitignore")), matcher
+                    )
+                except OSError:
+                    pass
+            if indexed is None:
+                self._drop(rel_dir)
+                continue
+            self._dirs[rel_dir] = indexed
+            self._entries.pop(rel_dir, None)
+            listed.append(rel_dir)
+            for name, (is_dir, is_symlink) in (previous.entries.items() if previous else ()):
+                if is_dir and not is_symlink and indexed.entries.get(name) != (True, False):
+                    self._drop(f"{rel_dir}/{name}" if rel_dir else name)
+            stack.extend(
+                subdir
+                for name, (is_dir, is_symlink) in indexed.entries.items()
+                if is_dir and not is_symlink and (subdir := f"{rel_dir}/{name}" if rel_dir else name) not in self._dirs
+            )
+        return listed, known_dirs - set(self._dirs)
+
+    def _drop(self, rel_dir: str) -> None:
+        """Forget ``rel_dir`` and every directory below it."""
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        for stale_dir in [path for path in self._dirs if path == rel_dir or path.startswith(prefix)]:
+            del self._dirs[stale_dir]
+            self._entries.pop(stale_dir, None)
+
+    def _list(
+        self,
+        rel_dir: str,
+        abs_dir: str,
+        mtime_ns: int,
+        gitignore_mtime_ns: int | None,
+        matcher: GitignoreMatcher,
+    ) -> _IndexedDir:
+        entries: dict[str, tuple[bool, bool]] = {}
+        scanned = scandir_entries(abs_dir, self.workspace_root)
+        record_io(files_walked=len(scanned))
+        for entry in scanned:
+            try:
+                is_dir = entry.is_dir()
+                is_symlink = entry.is_symlink()
+            except OSError:
+                continue
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if matcher.is_ignored(rel_path, is_dir):
+                continue
+            if is_symlink and not is_valid_path(entry.path, self.workspace_root, check_gitignore=False)[0]:
+                continue
+            entries[entry.name] = (is_dir, is_symlink)
+        if time.time_ns() - mtime_ns < RACY_MTIME_NS:
+            mtime_ns = _RACY
+        return _IndexedDir(mtime_ns, gitignore_mtime_ns, entries)
+
+    def _save(self, listed: list[str], removed: set[str]) -> None:
+        # Hashes of files no longer listed are dropped with them
+        stale_hashes = []
+        for rel_path in self._hashes:
+            rel_dir, _sep, name = rel_path.rpartition("/")
+            indexed = self._dirs.get(rel_dir)
+            if indexed is None or name not in indexed.entries:
+                stale_hashes.append(rel_path)
+        for rel_path in stale_hashes:
+            del self._hashes[rel_path]
+
+        connection = self._connection
+        with connection:
+            connection.executemany("DELETE FROM dirs WHERE path = ?", [(os.fsencode(path),) for path in removed])
+            connection.executemany(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, gitignore_mtime_ns, entries) VALUES (?, ?, ?, ?)",
+                [
+                    (os.fsencode(path), indexed.mtime_ns, indexed.gitignore_mtime_ns, indexed.encode())
+                    for path in listed
+                    if (indexed := self._dirs.get(path)) is not None
+                ],
+            )
+            connection.executemany(
+                "DELETE FROM hashes WHERE path = ?", [(os.fsencode(path),) for path in stale_hashes]
+            )
+
+    def listing(self, rel_dir: str) -> list[SnapshotEntry] | None:
+        """Return the entries of the workspace relative ``rel_dir`` a walk visits.
+
+        Ignored entries and symlinks leaving the workspace are already left
+        out.  Returns None when the directory is not in the index, such as an
+        ignored directory or one created since the last refresh.
+        """
+        entries = self._entries.get(rel_dir)
+        if entries is None:
+            indexed = self._dirs.get(rel_dir)
+            if indexed is None:
+                return None
+            abs_dir = self._abs_dir(rel_dir)
+            entries = self._entries[rel_dir] = {
+                name: SnapshotEntry(name, os.path.join(abs_dir, name), is_dir, is_symlink)
+                for name, (is_dir, is_symlink) in indexed.entries.items()
+            }
+        return list(entries.values())
+
+    def content_hash(self, path: str) -> str | None:
+        """Return the SHA-256 of the file at ``path``, or None if it cannot be read.
+
+        The stored hash is returned while the file keeps the size and mtime it
+        was hashed at; files outside the workspace are always hashed.
+        """
+        try:
+            stat_info = os.stat(path)
+        except OSError:
+            return None
+        rel_path = self._rel_path(path)
+        if rel_path is None:
+            return hash_file(path)
+
+        cached = self._hashes.get(rel_path)
+        if cached is not None and cached[:2] == (stat_info.st_size, stat_info.st_mtime_ns):
+            return cached[2]
+        digest = hash_file(path)
+        if digest is None or time.time_ns() - stat_info.st_mtime_ns < RACY_MTIME_NS:
+            return digest
+        with self._lock:
+            self._hashes[rel_path] = (stat_info.st_size, stat_info.st_mtime_ns, digest)
+            try:
+                with self._connection:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                        (os.fsencode(rel_path), stat_info.st_size, stat_info.st_mtime_ns, digest),
+                    )
+            except sqlite3.Error as err:
+                logger.debug("Could not store the hash of %s: %s", rel_path, err)
+        return digest
+
+
+_workspace_indexes: dict[str, WorkspaceIndex] = {}
+_workspace_indexes_lock = threading.Lock()
+
+
+def get_workspace_index(workspace_root: str) -> WorkspaceIndex | None:
+    """Return the refreshed workspace index for ``workspace_root``, if enabled.
+
+    The index is opt-in through the ``CODE_IDENTIFIER_WORKSPACE_INDEX``
+    environment variable and stored under :func:`get_cache_dir`, so a later
+    run only lists the directories that changed in between.  It is reconciled
+    with what changed since the previous call (see :meth:`WorkspaceIndex.refresh`).
+    """
+    if not env_flag(WORKSPACE_INDEX_ENV):
+        return None
+
+    key = os.path.abspath(workspace_root)
+    with _workspace_indexes_lock:
+        index = _workspace_indexes.get(key)
+        if index is None:
+            try:
+                index = WorkspaceIndex(key, os.path.join(get_cache_dir(key), "workspace.sqlite"))
+            except (OSError, sqlite3.Error) as err:
+                logger.warning("Workspace index unavailable for %s: %s", key, err)
+                return None
+            _workspace_indexes[key] = index
+
+    try:
+        index.refresh()
+    except sqlite3.Error as err:
+        logger.warning("Workspace index refresh failed for %s: %s", key, err)
+        return None
+    return index
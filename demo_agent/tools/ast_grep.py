@@ -1,18 +1,29 @@
 """ast_grep tool - search for AST patterns in code files using ast-grep."""
 
 import os
-from pathlib import Path
+from typing import Optional, Union
+from pydantic import BaseModel
 from agents import function_tool
-from ast_grep_py import SgRoot
-from ._shared import security_error_handler, is_valid_path, logger
+from ._shared import security_error_handler, walk_workspace
+from ._executor import offloaded
+from ._ast_search import iter_file_matches
+
+
+class AstGrepRule(BaseModel):
+    """A named AST pattern for batch ast_grep searches."""
+
+    name: str
+    pattern: str
 
 
 @function_tool(failure_error_function=security_error_handler)
+@offloaded
 def ast_grep(
-    pattern: str,
+    pattern: Union[str, list[str]] = "",
     file_pattern: str = "**/*.py",
     language: str = "python",
-    max_results: int = 50
+    max_results: int = 50,
+    rules: Optional[list[AstGrepRule]] = None
 ) -> str:
     """
     Search for AST patterns in files within the workspace using ast-grep.
@@ -21,90 +32,92 @@ def ast_grep(
     matching, which is more powerful than simple text search. It can find code structures
     like function definitions, class declarations, specific expressions, etc.
 
+    Several patterns can be searched at once: every file is read and parsed only once
+    for all of them, so prefer one batched call over several calls on the same files.
+
     Args:
-        pattern: The AST pattern to search for (e.g., "def $FUNC($$$ARGS):", "class $CLASS:")
+        pattern: The AST pattern to search for (e.g., "def $FUNC($$$ARGS):", "class $CLASS:"),
+            or a list of patterns to search in one pass
         file_pattern: File pattern to search in (default: "**/*.py")
         language: Programming language to parse (default: "python")
-        max_results: Maximum number of results to return (default: 50)
+        max_results: Maximum number of results to return per pattern (default: 50)
+        rules: Named patterns to search in the same pass, e.g.
+            [{"name": "loops", "pattern": "for $X in $Y: $$$"}] (default: None)
 
     Returns:
-        A formatted string containing all matches with file paths and line numbers
+        A formatted string containing all matches with file paths and line numbers,
+        grouped by pattern when more than one pattern is searched
 
     Examples:
         - ast_grep("def $FUNC($$$ARGS):") - Find all function definitions
         - ast_grep("class $CLASS:") - Find all class definitions
         - ast_grep("print($A)") - Find all print statements
         - ast_grep("if $COND:", "**/*.js", "javascript") - Find if statements in JS files
+        - ast_grep(["$X.objects.filter($$$)", "$X.objects.all()"]) - Find both query styles in one pass
     """
-    if not pattern:
+    # Patterns given directly are named after themselves
+    named_patterns = [(p, p) for p in ([pattern] if isinstance(pattern, str) else pattern) if p]
+    named_patterns += [(rule.name, rule.pattern) for rule in rules or [] if rule.pattern]
+    if not named_patterns:
         raise ValueError("No pattern provided")
 
     workspace_root = os.getcwd()
-    results = []
+    patterns = [rule_pattern for _name, rule_pattern in named_patterns]
+    results: list[list[str]] = [[] for _ in patterns]
     files_searched = 0
-
-    # Get all matching files
-    for file_path in Path(workspace_root).glob(file_pattern):
-        if file_path.is_file():
-            # Validate the path is within workspace
-            is_valid, _ = is_valid_path(str(file_path), workspace_root)
-            if not is_valid:
-                # Skip files outside workspace or ignored by .gitignore
-                continue
-
-            try:
-                files_searched += 1
-
-                # Read file content
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-
-                if not content.strip():
-                    continue
-
-                # Parse with ast-grep
-                try:
-                    root = SgRoot(content, language)
-                    root_node = root.root()
-
-                    # Find all matches
-                    matches = root_node.find_all(pattern=pattern)
-
-                    for match in matches:
-                        if len(results) >= max_results:
-                            break
-
-                        # Get match details
-                        match_text = match.text()
-                        match_range = match.range()
-                        line_num = match_range.start.line + 1  # Convert to 1-based
-                        col_num = match_range.start.column + 1  # Convert to 1-based
-
-                        # Get relative path
-                        rel_path = os.path.relpath(str(file_path), workspace_root)
-
-                        # Format result
-                        result = f"File: {rel_path}:{line_num}:{col_num}\n{match_text}\n"
-                        results.append(result)
-
-                except Exception as e:
-                    # Skip files that can't be parsed (e.g., binary files, syntax errors)
-                    logger.debug(f"Could not parse {file_path} with ast-grep: {e}")
-                    continue
-
-            except (PermissionError, UnicodeDecodeError):
-                # Skip unreadable files
-                continue
-
-    if not results:
-        return f"No matches found for pattern '{pattern}' in {files_searched} files searched."
-
-    # Format final output
-    output = f"Found {len(results)} matches for pattern '{pattern}' in {files_searched} files:\n\n"
-    output += "=" * 80 + "\n\n"
-    output += "\n".join(results)
-
-    if len(results) >= max_results:
-        output += f"\n\n... (showing first {max_results} results)"
-
-    return output
\ No newline at end of file
+    parses_avoided = 0
+
+    # Walk once, pruning ignored directories before descending; files are
+    # parsed in-process or by the worker pool and come back in walk order
+    candidates = (
+        (rel_path, entry.path)
+        for rel_path, entry in walk_workspace(file_pattern, workspace_root)
+    )
+    for rel_path, file_matches in iter_file_matches(candidates, patterns, language, max_results):
+        files_searched += 1
+        if all(matches is None for matches in file_matches.values()):
+            # Skipped by the literal-token prefilter without parsing
+            parses_avoided += 1
+
+        for index, matches in file_matches.items():
+            for line_num, col_num, match_text in matches or ():
+                if len(results[index]) >= max_results:
+                    break
+
+                # Format result
+                result = f"File: {rel_path}:{line_num}:{col_num}\n{match_text}\n"
+                results[index].append(result)
+
+    skipped_note = f" ({parses_avoided} skipped without parsing)" if parses_avoided else ""
+
+    if len(patterns) == 1:
+        pattern_results = results[0]
+        if not pattern_results:
+            return f"No matches found for pattern '{patterns[0]}' in {files_searched} files searched{skipped_note}."
+
+        # Format final output
+        output = f"Found {len(pattern_results)} matches for pattern '{patterns[0]}' in {files_searched} files{skipped_note}:\n\n"
+        output += "=" * 80 + "\n\n"
+        output += "\n".join(pattern_results)
+
+        if len(pattern_results) >= max_results:
+            output += f"\n\n... (showing first {max_results} results)"
+
+        return output
+
+    # Batch output: one section per pattern, in the order they were given
+    total = sum(len(pattern_results) for pattern_results in results)
+    output = f"Found {total} matches for {len(patterns)} patterns in {files_searched} files{skipped_note}:\n"
+    for (name, rule_pattern), pattern_results in zip(named_patterns, results):
+        label = f"'{rule_pattern}'" if name == rule_pattern else f"{name} ('{rule_pattern}')"
+        output += "\n" + "=" * 80 + "\n"
+        output += f"Pattern {label}: {len(pattern_results)} matches\n"
+        output += "=" * 80 + "\n\n"
+        if not pattern_results:
+            output += "No matches found.\n"
+            continue
+        output += "\n".join(pattern_results)
+        if len(pattern_results) >= max_results:
+            output += f"\n... (showing first {max_results} results)\n"
+
+    return output
@@ -1,13 +1,16 @@
 """find tool - search for text across files in the workspace."""
 
 import os
-import re
-from pathlib import Path
 from agents import function_tool
-from ._shared import security_error_handler, is_valid_path
+from ._shared import security_error_handler, walk_workspace, GlobPattern
+from ._executor import offloaded
+from ._search import compile_search, search_files
+from ._snapshot import stat_path
+from ._trigram import get_trigram_index
 
 
 @function_tool(failure_error_function=security_error_handler)
+@offloaded
 def find(
     search_text: str,
     file_pattern: str = "**/*",
@@ -42,60 +45,43 @@ def find(
         raise ValueError("max_results must be >= 1")
 
     workspace_root = os.getcwd()
-    matches_with_info = []
 
-    # Prepare search text based on options
-    if whole_word:
-        if case_sensitive:
-            search_pattern = re.compile(r'\b' + re.escape(search_text) + r'\b')
-        else:
-            search_pattern = re.compile(r'\b' + re.escape(search_text) + r'\b', re.IGNORECASE)
-    else:
-        if not case_sensitive:
-            search_text_lower = search_text.lower()
+    # Matching runs on raw bytes, see compile_search
+    predicate = compile_search(search_text, case_sensitive=case_sensitive, whole_word=whole_word)
 
     # Normalize the file pattern for cross-platform compatibility
     file_pattern = os.path.normpath(file_pattern)
 
-    # Use pathlib for recursive file search
-    for file_path in Path(workspace_root).glob(file_pattern):
-        if file_path.is_file():
-            # Stop if we've reached max_results
-            if len(matches_with_info) >= max_results:
-                break
-
-            # Validate the path is within workspace
-            is_valid, _ = is_valid_path(str(file_path), workspace_root)
-            if not is_valid:
-                # Skip files outside workspace or ignored by .gitignore
-                continue
-
-            try:
-                # Search for text in file
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-
-                    # Perform search based on options
-                    found = False
-                    if whole_word:
-                        found = bool(search_pattern.search(content))
-                    elif case_sensitive:
-                        found = search_text in content
-                    else:
-                        found = search_text_lower in content.lower()
-
-                    if found:
-                        # Use os.path.relpath for cross-platform relative paths
-                        rel_path = os.path.relpath(str(file_path), workspace_root)
-                        stat_info = os.stat(file_path)
-                        matches_with_info.append({
-                            'path': rel_path,
-                            'mtime': stat_info.st_mtime
-                        })
+    # With the optional trigram index only files that contain every trigram
+    # of the query are read; otherwise walk once, pruning ignored directories.
+    # Both visit files in sorted walk order, so max_results keeps the same files
+    index = get_trigram_index(workspace_root)
+    indexed_paths = index.candidates(search_text, case_sensitive) if index else None
+    if indexed_paths is not None:
+        glob_pattern = GlobPattern(file_pattern)
+        candidates = (
+            (rel_path, os.path.join(workspace_root, rel_path))
+            for rel_path in indexed_paths
+            if glob_pattern.match_path(rel_path)
+        )
+    else:
+        candidates = (
+            (rel_path, entry.path)
+            for rel_path, entry in walk_workspace(file_pattern, workspace_root, sort_entries=True)
+        )
 
-            except (PermissionError, UnicodeDecodeError):
-                # Skip unreadable files
-                continue
+    # Worker threads search candidates as they are produced; producing stops
+    # as soon as max_results is reached
+    matches_with_info = []
+    for rel_path in search_files(candidates, predicate, max_results=max_results):
+        try:
+            mtime = stat_path(os.path.join(workspace_root, rel_path), workspace_root).st_mtime
+        except OSError:
+            mtime = 0
+        matches_with_info.append({
+            'path': rel_path,
+            'mtime': mtime
+        })
 
     # Sort the matches
     if sort_by == "name":
@@ -1,12 +1,56 @@
 """glob tool - resolve glob patterns within the workspace."""
 
+import heapq
 import os
-import glob as glob_module
+from typing import Any
 from agents import function_tool
-from ._shared import security_error_handler, is_valid_path
+from ._shared import security_error_handler, walk_workspace
+from ._executor import offloaded
+
+
+class _Descending:
+    """Wraps an item so it orders in reverse, making heapq's min-heap a max-heap."""
+
+    __slots__ = ("item",)
+
+    def __init__(self, item: Any) -> None:
+        self.item = item
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.item < self.item
+
+
+class _TopK:
+    """The ``k`` smallest (or largest) items pushed so far, kept in a bounded heap."""
+
+    def __init__(self, k: int, largest: bool) -> None:
+        self.k = k
+        self.largest = largest
+        # Min-heap of the largest items, or max-heap of the smallest ones;
+        # either way heap[0] is the item that is dropped next
+        self._heap: list[Any] = []
+
+    def push(self, item: Any) -> None:
+        entry = item if self.largest else _Descending(item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif self._heap[0] < entry:
+            heapq.heapreplace(self._heap, entry)
+
+    def boundary(self) -> Any:
+        """Return the k-th item once k items are kept, else None."""
+        if len(self._heap) < self.k:
+            return None
+        return self._heap[0] if self.largest else self._heap[0].item
+
+    def items(self) -> list[Any]:
+        """Return the kept items, smallest first (largest first when ``largest``)."""
+        items = self._heap if self.largest else [entry.item for entry in self._heap]
+        return sorted(items, reverse=self.largest)
 
 
 @function_tool(failure_error_function=security_error_handler)
+@offloaded
 def glob(
     pattern: str,
     sort_by: str = "name",
@@ -34,42 +78,59 @@ def glob(
     if max_results < 1:
         raise ValueError("max_results must be >= 1")
 
-    # Get all matching files
-    matches = glob_module.glob(pattern)
-
-    # Filter out any matches that are outside the current working directory or ignored
     workspace_root = os.getcwd()
-    valid_matches_with_info = []
 
-    for match in matches:
-        is_valid, _ = is_valid_path(match, workspace_root)
-        if is_valid:
+    # Patterns are resolved relative to the workspace; absolute patterns must
+    # point inside it and produce absolute results, like glob.glob would
+    relative_pattern = os.path.normpath(pattern)
+    output_prefix = ""
+    if os.path.isabs(relative_pattern):
+        relative_pattern = os.path.relpath(relative_pattern, workspace_root)
+        output_prefix = workspace_root
+    if relative_pattern == os.pardir or relative_pattern.startswith(os.pardir + os.sep):
+        return []
+
+    # Only the max_results best matches are kept, as (key, walk position,
+    # path); the position breaks ties in walk order, like a stable sort would
+    top = _TopK(max_results, largest=reverse)
+
+    def descend(rel_dir: str) -> bool:
+        # Everything below rel_dir sorts by a name starting with this prefix;
+        # once the heap is full, skip directories that cannot beat its boundary
+        boundary = top.boundary()
+        if boundary is None:
+            return True
+        prefix = rel_dir.lower() + "/"
+        if reverse:
+            return boundary[0].startswith(prefix) or prefix > boundary[0]
+        return prefix < boundary[0]
+
+    # Walk once, pruning ignored directories before descending.  For name
+    # order the walk goes in name order too, so the heap fills with the
+    # winners early and the remaining directories are skipped unread.
+    by_name = sort_by == "name"
+    walk = walk_workspace(
+        relative_pattern,
+        workspace_root,
+        include_dirs=True,
+        include_hidden=False,
+        sort_entries=by_name,
+        reverse=reverse,
+        descend=descend if by_name else None,
+    )
+    for position, (rel_path, entry) in enumerate(walk):
+        if by_name:
+            key: Any = rel_path.lower()
+        else:
             try:
-                stat_info = os.stat(match)
-                valid_matches_with_info.append({
-                    'path': match,
-                    'mtime': stat_info.st_mtime,
-                    'size': stat_info.st_size
-                })
+                stat_info = entry.stat()
+                key = stat_info.st_mtime if sort_by == "mtime" else stat_info.st_size
             except (OSError, PermissionError):
                 # Include files we can't stat
-                valid_matches_with_info.append({
-                    'path': match,
-                    'mtime': 0,
-                    'size': 0
-                })
-
-    # Sort the matches
-    if sort_by == "name":
-        valid_matches_with_info.sort(key=lambda x: x['path'].lower())
-    elif sort_by == "mtime":
-        valid_matches_with_info.sort(key=lambda x: x['mtime'])
-    elif sort_by == "size":
-        valid_matches_with_info.sort(key=lambda x: x['size'])
-
-    if reverse:
-        valid_matches_with_info.reverse()
-
-    # Apply max_results limit and return just the paths
-    limited_matches = valid_matches_with_info[:max_results]
-    return [match['path'] for match in limited_matches]
\ No newline at end of file
+                key = 0
+        top.push((key, position, rel_path))
+
+    return [
+        os.path.join(output_prefix, rel_path) if output_prefix else rel_path
+        for _key, _position, rel_path in top.items()
+    ]
\ No newline at end of file
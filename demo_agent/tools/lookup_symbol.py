@@ -0,0 +1,71 @@
+"""lookup_symbol tool - find where classes, models and functions are defined."""
+
+import os
+from agents import function_tool
+from ._shared import security_error_handler
+from ._executor import offloaded
+from ._symbol_index import get_symbol_index
+
+VALID_KINDS = ("class", "model", "function", "method")
+
+
+@function_tool(failure_error_function=security_error_handler)
+@offloaded
+def lookup_symbol(
+    name: str,
+    kind: str = "",
+    max_results: int = 20
+) -> str:
+    """
+    Find the definitions of a class, model, function or method in the workspace.
+
+    Answers from a prebuilt index of every Python file, so one call replaces searching
+    with find/glob and reading files to locate a definition. Use the returned line span
+    with read_files(start_line=..., end_line=...) to read only the definition.
+
+    Args:
+        name: Symbol name, e.g. "Order", "get_queryset", or a qualified method name
+            such as "OrderViewSet.get_queryset"
+        kind: Only return this kind of definition: "class", "model", "function" or
+            "method" (default: any)
+        max_results: Maximum number of definitions to return (default: 20)
+
+    Returns:
+        Each definition's file, line span, kind and signature; classes also list
+        their base classes and methods
+
+    Examples:
+        - lookup_symbol("Order") - Find the Order model or class
+        - lookup_symbol("Order.save") - Find the save method of Order
+        - lookup_symbol("paginate", kind="function") - Find a helper function
+    """
+    name = name.strip()
+    if not name:
+        raise ValueError("No name provided")
+    if kind and kind not in VALID_KINDS:
+        raise ValueError(f"kind must be one of: {', '.join(VALID_KINDS)}")
+    if max_results < 1:
+        raise ValueError("max_results must be >= 1")
+
+    index = get_symbol_index(os.getcwd())
+    definitions = index.find_definitions(name, [kind] if kind else None)
+    if not definitions:
+        return f"No definitions found for '{name}'" + (f" of kind '{kind}'." if kind else ".")
+
+    output = f"Found {len(definitions)} definitions of '{name}':\n\n"
+    for definition in definitions[:max_results]:
+        output += f"File: {definition.path}:{definition.start_line}-{definition.end_line} ({definition.kind} {definition.qualname})\n"
+        output += f"{definition.signature}\n"
+        if definition.kind in ("class", "model"):
+            prefix = definition.qualname + "."
+            methods = [
+                member.name for member in index.definitions_in(definition.path)
+                if member.kind == "method" and member.qualname == prefix + member.name
+            ]
+            if methods:
+                output += f"Methods: {', '.join(methods)}\n"
+        output += "\n"
+
+    if len(definitions) > max_results:
+        output += f"... (showing first {max_results} results)"
+    return output.rstrip("\n")
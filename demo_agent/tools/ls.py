@@ -1,16 +1,45 @@
 """ls tool - list directories/files relative to the workspace."""
 
+import heapq
 import os
+from typing import Any, Iterator
 from agents import function_tool
-from ._shared import is_valid_path
+from ._shared import get_gitignore_matcher, is_valid_path
+from ._executor import offloaded
+from ._instrumentation import record_io
+from ._snapshot import scandir_entries
+
+
+def _sort_key(entry: os.DirEntry[str], is_dir: bool, is_symlink: bool, sort_by: str) -> Any:
+    """Return the sort key of ``entry``; only the mtime and size sorts stat it."""
+    if sort_by == "name":
+        return (not is_dir, entry.name.lower())
+    if sort_by == "type":
+        # Only a broken symlink has no type; entry types come from scandir
+        item_type = "directory" if is_dir else "file"
+        if is_symlink and not is_dir and not os.path.exists(entry.path):
+            item_type = "unknown"
+        return (item_type, entry.name.lower())
+
+    try:
+        # Cached by the DirEntry, so each entry is stat'ed at most once
+        stat_info = entry.stat()
+    except OSError:
+        return 0 if sort_by == "mtime" else (False, 0)
+    if sort_by == "mtime":
+        return stat_info.st_mtime
+    return (is_dir, stat_info.st_size)
 
 
 @function_tool()
+@offloaded
 def ls(
     path: str = ".",
     sort_by: str = "name",
     show_hidden: bool = False,
-    reverse: bool = False
+    reverse: bool = False,
+    max_entries: int = 1000,
+    offset: int = 0
 ) -> list[str]:
     """
     List directories/files relative to the workspace.
@@ -19,69 +48,71 @@ def ls(
         sort_by: Sort method - "name", "mtime", "size", "type" (default: "name")
         show_hidden: Include hidden files/directories (default: False)
         reverse: Reverse the sort order (default: False)
+        max_entries: Maximum number of entries to return (default: 1000)
+        offset: Number of entries to skip in sort order, for paging (default: 0)
     Returns:
-        A list of directories/files
+        A list of directories/files. When more entries follow, the last item
+        says how many and which offset lists the next page.
     """
     # Validate sort_by parameter
     valid_sorts = ["name", "mtime", "size", "type"]
     if sort_by not in valid_sorts:
         raise ValueError(f"sort_by must be one of: {', '.join(valid_sorts)}")
+    if max_entries < 1:
+        raise ValueError("max_entries must be >= 1")
+    if offset < 0:
+        raise ValueError("offset must be >= 0")
 
     is_valid, validated_path = is_valid_path(path)
     if not is_valid:
         return []
 
     workspace_root = os.getcwd()
+    matcher = get_gitignore_matcher(workspace_root)
+    rel_dir = os.path.relpath(validated_path, workspace_root).replace(os.sep, "/")
+    rel_dir = "" if rel_dir == "." else rel_dir
 
-    # Get all items in the directory with their metadata
-    items_with_info = []
-    try:
-        all_items = os.listdir(validated_path)
+    scanned = 0
+    listed = 0
 
-        for item in all_items:
+    def keyed_entries(entries: list[os.DirEntry[str]]) -> Iterator[tuple[Any, int, str]]:
+        nonlocal scanned, listed
+        for entry in entries:
+            scanned += 1
             # Skip hidden files unless requested
-            if not show_hidden and item.startswith('.'):
+            if not show_hidden and entry.name.startswith('.'):
                 continue
+            try:
+                is_dir = entry.is_dir()
+                is_symlink = entry.is_symlink()
+            except OSError:
+                is_dir = is_symlink = False
 
-            item_path = os.path.join(validated_path, item)
-            is_item_valid, _ = is_valid_path(item_path, workspace_root)
-            if is_item_valid:
-                try:
-                    stat_info = os.stat(item_path)
-                    is_dir = os.path.isdir(item_path)
-                    items_with_info.append({
-                        'name': item,
-                        'path': item_path,
-                        'is_dir': is_dir,
-                        'size': stat_info.st_size,
-                        'mtime': stat_info.st_mtime,
-                        'type': 'directory' if is_dir else 'file'
-                    })
-                except (OSError, PermissionError):
-                    # Include items we can't stat but still list them
-                    items_with_info.append({
-                        'name': item,
-                        'path': item_path,
-                        'is_dir': False,
-                        'size': 0,
-                        'mtime': 0,
-                        'type': 'unknown'
-                    })
-    except (OSError, PermissionError):
-        return []
-
-    # Sort the items
-    if sort_by == "name":
-        items_with_info.sort(key=lambda x: (not x['is_dir'], x['name'].lower()))
-    elif sort_by == "mtime":
-        items_with_info.sort(key=lambda x: x['mtime'])
-    elif sort_by == "size":
-        items_with_info.sort(key=lambda x: (x['is_dir'], x['size']))
-    elif sort_by == "type":
-        items_with_info.sort(key=lambda x: (x['type'], x['name'].lower()))
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if matcher.is_ignored(rel_path, is_dir):
+                continue
+            if is_symlink and not is_valid_path(entry.path, workspace_root, check_gitignore=False)[0]:
+                continue
+            listed += 1
+            # The scan position breaks ties in listing order
+            yield _sort_key(entry, is_dir, is_symlink, sort_by), scanned, entry.name
 
-    if reverse:
-        items_with_info.reverse()
+    # Only the entries up to the end of the requested page are kept: the
+    # listing costs O(n log k) for k = offset + max_entries, not a full sort
+    wanted = offset + max_entries
+    try:
+        entries = scandir_entries(validated_path, workspace_root)
+        if reverse:
+            page = heapq.nlargest(wanted, keyed_entries(entries))
+        else:
+            page = heapq.nsmallest(wanted, keyed_entries(entries))
+    except OSError:
+        return []
+    finally:
+        record_io(files_walked=scanned)
 
-    # Return list of item names
-    return [item['name'] for item in items_with_info]
\ No newline at end of file
+    names = [name for _key, _position, name in page[offset:]]
+    remaining = listed - offset - len(names)
+    if remaining > 0:
+        names.append(f"… {remaining} more entries (next page: offset={offset + max_entries})")
+    return names
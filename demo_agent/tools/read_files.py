@@ -1,16 +1,58 @@
 """read_files tool - read the contents of one or more files."""
 
+from itertools import islice
 from typing import Optional
 from agents import function_tool
-from ._shared import security_error_handler, is_valid_path
+from ._shared import security_error_handler, is_valid_path, file_content_cache
+from ._executor import offloaded
+from ._line_index import read_line_range, supports_line_index
+
+
+def _read_range(
+    path: str,
+    start_line: int,
+    end_line: Optional[int],
+    max_lines_per_file: Optional[int],
+    include_line_numbers: bool,
+    encoding: str
+) -> str:
+    """Read a line range of one file, numbering lines by their position in the file."""
+    last_line = end_line
+    if max_lines_per_file is not None and (last_line is None or last_line - start_line + 1 > max_lines_per_file):
+        last_line = start_line + max_lines_per_file - 1
+
+    if supports_line_index(encoding):
+        lines, total_lines = read_line_range(path, start_line, last_line, encoding)
+    else:
+        # Byte offsets are meaningless for this encoding; skip lines as text
+        with open(path, "r", encoding=encoding, errors="ignore") as f:
+            lines = [line.rstrip('\n\r') for line in islice(f, start_line - 1, last_line)]
+        total_lines = None
+
+    if not lines:
+        if total_lines is None:
+            return f"... (no lines from line {start_line})"
+        return f"... (no lines from line {start_line}; file has {total_lines} lines)"
+
+    if include_line_numbers:
+        lines = [f"{i:4d}: {line}" for i, line in enumerate(lines, start_line)]
+
+    more_requested = end_line is None or end_line > last_line
+    if last_line != end_line and more_requested and (total_lines is None or total_lines > last_line):
+        lines.append(f"... (truncated after {max_lines_per_file} lines)")
+
+    return "\n".join(lines)
 
 
 @function_tool(failure_error_function=security_error_handler)
+@offloaded
 def read_files(
     files: list[str],
     include_line_numbers: bool = False,
     max_lines_per_file: Optional[int] = None,
-    encoding: str = "utf-8"
+    encoding: str = "utf-8",
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None
 ) -> str:
     """
     Read the contents of one or more files within the workspace, respecting .gitignore patterns.
@@ -19,6 +61,8 @@ def read_files(
         include_line_numbers: Add line numbers to the output (default: False)
         max_lines_per_file: Maximum lines to read per file (default: None for unlimited)
         encoding: Text encoding to use (default: "utf-8")
+        start_line: First line to read, 1-based (default: None for the start of the file)
+        end_line: Last line to read, inclusive (default: None for the end of the file)
     Returns:
         A string containing the contents of all files, with file headers for multi-file reads.
     Raises:
@@ -31,6 +75,14 @@ def read_files(
     if max_lines_per_file is not None and max_lines_per_file < 1:
         raise ValueError("max_lines_per_file must be >= 1")
 
+    if start_line is not None and start_line < 1:
+        raise ValueError("start_line must be >= 1")
+
+    if end_line is not None and end_line < (start_line or 1):
+        raise ValueError("end_line must be >= start_line")
+
+    read_range = start_line is not None or end_line is not None
+
     result_parts = []
     
     for file in files:
@@ -39,39 +91,45 @@ def read_files(
             raise ValueError(f"Invalid or inaccessible file path: {file}")
 
         try:
-            with open(validated_path, "r", encoding=encoding, errors="ignore") as f:
-                if max_lines_per_file is not None:
-                    # Read line by line with limit
-                    lines = []
-                    for i, line in enumerate(f, 1):
-                        if i > max_lines_per_file:
-                            lines.append(f"... (truncated after {max_lines_per_file} lines)")
-                            break
-                        lines.append(line.rstrip('\n\r'))
-
-                    if include_line_numbers:
-                        numbered_lines = []
-                        for i, line in enumerate(lines, 1):
-                            if line.startswith("... (truncated"):
-                                numbered_lines.append(line)
-                            else:
-                                numbered_lines.append(f"{i:4d}: {line}")
-                        content = "\n".join(numbered_lines)
+            if read_range:
+                # Served from a cached newline index, costing O(range) not O(file)
+                content = _read_range(
+                    validated_path, start_line or 1, end_line, max_lines_per_file, include_line_numbers, encoding
+                )
+            else:
+                with file_content_cache.open_text(validated_path, encoding) as f:
+                    if max_lines_per_file is not None:
+                        # Read line by line with limit
+                        lines = []
+                        for i, line in enumerate(f, 1):
+                            if i > max_lines_per_file:
+                                lines.append(f"... (truncated after {max_lines_per_file} lines)")
+                                break
+                            lines.append(line.rstrip('\n\r'))
+
+                        if include_line_numbers:
+                            numbered_lines = []
+                            for i, line in enumerate(lines, 1):
+                                if line.startswith("... (truncated"):
+                                    numbered_lines.append(line)
+                                else:
+                                    numbered_lines.append(f"{i:4d}: {line}")
+                            content = "\n".join(numbered_lines)
+                        else:
+                            content = "\n".join(lines)
                     else:
-                        content = "\n".join(lines)
-                else:
-                    # Read entire file
-                    content = f.read()
-                    if include_line_numbers:
-                        lines = content.split('\n')
-                        numbered_lines = [f"{i:4d}: {line}" for i, line in enumerate(lines, 1)]
-                        content = "\n".join(numbered_lines)
-
-                # Add file header for multi-file reads
-                if len(files) > 1:
-                    result_parts.append(f"=== File: {file} ===\n{content}\n")
-                else:
-                    result_parts.append(content)
+                        # Read entire file
+                        content = f.read()
+                        if include_line_numbers:
+                            lines = content.split('\n')
+                            numbered_lines = [f"{i:4d}: {line}" for i, line in enumerate(lines, 1)]
+                            content = "\n".join(numbered_lines)
+
+            # Add file header for multi-file reads
+            if len(files) > 1:
+                result_parts.append(f"=== File: {file} ===\n{content}\n")
+            else:
+                result_parts.append(content)
 
         except UnicodeDecodeError as e:
             raise ValueError(f"Cannot decode file {file} with encoding {encoding}: {e}")
@@ -0,0 +1,108 @@
+"""resolve_import tool - map imports to the workspace files and definitions they refer to."""
+
+import os
+from agents import function_tool
+from ._shared import security_error_handler, is_valid_path
+from ._executor import offloaded
+from ._symbol_index import Definition, Resolution, SymbolIndex, get_symbol_index
+
+
+def _format_definition(definition: Definition) -> str:
+    return (
+        f"{definition.kind} {definition.path}:{definition.start_line}-{definition.end_line} "
+        f"{definition.signature}"
+    )
+
+
+def _describe(resolution: Resolution) -> str:
+    if resolution.status == "definition":
+        return "; ".join(_format_definition(definition) for definition in resolution.definitions)
+    if resolution.status == "module":
+        return f"module {resolution.path}"
+    if resolution.status == "missing":
+        if resolution.path is None:
+            return "not found in the workspace"
+        return f"not found in {resolution.path or '.'}"
+    return "external (not in workspace)"
+
+
+def _module_target(index: SymbolIndex, module: str, from_file: str | None, external: str) -> str:
+    rel_path = index.resolve_module(module, from_file)
+    if rel_path is not None:
+        return rel_path
+    package = index.resolve_package(module, from_file)
+    if package is not None:
+        return f"package {package or '.'}/"
+    # Relative imports always point into the workspace
+    return "not found" if module.startswith(".") else external
+
+
+@function_tool(failure_error_function=security_error_handler)
+@offloaded
+def resolve_import(
+    module: str = "",
+    from_file: str = "",
+    name: str = ""
+) -> str:
+    """
+    Resolve imports to the workspace files and definitions they refer to.
+
+    Answers from a prebuilt index of every Python file, so one call replaces the
+    find/glob/read_files turns otherwise spent chasing each import. Re-exports through
+    package __init__ files are followed.
+
+    Args:
+        module: Module to resolve, as written in the import (e.g. "orders.models" or
+            ".models"). Leave empty to resolve every import of from_file
+        from_file: File containing the import; required for relative modules and when
+            module is empty
+        name: Name imported from the module (e.g. "Order"), to locate its definition
+
+    Returns:
+        The file each module resolves to ("external" for third-party and standard
+        library modules) and the file, line span and signature of each imported name
+
+    Examples:
+        - resolve_import(from_file="orders/views.py") - Resolve all imports of a file
+        - resolve_import(".models", "orders/views.py", "Order") - Find the imported Order class
+        - resolve_import("orders.services") - Find the file of a module
+    """
+    workspace_root = os.getcwd()
+    rel_from_file = None
+    if from_file:
+        is_valid, abs_path = is_valid_path(from_file)
+        if not is_valid:
+            raise ValueError(f"Invalid file: {from_file}")
+        rel_from_file = os.path.relpath(abs_path, workspace_root).replace(os.sep, "/")
+    if not module and rel_from_file is None:
+        raise ValueError("Provide a module, a from_file, or both")
+
+    index = get_symbol_index(workspace_root)
+
+    if module:
+        if name:
+            return f"{name} from {module}: {_describe(index.resolve_name(module, rel_from_file, name))}"
+        return f"{module}: {_module_target(index, module, rel_from_file, 'external (not in workspace)')}"
+
+    imports = index.imports_of(rel_from_file)
+    if imports is None:
+        return f"{rel_from_file} is not an indexed Python file."
+    if not imports:
+        return f"No imports found in {rel_from_file}."
+
+    output = f"Imports of {rel_from_file}:\n"
+    for imported in imports:
+        target = _module_target(index, imported.module, rel_from_file, "external")
+        if not imported.names:
+            alias = f" as {imported.alias}" if imported.alias else ""
+            output += f"\nline {imported.line}: import {imported.module}{alias} -> {target}\n"
+            continue
+
+        names = ", ".join(f"{imported_name} as {alias}" if alias else imported_name for imported_name, alias in imported.names)
+        output += f"\nline {imported.line}: from {imported.module} import {names} -> {target}\n"
+        if target == "external":
+            continue
+        for imported_name, _alias in imported.names:
+            if imported_name != "*":
+                output += f"  {imported_name}: {_describe(index.resolve_name(imported.module, rel_from_file, imported_name))}\n"
+    return output.rstrip("\n")
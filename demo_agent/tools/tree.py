@@ -1,13 +1,35 @@
 """tree tool - render directory tree structure."""
 
 import os
+from collections import Counter
 from pathlib import Path
 from agents import function_tool
-from directory_tree import display_tree as directory_display_tree
-from ._shared import security_error_handler, is_valid_path, logger
+from ._shared import security_error_handler, get_gitignore_matcher, is_valid_path
+from ._executor import offloaded
+from ._instrumentation import record_io
+from ._snapshot import scandir_entries
+from ._workspace_index import get_workspace_index
+
+# Directories with more files than this list their subdirectories and
+# summarise the files on one line instead
+COLLAPSE_FILES_THRESHOLD = 50
+
+# Extensions named in a summary line; the rest are counted as "other"
+SUMMARY_EXTENSIONS = 3
+
+
+def _summarise_files(names: list[str]) -> str:
+    """Return e.g. ``1,204 files: 1,100 .py, 104 .json`` for ``names``."""
+    extensions = Counter(os.path.splitext(name)[1].lower() or "no extension" for name in names)
+    parts = [f"{count:,} {extension}" for extension, count in extensions.most_common(SUMMARY_EXTENSIONS)]
+    other = len(names) - sum(count for _extension, count in extensions.most_common(SUMMARY_EXTENSIONS))
+    if other:
+        parts.append(f"{other:,} other")
+    return f"{len(names):,} files: {', '.join(parts)}"
 
 
 @function_tool(failure_error_function=security_error_handler)
+@offloaded
 def tree(
     path: str = ".",
     *,
@@ -15,7 +37,10 @@ def tree(
     include_files: bool = True,
     max_entries: int = 200,
 ) -> str:
-    """Render a directory tree rooted at ``path`` using ``directory_tree``.
+    """Render a directory tree rooted at ``path``, skipping ``.gitignore``d and hidden entries.
+
+    Directories holding many files show their subdirectories and a one line
+    summary of the files, such as ``1,204 files: 1,100 .py, 104 .json``.
 
     Args:
         path: Directory to render; defaults to the current workspace root.
@@ -59,39 +84,69 @@ def tree(
     root_label = path if path not in ("", ".") else Path(workspace_root).name
     root_label = (root_label or validated_path.name) + "/"
 
-    only_dirs = not include_files
-
-    try:
-        rendered = directory_display_tree(
-            dir_path=str(validated_path),
-            string_rep=True,
-            header=False,
-            max_depth=max_depth,
-            show_hidden=False,
-            ignore_list=None,
-            only_files=False,
-            only_dirs=only_dirs,
-            sort_by=0,
-            raise_exception=True,
-            print_error_traceback=False,
-        )
-    except Exception as err:
-        logger.warning("Failed to render tree for %s: %s", validated_path, err)
-        raise
-
-    if rendered is None:
-        rendered = ""
-
+    matcher = get_gitignore_matcher(workspace_root)
+    index = get_workspace_index(workspace_root)
+    rel_root = os.path.relpath(validated_path_str, workspace_root).replace(os.sep, "/")
     rendered_lines = [root_label.rstrip("/") + "/"]
     entries_added = 0
 
-    for line in rendered.splitlines():
-        if not line.strip():
-            continue
-        rendered_lines.append(line)
-        entries_added += 1
-        if entries_added >= max_entries:
-            rendered_lines.append("└── …")
-            break
-
-    return "\n".join(rendered_lines)
\ No newline at end of file
+    def children(abs_dir: str, rel_dir: str) -> list[tuple[str, str | None, str]]:
+        """Return ``(label, subdirectory to descend or None, sort key)`` rows for one directory."""
+        # Listings from the workspace index already leave out ignored entries
+        entries = index.listing(rel_dir) if index is not None else None
+        filtered = entries is not None
+        if entries is None:
+            try:
+                entries = scandir_entries(abs_dir, workspace_root)
+            except OSError:
+                return []
+        record_io(files_walked=len(entries))
+
+        dirs: list[tuple[str, str | None, str]] = []
+        files: list[str] = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                is_symlink = entry.is_symlink()
+            except OSError:
+                continue
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if not filtered:
+                if matcher.is_ignored(rel_path, is_dir):
+                    continue
+                if is_symlink and not is_valid_path(entry.path, workspace_root, check_gitignore=False)[0]:
+                    continue
+            if is_dir:
+                # Symlinked directories are shown but not followed
+                dirs.append((entry.name + "/", None if is_symlink else rel_path, entry.name.lower()))
+            elif include_files:
+                files.append(entry.name)
+
+        if len(files) > COLLAPSE_FILES_THRESHOLD:
+            dirs.sort(key=lambda row: row[2])
+            return dirs + [(_summarise_files(files), None, "")]
+        rows = dirs + [(name, None, name.lower()) for name in files]
+        rows.sort(key=lambda row: row[2])
+        return rows
+
+    def render(abs_dir: str, rel_dir: str, prefix: str, depth: int) -> bool:
+        """Append the rows below one directory; False once ``max_entries`` is spent."""
+        nonlocal entries_added
+        rows = children(abs_dir, rel_dir)
+        for position, (label, subdir, _key) in enumerate(rows):
+            if entries_added >= max_entries:
+                rendered_lines.append(prefix + "└── …")
+                return False
+            is_last = position == len(rows) - 1
+            rendered_lines.append(prefix + ("└── " if is_last else "├── ") + label)
+            entries_added += 1
+            if subdir is not None and depth + 1 < max_depth:
+                child_prefix = prefix + ("    " if is_last else "│   ")
+                if not render(os.path.join(workspace_root, subdir), subdir, child_prefix, depth + 1):
+                    return False
+        return True
+
+    render(validated_path_str, "" if rel_root == "." else rel_root, "", 0)
+    return "\n".join(rendered_lines)
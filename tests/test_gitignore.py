@@ -0,0 +1,57 @@
+"""GitignoreMatcher decisions compared against ``git check-ignore``."""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from demo_agent.tools._shared import GitignoreMatcher
+
+# (.gitignore files by directory, paths to check; a trailing "/" marks a directory)
+CASES = [
+    ({"": "sub/\n!*/\n"}, ["sub/", "sub/x.txt", "sub/deep/", "sub/deep/z.txt"]),
+    ({"": "*.log\n*.py\n!a/\n"}, ["a/", "a/x.log", "a/foo.py", "x.log"]),
+    ({"": "a/**\n!a/keep.txt\n"}, ["a/", "a/keep.txt", "a/other.txt", "a/b/", "a/b/keep.txt"]),
+    ({"": "a\n", "b": "!a\n"}, ["a/", "a/x.txt", "b/", "b/a/", "b/a/x.txt"]),
+    ({"": "/c\ndeep/*\n!deep/keep/\n"}, ["c", "d/c", "deep/", "deep/x.txt", "deep/keep/", "deep/keep/x.txt"]),
+    ({"": "*/\n!b/\n", "b": "x.log\n"}, ["a/", "a/x.txt", "b/", "b/x.log", "b/y.log"]),
+]
+
+
+@unittest.skipIf(shutil.which("git") is None, "git is not installed")
+class GitignoreMatcherTest(unittest.TestCase):
+    def check(self, gitignores: dict[str, str], paths: list[str]) -> None:
+        with tempfile.TemporaryDirectory() as root:
+            subprocess.run(["git", "init", "-q", root], check=True)
+            for path in paths:
+                full = os.path.join(root, path)
+                if path.endswith("/"):
+                    os.makedirs(full, exist_ok=True)
+                else:
+                    os.makedirs(os.path.dirname(full), exist_ok=True)
+                    open(full, "w").close()
+            for rel_dir, rules in gitignores.items():
+                os.makedirs(os.path.join(root, rel_dir), exist_ok=True)
+                with open(os.path.join(root, rel_dir, ".gitignore"), "w") as file_obj:
+                    file_obj.write(rules)
+
+            names = [path.rstrip("/") for path in paths]
+            output = subprocess.run(
+                ["git", "-C", root, "check-ignore", "--no-index", "--stdin"],
+                input="\n".join(names), capture_output=True, text=True,
+            ).stdout
+            git_ignored = set(output.splitlines())
+
+            matcher = GitignoreMatcher(root)
+            for path, name in zip(paths, names):
+                with self.subTest(gitignores=gitignores, path=path):
+                    self.assertEqual(matcher.is_ignored(name, path.endswith("/")), name in git_ignored)
+
+    def test_matches_git_check_ignore(self) -> None:
+        for gitignores, paths in CASES:
+            self.check(gitignores, paths)
+
+
+if __name__ == "__main__":
+    unittest.main()